@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Approval Queue Test for Corporate Reservation Engine
+Verifies GET /api/approvals/pending per role against a local MongoDB:
+managers see their routed queue plus unassigned company bookings, admins see
+every pending booking they can act on, employees are refused.
+
+    MONGO_URL="mongodb://localhost:27017" python approvals_test.py
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+TEST_DB = f"approvals_test_{uuid.uuid4().hex[:8]}"
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+def print_success(message):
+    print(f"{Colors.GREEN}✅ {message}{Colors.ENDC}")
+
+def print_error(message):
+    print(f"{Colors.RED}❌ {message}{Colors.ENDC}")
+
+def print_header(message):
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.ENDC}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{message}{Colors.ENDC}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.ENDC}")
+
+
+def seed(c, server, get_password_hash, create_access_token):
+    """Two companies; company A has two managers, an admin and pending bookings routed three ways"""
+    now = datetime.utcnow().isoformat()
+    company_a, company_b = str(uuid.uuid4()), str(uuid.uuid4())
+    users = {}
+    for name, role, company_id in [
+        ("manager", "manager", company_a), ("other_manager", "manager", company_a),
+        ("admin", "admin", company_a), ("employee", "employee", company_a),
+        ("manager_b", "manager", company_b),
+    ]:
+        user_id = str(uuid.uuid4())
+        c.portal.call(server.db.users.insert_one, {
+            "id": user_id, "email": f"{user_id[:8]}@approvals.test", "password_hash": get_password_hash("pw"),
+            "full_name": name, "role": role, "company_id": company_id, "is_active": True,
+            "is_first_login": False, "gdpr_accepted": True, "created_at": now, "updated_at": now,
+        })
+        users[name] = {"id": user_id, "headers": {"Authorization": "Bearer " + create_access_token({"sub": user_id})}}
+
+    base = {"user_id": users["employee"]["id"], "service_type": "hotel", "hotel_id": "h", "hotel_name": "H",
+            "room_type_id": "r", "room_type_name": "R", "check_in_date": "2030-01-01",
+            "check_out_date": "2030-01-03", "guests": 1, "nights": 2, "price_per_night": 100.0,
+            "total_price": 200.0, "service_fee": 0.0, "grand_total": 200.0, "requires_approval": True,
+            "status": "pending", "created_at": now, "updated_at": now}
+    reservations = [
+        {**base, "id": "to-manager", "company_id": company_a, "approver_id": users["manager"]["id"]},
+        {**base, "id": "to-other-manager", "company_id": company_a, "approver_id": users["other_manager"]["id"]},
+        {**base, "id": "unassigned", "company_id": company_a, "approver_id": None},
+        {**base, "id": "to-admin", "company_id": company_a, "approver_id": users["admin"]["id"]},
+        {**base, "id": "company-b", "company_id": company_b, "approver_id": None},
+        {**base, "id": "confirmed", "company_id": company_a, "approver_id": users["manager"]["id"],
+         "status": "confirmed"},
+    ]
+    c.portal.call(server.db.reservations.insert_many, reservations)
+    return users
+
+
+def run_checks(c, users) -> bool:
+    passed = True
+
+    def check(name, headers, expected_ids, expected_counts=None, params=None):
+        nonlocal passed
+        response = c.get("/api/approvals/pending", headers=headers, params=params or {})
+        if expected_ids is None:
+            ok = response.status_code == 403
+            detail = f"HTTP {response.status_code}"
+        else:
+            body = response.json()
+            ids = {reservation['id'] for reservation in body['reservations']}
+            counts = (body['total'], body['assigned'], body['unassigned'])
+            ok = response.status_code == 200 and ids == expected_ids and counts == expected_counts
+            detail = f"{sorted(ids)} total/assigned/unassigned={counts}"
+        if ok:
+            print_success(f"{name}: {detail}")
+        else:
+            print_error(f"{name}: {detail}")
+            passed = False
+
+    check("manager sees own queue and unassigned", users["manager"]["headers"],
+          {"to-manager", "unassigned"}, (2, 1, 1))
+    check("manager without unassigned", users["manager"]["headers"],
+          {"to-manager"}, (1, 1, 0), {"include_unassigned": "false"})
+    check("other manager sees own queue and unassigned", users["other_manager"]["headers"],
+          {"to-other-manager", "unassigned"}, (2, 1, 1))
+    check("admin sees every pending booking", users["admin"]["headers"],
+          {"to-manager", "to-other-manager", "unassigned", "to-admin", "company-b"}, (5, 1, 2))
+    check("admin without unassigned", users["admin"]["headers"],
+          {"to-manager", "to-other-manager", "to-admin"}, (3, 1, 0), {"include_unassigned": "false"})
+    check("manager of another company", users["manager_b"]["headers"], {"company-b"}, (1, 0, 1))
+    check("employee is refused", users["employee"]["headers"], None)
+    return passed
+
+
+def main():
+    os.environ["MONGO_URL"] = MONGO_URL
+    os.environ["DB_NAME"] = TEST_DB
+    import server
+    from auth import create_access_token, get_password_hash
+    from fastapi.testclient import TestClient
+
+    print_header(f"Approval queue per role ({MONGO_URL})")
+    with TestClient(server.app) as c:
+        try:
+            passed = run_checks(c, seed(c, server, get_password_hash, create_access_token))
+        finally:
+            c.portal.call(server.client.drop_database, TEST_DB)
+
+    if passed:
+        print_success("Approval queue verified")
+        return 0
+    print_error("Approval queue checks failed")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
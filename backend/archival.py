@@ -0,0 +1,233 @@
+"""Hot/cold archival of finished reservations
+
+Reservations in a terminal status (completed, cancelled, rejected) whose
+last change is older than ARCHIVE_AFTER_DAYS move from ``reservations`` to
+``reservations_archive`` in batches. Each batch is copied first and deleted
+second, both keyed by id, so an interrupted run is finished by the next one
+without losing or duplicating documents.
+
+Dashboard totals must not drop when rows leave the hot collection, so
+``reservation_rollups`` keeps per (company, user, status) counts and spend
+of everything archived. Each batch ``$inc``s the rollups by the rows it
+actually deleted from ``reservations``; a row is deleted once, so a rerun
+never counts it twice. A run killed between the delete and the ``$inc``
+leaves those rows out of the rollups, and ``--rebuild-rollups`` recomputes
+all of them from the archive.
+
+Run it from cron, or let the job worker schedule it once a day:
+
+    python archival.py --older-than-days 365 --batch-size 1000 [--dry-run]
+    python archival.py --rebuild-rollups
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import metrics
+from db_settings import DBSettings
+from jobs import job_handler, new_job, enqueue
+from models import RESERVATION_TRANSITIONS
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 1000))
+# Hour (UTC) of the daily archival job
+ARCHIVE_HOUR_UTC = int(os.environ.get("ARCHIVE_HOUR_UTC", 3))
+
+TERMINAL_STATUSES = [status.value for status, targets in RESERVATION_TRANSITIONS.items() if not targets]
+SPEND_STATUSES = ("confirmed", "completed")
+
+logger = logging.getLogger(__name__)
+
+reservations_archived_total = metrics.REGISTRY.counter(
+    "reservations_archived_total", "Reservations moved to reservations_archive")
+
+
+async def ensure_archive_indexes(db):
+    await db.reservations_archive.create_index("id", unique=True, name="id_unique")
+    await db.reservations_archive.create_index(
+        [("company_id", 1), ("status", 1), ("created_at", -1)], name="company_status_created"
+    )
+    await db.reservations_archive.create_index(
+        [("user_id", 1), ("status", 1), ("created_at", -1)], name="user_status_created"
+    )
+    await db.reservation_rollups.create_index(
+        [("company_id", 1), ("user_id", 1), ("status", 1)], unique=True, name="company_user_status"
+    )
+
+
+def archive_query(cutoff: datetime) -> dict:
+    return {"status": {"$in": TERMINAL_STATUSES}, "updated_at": {"$lt": cutoff.isoformat()}}
+
+
+def _add_to_rollup(totals: Dict[tuple, dict], res: dict):
+    key = (res.get('company_id'), res.get('user_id'), res.get('status'))
+    entry = totals.setdefault(key, {"count": 0, "spent": 0.0})
+    entry["count"] += 1
+    if res.get('status') in SPEND_STATUSES:
+        entry["spent"] += res.get('grand_total', 0) or 0
+
+
+async def apply_rollup_deltas(db, reservations: List[dict]):
+    """Add these newly archived reservations to the rollups"""
+    totals: Dict[tuple, dict] = {}
+    for res in reservations:
+        _add_to_rollup(totals, res)
+    now = datetime.utcnow().isoformat()
+    operations = [
+        UpdateOne(
+            {"company_id": company_id, "user_id": user_id, "status": status},
+            {"$inc": entry, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for (company_id, user_id, status), entry in totals.items()
+    ]
+    if operations:
+        await db.reservation_rollups.bulk_write(operations, ordered=False)
+
+
+async def rebuild_rollups(db) -> int:
+    """Repair: recompute every rollup from the archive (one full scan); returns the number of rollups"""
+    totals: Dict[tuple, dict] = {}
+    async for res in db.reservations_archive.find(
+        {}, {"_id": 0, "company_id": 1, "user_id": 1, "status": 1, "grand_total": 1}
+    ):
+        _add_to_rollup(totals, res)
+    now = datetime.utcnow().isoformat()
+    operations = [
+        ReplaceOne(
+            {"company_id": company_id, "user_id": user_id, "status": status},
+            {"company_id": company_id, "user_id": user_id, "status": status, **entry, "updated_at": now},
+            upsert=True
+        )
+        for (company_id, user_id, status), entry in totals.items()
+    ]
+    if operations:
+        await db.reservation_rollups.bulk_write(operations, ordered=False)
+    # Rollups the archive no longer backs
+    await db.reservation_rollups.delete_many({"updated_at": {"$lt": now}})
+    return len(operations)
+
+
+async def archived_totals(db, scope: dict) -> Dict[str, dict]:
+    """Archived count and spend per status for a reservation scope (see _reservation_scope)"""
+    totals: Dict[str, dict] = {}
+    async for rollup in db.reservation_rollups.find(scope, {"_id": 0, "status": 1, "count": 1, "spent": 1}):
+        entry = totals.setdefault(rollup['status'], {"count": 0, "spent": 0.0})
+        entry["count"] += rollup.get('count', 0)
+        entry["spent"] += rollup.get('spent', 0.0)
+    return totals
+
+
+async def find_reservation(db, reservation_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+    """Reservation by id from the hot collection, falling through to the archive"""
+    projection = projection or {"_id": 0}
+    reservation = await db.reservations.find_one({"id": reservation_id}, projection)
+    if reservation is None:
+        reservation = await db.reservations_archive.find_one({"id": reservation_id}, projection)
+    return reservation
+
+
+async def archive_reservations(db, older_than_days: int = ARCHIVE_AFTER_DAYS,
+                               batch_size: int = ARCHIVE_BATCH_SIZE, dry_run: bool = False,
+                               max_batches: Optional[int] = None) -> int:
+    """Move aged terminal reservations to the archive; returns how many were moved"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    query = archive_query(cutoff)
+    if dry_run:
+        return await db.reservations.count_documents(query)
+
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = await db.reservations.find(query, {"_id": 0}).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        now = datetime.utcnow().isoformat()
+        try:
+            await db.reservations_archive.insert_many(
+                [{**res, "archived_at": now} for res in batch], ordered=False
+            )
+        except BulkWriteError as e:
+            # Copied by an earlier, interrupted run
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+        ids = [res['id'] for res in batch]
+        # Same filter as the read, so a row that changed in between stays hot
+        await db.reservations.delete_many({"id": {"$in": ids}, **query})
+        kept = set(await db.reservations.distinct("id", {"id": {"$in": ids}}))
+        if kept:
+            # Their archive copies are already out of date; they are copied again once they qualify
+            await db.reservations_archive.delete_many({"id": {"$in": list(kept)}})
+        # Only rows that left the hot collection count, as read: the delete filter guarantees they did not change
+        deleted = [res for res in batch if res['id'] not in kept]
+        await apply_rollup_deltas(db, deleted)
+        moved += len(deleted)
+        batches += 1
+        reservations_archived_total.inc(len(deleted))
+        # Yield between batches so the primary keeps serving bookings
+        await asyncio.sleep(0)
+    return moved
+
+
+def next_run_at() -> datetime:
+    now = datetime.utcnow()
+    run_at = now.replace(hour=ARCHIVE_HOUR_UTC, minute=0, second=0, microsecond=0)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+async def schedule_archival(db, run_at: Optional[datetime] = None):
+    """Enqueue the daily run; the dedupe key keeps it to one job per day across workers"""
+    run_at = run_at or next_run_at()
+    await enqueue(db, new_job("reservations.archive", {}, dedupe_key=f"reservations.archive:{run_at:%Y-%m-%d}",
+                              run_at=run_at))
+
+
+@job_handler("reservations.archive")
+async def archive_job(db, payload: dict):
+    started = time.perf_counter()
+    moved = await archive_reservations(db, payload.get('older_than_days', ARCHIVE_AFTER_DAYS))
+    logger.info(f"Archived {moved} reservations in {time.perf_counter() - started:.1f}s")
+    # Tomorrow's slot: today's dedupe key belongs to this job even if it ran before ARCHIVE_HOUR_UTC
+    tomorrow = datetime.utcnow() + timedelta(days=1)
+    await schedule_archival(db, tomorrow.replace(hour=ARCHIVE_HOUR_UTC, minute=0, second=0, microsecond=0))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Move finished reservations to reservations_archive")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would move")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="Recompute reservation_rollups from the whole archive instead of archiving")
+    args = parser.parse_args()
+
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    settings = DBSettings.from_env()
+    client = AsyncIOMotorClient(settings.mongo_url, **settings.client_kwargs())
+    db = client[settings.db_name]
+    try:
+        await ensure_archive_indexes(db)
+        started = time.perf_counter()
+        if args.rebuild_rollups:
+            rollups = await rebuild_rollups(db)
+            print(f"✓ rebuilt {rollups} rollups in {time.perf_counter() - started:.1f}s")
+            return
+        moved = await archive_reservations(db, args.older_than_days, args.batch_size, args.dry_run)
+        verb = "would move" if args.dry_run else "moved"
+        print(f"✓ {verb} {moved} reservations older than {args.older_than_days} days "
+              f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
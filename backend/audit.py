@@ -0,0 +1,186 @@
+"""Append-only audit trail with batched asynchronous writes
+
+Handlers call ``await audit_log.record(...)``, which only puts the event on a
+bounded in-memory queue. A background writer drains the queue into the
+``audit_events`` collection with ``insert_many``, either every
+AUDIT_FLUSH_INTERVAL_SECONDS or as soon as AUDIT_BATCH_SIZE events are
+waiting. If the writer falls behind and the queue is full, ``record`` waits
+for space rather than dropping events.
+
+On shutdown the queue is drained and the last batch is written with a
+journaled write concern, so events recorded before shutdown reach disk.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo.errors import PyMongoError
+from pymongo.write_concern import WriteConcern
+
+import metrics
+
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", 10000))
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", 500))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.environ.get("AUDIT_FLUSH_INTERVAL_SECONDS", 1.0))
+AUDIT_RETRY_MAX_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+audit_events_recorded_total = metrics.REGISTRY.counter(
+    "audit_events_recorded_total", "Audit events accepted by the queue", ("action",))
+audit_events_written_total = metrics.REGISTRY.counter(
+    "audit_events_written_total", "Audit events persisted to Mongo")
+audit_write_failures_total = metrics.REGISTRY.counter(
+    "audit_write_failures_total", "Failed audit batch inserts (retried)")
+audit_queue_full_total = metrics.REGISTRY.counter(
+    "audit_queue_full_total", "record() calls that had to wait for queue space")
+audit_flush_seconds = metrics.REGISTRY.histogram(
+    "audit_flush_seconds", "insert_many duration per audit batch")
+audit_queue_depth = metrics.REGISTRY.gauge(
+    "audit_queue_depth", "Audit events waiting to be written")
+
+
+async def ensure_audit_indexes(db):
+    """Indexes for per-entity and per-actor history, newest first"""
+    await db.audit_events.create_index("id", unique=True, name="id_unique")
+    await db.audit_events.create_index(
+        [("entity_type", 1), ("entity_id", 1), ("at", -1)], name="entity_at"
+    )
+    await db.audit_events.create_index([("actor_id", 1), ("at", -1)], name="actor_at")
+    await db.audit_events.create_index([("company_id", 1), ("at", -1)], name="company_at")
+
+
+class AuditLog:
+    """Bounded queue of audit events plus the task that writes them in batches"""
+
+    def __init__(self, queue_size: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+        self._in_flight: List[dict] = []
+
+    def start(self, db):
+        """Start the writer on the running loop (call from startup)"""
+        if self._task is not None:
+            return
+        self._db = db
+        self._queue = self._queue or asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._writer())
+
+    async def record(self, action: str, entity_type: str, entity_id: str, actor: dict,
+                     before: Optional[dict] = None, after: Optional[dict] = None,
+                     company_id: Optional[str] = None) -> dict:
+        """Queue one event; `actor` is the authenticated user document"""
+        action = getattr(action, "value", action)
+        event = {
+            "id": str(uuid.uuid4()),
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "actor_id": actor.get("id"),
+            "actor_role": actor.get("role"),
+            "company_id": company_id if company_id is not None else actor.get("company_id"),
+            "before": before,
+            "after": after,
+            "at": datetime.utcnow().isoformat(),
+        }
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Backpressure instead of loss: the request waits for the writer to catch up
+            audit_queue_full_total.inc()
+            await self._queue.put(event)
+        audit_events_recorded_total.inc(action=action)
+        return event
+
+    async def _next_batch(self) -> List[dict]:
+        batch = self._in_flight = []
+        batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _insert(self, batch: List[dict], collection=None):
+        started = time.perf_counter()
+        # ordered=False: a replayed event (duplicate id) must not block the rest of the batch
+        try:
+            await (collection or self._db.audit_events).insert_many(batch, ordered=False)
+        except PyMongoError as e:
+            details = getattr(e, "details", None) or {}
+            errors = details.get("writeErrors", [])
+            if not errors or any(error.get("code") != 11000 for error in errors):
+                raise
+        audit_flush_seconds.observe(time.perf_counter() - started)
+        audit_events_written_total.inc(len(batch))
+        audit_queue_depth.set(self._queue.qsize())
+
+    async def _writer(self):
+        delay = 0.5
+        while True:
+            # Events taken off the queue stay in self._in_flight until written, so close() can flush them
+            batch = await self._next_batch()
+            while True:
+                try:
+                    # insert_many adds _id to the dicts; copies keep a retry identical to the first attempt
+                    await self._insert([dict(event) for event in batch])
+                    self._in_flight = []
+                    delay = 0.5
+                    break
+                except Exception as e:
+                    audit_write_failures_total.inc()
+                    logger.error(f"Audit batch of {len(batch)} failed, retrying in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, AUDIT_RETRY_MAX_SECONDS)
+
+    def drain(self) -> List[dict]:
+        """Events not yet written, removed from the queue"""
+        events, self._in_flight = self._in_flight, []
+        while self._queue is not None and not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    async def close(self):
+        """Stop the writer and persist everything still queued with j=True"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        pending = self.drain()
+        if not pending or self._db is None:
+            return
+        journaled = self._db.get_collection("audit_events", write_concern=WriteConcern(w=1, j=True))
+        try:
+            for i in range(0, len(pending), self.batch_size):
+                await self._insert(pending[i:i + self.batch_size], journaled)
+            logger.info(f"Flushed {len(pending)} audit events on shutdown")
+        except Exception as e:
+            audit_write_failures_total.inc()
+            logger.error(f"Lost {len(pending)} audit events on shutdown: {e}")
+
+
+audit_log = AuditLog()
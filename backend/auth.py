@@ -1,11 +1,15 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import os
+import metrics
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -28,6 +32,35 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# bcrypt is CPU-bound; run it off the event loop on a bounded pool
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", os.cpu_count() or 1))
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+
+async def _run_bcrypt(operation: str, func, *args):
+    submitted = time.perf_counter()
+    
+    def timed():
+        started = time.perf_counter()
+        metrics.bcrypt_queue_wait_seconds.observe(started - submitted, operation=operation)
+        try:
+            return func(*args)
+        finally:
+            metrics.bcrypt_duration_seconds.observe(time.perf_counter() - started, operation=operation)
+    
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, timed)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password without blocking the event loop"""
+    return await _run_bcrypt("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash without blocking the event loop"""
+    return await _run_bcrypt("hash", get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -56,7 +89,9 @@ def decode_token(token: str) -> dict:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncIOMotorDatabase = None
+    db: AsyncIOMotorDatabase = None,
+    cache=None,
+    cache_ttl: Optional[int] = None
 ):
     """Get current authenticated user"""
     token = credentials.credentials
@@ -75,7 +110,14 @@ async def get_current_user(
             detail="Database connection not available"
         )
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    # The principal never needs the hash, and it must not sit in a cache
+    projection = {"_id": 0, "password_hash": 0}
+    if cache is not None:
+        user = await cache.get_or_load(
+            "principal", user_id, lambda: db.users.find_one({"id": user_id}, projection), cache_ttl
+        )
+    else:
+        user = await db.users.find_one({"id": user_id}, projection)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,317 @@
+"""In-process API benchmark
+
+Drives the FastAPI ``app`` directly over ASGI (no network, no uvicorn) against
+a local mongod or an in-memory fake, seeds synthetic data and reports
+throughput and latency percentiles per scenario. Results are written as JSON
+so runs from different commits can be compared.
+
+Usage:
+    python benchmark.py --fake                                  # in-memory (needs mongomock-motor)
+    python benchmark.py --mongo-url mongodb://localhost:27017   # local mongod, throwaway database
+    python benchmark.py --fake --compare bench_results/<old>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).parent
+SCENARIOS = ("login", "search", "reservation_create", "reservation_list", "dashboard")
+BENCH_PASSWORD = "bench123"
+
+
+class ASGIClient:
+    """Minimal ASGI HTTP client for driving the app in-process"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, json_body=None, headers: Optional[dict] = None):
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        path, _, query = path.partition("?")
+        raw_headers = [
+            (b"host", b"benchmark"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ] + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+        status = 0
+        chunks = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        response_done.set()
+        payload = b"".join(chunks)
+        return status, (json.loads(payload) if payload else None)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+async def run_scenario(
+    make_request: Callable[[int], "asyncio.Future"],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    """Run make_request(i) `requests` times with bounded concurrency"""
+    for i in range(warmup):
+        await make_request(i)
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                status, _ = await make_request(i)
+                ok = status < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+# ---- seeding ----
+
+async def seed(db, companies: int, users_per_company: int, reservations: int, hotels: int,
+               rng: random.Random) -> dict:
+    """Load a synthetic dataset and return handles the scenarios need"""
+    from auth import get_password_hash
+    from synthetic_data import load_async
+
+    # One hash for everyone: seeding thousands of users must not spend minutes in bcrypt
+    catalog = await load_async(db, rng.getrandbits(32), companies, companies * users_per_company, hotels,
+                               reservations, get_password_hash(BENCH_PASSWORD))
+    active = [user for user in catalog["users"] if user["is_active"]]
+    return {
+        "hotels": [hotel for hotel in catalog["hotels"] if hotel["is_active"]],
+        "employees": [user for user in active if user["role"] == "employee"],
+        "managers": [user for user in active if user["role"] == "manager"],
+    }
+
+
+# ---- scenarios ----
+
+def build_scenarios(client: ASGIClient, data: dict, tokens: Dict[str, str], rng: random.Random) -> dict:
+    employees, managers, hotels = data["employees"], data["managers"], data["hotels"]
+    cities = sorted({hotel["city"] for hotel in hotels})
+    check_in = (date.today() + timedelta(days=30)).isoformat()
+    check_out = (date.today() + timedelta(days=32)).isoformat()
+
+    def auth(user):
+        return {"Authorization": f"Bearer {tokens[user['id']]}"}
+
+    async def login(i):
+        user = employees[i % len(employees)]
+        return await client.request("POST", "/api/auth/login",
+                                    {"email": user["email"], "password": BENCH_PASSWORD})
+
+    async def search(i):
+        user = employees[i % len(employees)]
+        return await client.request("POST", "/api/hotels/search", {
+            "city": cities[i % len(cities)], "check_in_date": check_in,
+            "check_out_date": check_out, "guests": 1,
+        }, auth(user))
+
+    async def reservation_create(i):
+        user = employees[i % len(employees)]
+        hotel = hotels[rng.randrange(len(hotels))]
+        return await client.request("POST", "/api/reservations", {
+            "service_type": "hotel", "user_id": user["id"], "company_id": user["company_id"],
+            "hotel_id": hotel["id"], "room_type_id": hotel["room_types"][0]["id"],
+            "check_in_date": check_in, "check_out_date": check_out, "guests": 1,
+        }, auth(user))
+
+    async def reservation_list(i):
+        manager = managers[i % len(managers)]
+        return await client.request("GET", "/api/reservations", headers=auth(manager))
+
+    async def dashboard(i):
+        manager = managers[i % len(managers)]
+        return await client.request("GET", "/api/dashboard/stats", headers=auth(manager))
+
+    return {
+        "login": login,
+        "search": search,
+        "reservation_create": reservation_create,
+        "reservation_list": reservation_list,
+        "dashboard": dashboard,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline_path: Path):
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nΔ vs {baseline_path.name} (commit {baseline.get('commit')}):")
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        deltas = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if old.get(key):
+                change = (result[key] - old[key]) / old[key] * 100
+                deltas.append(f"{key} {change:+.1f}%")
+        print(f"  {name:20s} " + "  ".join(deltas))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="In-process API benchmark")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--fake", action="store_true", help="Use an in-memory Motor fake (mongomock-motor)")
+    target.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=f"bench_{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--keep-db", action="store_true", help="Do not drop the benchmark database")
+    parser.add_argument("--companies", type=int, default=5)
+    parser.add_argument("--users-per-company", type=int, default=200)
+    parser.add_argument("--reservations", type=int, default=20000)
+    parser.add_argument("--hotels", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Result JSON path (default: bench_results/<commit>_<time>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    # server.py connects at import time, so point it at the benchmark database first
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    sys.path.insert(0, str(ROOT_DIR))
+    import server
+    from auth import create_access_token
+
+    if args.fake:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--fake needs mongomock-motor: pip install mongomock-motor")
+        server.client = AsyncMongoMockClient()
+        server.db = server.client[args.db_name]
+    db = server.db
+    rng = random.Random(args.seed)
+
+    print(f"=== Benchmark ({'fake' if args.fake else args.mongo_url}/{args.db_name}) ===\n")
+    started = time.perf_counter()
+    data = await seed(db, args.companies, args.users_per_company, args.reservations, args.hotels, rng)
+    seed_seconds = time.perf_counter() - started
+    print(f"✓ Seeded in {seed_seconds:.1f}s")
+
+    await server.app.router.startup()
+    try:
+        tokens = {user["id"]: create_access_token({"sub": user["id"]})
+                  for user in data["employees"] + data["managers"]}
+        client = ASGIClient(server.app)
+        scenarios = build_scenarios(client, data, tokens, rng)
+
+        results = {}
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in scenarios:
+                raise SystemExit(f"Unknown scenario: {name}")
+            results[name] = await run_scenario(scenarios[name], args.requests, args.concurrency, args.warmup)
+            r = results[name]
+            print(f"  {name:20s} {r['throughput_rps']:>9.1f} rps  p50 {r['p50_ms']:>8.2f}ms  "
+                  f"p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  errors {r['errors']}")
+    finally:
+        if not args.keep_db and not args.fake:
+            await server.client.drop_database(args.db_name)
+        await server.app.router.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "backend": "fake" if args.fake else "mongod",
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "seed_seconds": round(seed_seconds, 3),
+        "results": results,
+    }
+    output = args.output or ROOT_DIR / "bench_results" / (
+        f"{report['commit'] or 'nogit'}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n✓ Results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
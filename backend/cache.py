@@ -0,0 +1,270 @@
+"""Read-through caches that stay coherent across worker processes
+
+Two backends:
+
+- ``local``: in-process LRU. Correct for a single worker only.
+- ``shared``: a SQLite file on tmpfs that every worker on the box opens.
+  Lookups are local syscalls, no network hop, no extra service to run.
+  Without CACHE_PATH the file lives in a per-user 0700 directory under
+  /dev/shm; either way it is created 0600, so other local users can neither
+  read nor plant entries.
+
+Entries are stamped with (namespace version, key version). Invalidating a
+namespace or a single key bumps a counter in the backend, so every worker's
+next lookup sees a different stamp and misses. With the shared backend each
+worker also keeps a small in-process L1 copy; the version check is the only
+shared read on an L1 hit.
+
+Values are stored as JSON (sets, bytes and datetimes are tagged so they
+round-trip), so every hit returns a fresh object that callers may mutate and
+reading an entry never runs code.
+"""
+import base64
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "local")
+CACHE_PATH = os.environ.get("CACHE_PATH", "")
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", 300))
+CACHE_L1_SIZE = int(os.environ.get("CACHE_L1_SIZE", 10000))
+
+Stamp = Tuple[int, int]
+
+
+def _encode_default(value: Any):
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": list(value)}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Cannot cache a {type(value).__name__}")
+
+
+def _decode_tagged(obj: dict) -> Any:
+    if len(obj) == 1:
+        if "__set__" in obj:
+            return set(obj["__set__"])
+        if "__bytes__" in obj:
+            return base64.b64decode(obj["__bytes__"])
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        if "__date__" in obj:
+            return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+def dumps(value: Any) -> bytes:
+    return json.dumps(value, default=_encode_default, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: bytes) -> Any:
+    return json.loads(raw, object_hook=_decode_tagged)
+
+
+class LocalBackend:
+    """In-process LRU with per-entry expiry"""
+
+    shared = False
+
+    def __init__(self, maxsize: int = CACHE_L1_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def versions(self, keys: List[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(key, 0) for key in keys]
+
+    def bump(self, key: str) -> int:
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedBackend:
+    """SQLite on tmpfs shared by all workers on the host.
+
+    One connection per thread and process; connections are opened lazily so
+    nothing leaks across a fork.
+    """
+
+    shared = True
+    _PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        # Created private before SQLite opens it; O_NOFOLLOW refuses a planted symlink
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+        try:
+            info = os.fstat(fd)
+            if info.st_uid != os.getuid() or info.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                raise RuntimeError(f"Cache file {path} must be owned by this user and not accessible to others")
+        finally:
+            os.close(fd)
+        self._local = threading.local()
+        self._writes = 0
+        self._conn()  # create the schema up front
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                     (key, value, time.time() + ttl))
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+
+    def versions(self, keys: List[str]) -> List[int]:
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn().execute(
+            f"SELECT key, version FROM versions WHERE key IN ({placeholders})", keys).fetchall()
+        found = dict(rows)
+        return [found.get(key, 0) for key in keys]
+
+    def bump(self, key: str) -> int:
+        row = self._conn().execute(
+            "INSERT INTO versions (key, version) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET version = version + 1 RETURNING version", (key,)).fetchone()
+        return row[0]
+
+    def clear(self):
+        self._conn().execute("DELETE FROM entries")
+
+
+class VersionedCache:
+    """Namespaced cache whose entries are invalidated by version stamps"""
+
+    def __init__(self, backend, ttl_seconds: int = CACHE_TTL_SECONDS, l1_size: int = CACHE_L1_SIZE):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        # The local backend already is an in-process LRU; only shared storage needs an L1 in front
+        self._l1 = LocalBackend(l1_size) if backend.shared else None
+
+    def stamp(self, namespace: str, key: str) -> Stamp:
+        namespace_version, key_version = self.backend.versions([namespace, f"{namespace}:{key}"])
+        return namespace_version, key_version
+
+    def _lookup(self, storage_key: str, stamp: Stamp) -> Tuple[bool, Any]:
+        for tier in (self._l1, self.backend):
+            if tier is None:
+                continue
+            raw = tier.get(storage_key)
+            if raw is None:
+                continue
+            entry_stamp, value = loads(raw)
+            if tuple(entry_stamp) == stamp:
+                if tier is not self._l1 and self._l1 is not None:
+                    self._l1.set(storage_key, raw, self.ttl_seconds)
+                return True, value
+        return False, None
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        hit, value = self._lookup(f"{namespace}:{key}", self.stamp(namespace, key))
+        metrics.record_cache(namespace, hit)
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, stamp: Optional[Stamp] = None,
+            ttl: Optional[int] = None):
+        """Store value; pass the stamp read before loading it so a concurrent invalidation wins"""
+        stamp = stamp or self.stamp(namespace, key)
+        raw = dumps((stamp, value))
+        storage_key = f"{namespace}:{key}"
+        self.backend.set(storage_key, raw, ttl or self.ttl_seconds)
+        if self._l1 is not None:
+            self._l1.set(storage_key, raw, ttl or self.ttl_seconds)
+
+    async def get_or_load(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[int] = None) -> Any:
+        """Cached value, or loader() stored under the stamp seen before loading; None is not cached"""
+        stamp = self.stamp(namespace, key)
+        hit, value = self._lookup(f"{namespace}:{key}", stamp)
+        metrics.record_cache(namespace, hit)
+        if hit:
+            return value
+        value = await loader()
+        if value is not None:
+            self.set(namespace, key, value, stamp, ttl)
+        return value
+
+    def invalidate(self, namespace: str, key: Optional[str] = None):
+        """Drop one key, or every key in the namespace, for all workers"""
+        self.backend.bump(namespace if key is None else f"{namespace}:{key}")
+
+
+def private_cache_dir() -> str:
+    """Per-user 0700 directory on tmpfs; refuses one that someone else created or opened up"""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    directory = os.path.join(base, f"corporate-reservation-cache-{os.getuid()}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or info.st_mode & (stat.S_IRWXG | stat.S_IRWXO)):
+        raise RuntimeError(f"{directory} must be a directory owned by this user with mode 0700; "
+                           f"remove it or set CACHE_PATH")
+    return directory
+
+
+def build_cache(backend: str = CACHE_BACKEND, path: str = CACHE_PATH) -> VersionedCache:
+    if backend == "local":
+        return VersionedCache(LocalBackend())
+    if backend == "shared":
+        if not path:
+            path = os.path.join(private_cache_dir(), "cache.sqlite")
+        return VersionedCache(SharedBackend(path))
+    raise RuntimeError(f"CACHE_BACKEND must be 'local' or 'shared', got '{backend}'")
@@ -0,0 +1,256 @@
+"""Change-stream fan-out of invalidation events
+
+Every worker runs one ``ChangeFeed``. It watches the companies, users and
+hotels collections and turns each write into a typed ``ChangeEvent``, so
+caches hear about writes from other workers and from scripts such as
+create_agency_admin.py, not only about their own.
+
+Modes (CHANGE_FEED):
+
+- ``auto`` (default): change stream, falling back to polling when the
+  server does not support change streams (standalone mongod).
+- ``stream`` / ``poll``: force one mechanism.
+- ``off``: no feed; caches rely on local invalidation and TTLs.
+
+The stream resumes after restarts from a resume token saved in
+``change_feed_state``. If the token has fallen off the oplog, subscribers
+get one wildcard event per collection (entity_id None) and should drop
+everything they hold for it. Polling reads ``updated_at`` watermarks, which
+it also saves; it cannot see deletes.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+import metrics
+
+CHANGE_FEED = os.environ.get("CHANGE_FEED", "auto")
+CHANGE_FEED_POLL_INTERVAL_SECONDS = float(os.environ.get("CHANGE_FEED_POLL_INTERVAL_SECONDS", 5.0))
+CHANGE_FEED_TOKEN_SAVE_SECONDS = float(os.environ.get("CHANGE_FEED_TOKEN_SAVE_SECONDS", 5.0))
+CHANGE_FEED_RETRY_MAX_SECONDS = 30.0
+
+COMPANY_RULES_CHANGED = "company.rules_changed"
+COMPANY_UPDATED = "company.updated"
+USER_DEACTIVATED = "user.deactivated"
+USER_UPDATED = "user.updated"
+HOTEL_UPDATED = "hotel.updated"
+
+WATCHED_COLLECTIONS = ("companies", "users", "hotels")
+# Company fields that feed the cached booking context (see server._get_booking_context)
+RULE_FIELDS = ("booking_rules", "service_fees")
+
+# Server error codes: no change streams on this deployment / resume point is gone
+_UNSUPPORTED_CODES = {40573, 40324, 303}
+_HISTORY_LOST_CODES = {286, 280, 136}
+
+logger = logging.getLogger(__name__)
+
+change_feed_events_total = metrics.REGISTRY.counter(
+    "change_feed_events_total", "Invalidation events dispatched", ("kind", "source"))
+change_feed_restarts_total = metrics.REGISTRY.counter(
+    "change_feed_restarts_total", "Change feed retries and fallbacks after errors", ("reason",))
+change_feed_polling = metrics.REGISTRY.gauge(
+    "change_feed_polling", "1 when the feed has fallen back to polling updated_at")
+
+
+class ChangeEvent(NamedTuple):
+    kind: str
+    entity_id: Optional[str]  # None: unknown document, drop everything for the collection
+    fields: Tuple[str, ...] = ()
+
+
+Subscriber = Callable[[ChangeEvent], None]
+
+
+def classify(collection: str, document: dict, fields: Optional[Tuple[str, ...]]) -> ChangeEvent:
+    """Event for a written document; fields None means the whole document may have changed"""
+    entity_id = document.get('id')
+    if collection == "companies":
+        if fields is None or any(field.split('.')[0] in RULE_FIELDS for field in fields):
+            return ChangeEvent(COMPANY_RULES_CHANGED, entity_id, fields or ())
+        return ChangeEvent(COMPANY_UPDATED, entity_id, fields)
+    if collection == "users":
+        if document.get('is_active') is False:
+            return ChangeEvent(USER_DEACTIVATED, entity_id, fields or ())
+        return ChangeEvent(USER_UPDATED, entity_id, fields or ())
+    return ChangeEvent(HOTEL_UPDATED, entity_id, fields or ())
+
+
+def wildcard_events() -> List[ChangeEvent]:
+    return [ChangeEvent(COMPANY_RULES_CHANGED, None), ChangeEvent(USER_UPDATED, None),
+            ChangeEvent(HOTEL_UPDATED, None)]
+
+
+class ChangeFeed:
+    """Watches Mongo for writes and calls the subscribers registered per event kind"""
+
+    STATE_ID = "cache_invalidation"
+
+    def __init__(self, mode: str = CHANGE_FEED, poll_interval: float = CHANGE_FEED_POLL_INTERVAL_SECONDS):
+        if mode not in ("auto", "stream", "poll", "off"):
+            raise RuntimeError(f"CHANGE_FEED must be auto, stream, poll or off, got '{mode}'")
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+
+    def subscribe(self, kinds, callback: Subscriber):
+        for kind in ([kinds] if isinstance(kinds, str) else kinds):
+            self._subscribers.setdefault(kind, []).append(callback)
+
+    def dispatch(self, event: ChangeEvent, source: str = "local"):
+        change_feed_events_total.inc(kind=event.kind, source=source)
+        for callback in self._subscribers.get(event.kind, ()):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Change feed subscriber failed for {event.kind}: {e}")
+
+    def start(self, db):
+        """Start watching on the running loop (call from startup)"""
+        if self.mode == "off" or self._task is not None:
+            return
+        self._db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # The feed died earlier; caches fell back to their TTLs, which is all there is to report
+                logger.error(f"Change feed had stopped: {e}")
+            self._task = None
+
+    async def _load_state(self) -> dict:
+        return await self._db.change_feed_state.find_one({"_id": self.STATE_ID}) or {}
+
+    async def _save_state(self, **fields):
+        await self._db.change_feed_state.update_one(
+            {"_id": self.STATE_ID},
+            {"$set": {**fields, "updated_at": datetime.utcnow().isoformat()}},
+            upsert=True
+        )
+
+    async def _run(self):
+        if self.mode in ("auto", "stream"):
+            delay = 1.0
+            while True:
+                try:
+                    await self._watch()
+                    return
+                except OperationFailure as e:
+                    if e.code in _UNSUPPORTED_CODES and self.mode == "auto":
+                        logger.info("Change streams unavailable, polling updated_at instead")
+                        break
+                    if e.code in _HISTORY_LOST_CODES:
+                        # Resume point is gone: whatever changed meanwhile is unknown, so drop it all
+                        logger.warning("Change stream resume token expired; invalidating all watched caches")
+                        change_feed_restarts_total.inc(reason="history_lost")
+                        await self._save_state(resume_token=None)
+                        for event in wildcard_events():
+                            self.dispatch(event, "stream")
+                        continue
+                    change_feed_restarts_total.inc(reason="error")
+                    logger.error(f"Change stream failed, retrying in {delay:.0f}s: {e}")
+                except PyMongoError as e:
+                    change_feed_restarts_total.inc(reason="error")
+                    logger.error(f"Change stream failed, retrying in {delay:.0f}s: {e}")
+                except Exception as e:
+                    # Not a server error (a driver without change streams, an event we cannot parse):
+                    # the task must not die silently and leave caches uninvalidated
+                    change_feed_restarts_total.inc(reason="unexpected")
+                    if self.mode == "auto":
+                        logger.error(f"Change stream failed ({type(e).__name__}: {e}), polling updated_at instead")
+                        break
+                    logger.error(f"Change stream failed, retrying in {delay:.0f}s: {type(e).__name__}: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, CHANGE_FEED_RETRY_MAX_SECONDS)
+        await self._poll()
+
+    async def _watch(self):
+        state = await self._load_state()
+        pipeline = [
+            {"$match": {
+                "ns.coll": {"$in": list(WATCHED_COLLECTIONS)},
+                "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+            }},
+            # Only what classify() reads; keeps events small even for big company documents
+            {"$project": {
+                "operationType": 1, "ns": 1,
+                "fullDocument.id": 1, "fullDocument.is_active": 1,
+                "updateDescription.updatedFields": 1, "updateDescription.removedFields": 1,
+            }},
+        ]
+        async with self._db.watch(
+            pipeline, full_document="updateLookup", resume_after=state.get("resume_token")
+        ) as stream:
+            change_feed_polling.set(0)
+            logger.info("Change feed watching " + ", ".join(WATCHED_COLLECTIONS))
+            saved_token, saved_at = state.get("resume_token"), asyncio.get_running_loop().time()
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    self._handle_change(change)
+                now = asyncio.get_running_loop().time()
+                if stream.resume_token != saved_token and (
+                        change is None or now - saved_at >= CHANGE_FEED_TOKEN_SAVE_SECONDS):
+                    saved_token, saved_at = stream.resume_token, now
+                    await self._save_state(resume_token=saved_token)
+
+    def _handle_change(self, change: dict):
+        collection = change["ns"]["coll"]
+        operation = change["operationType"]
+        document = change.get("fullDocument") or {}
+        if operation == "delete" or not document:
+            # Deletes only carry _id, and updateLookup misses documents deleted since
+            event = classify(collection, {}, None)._replace(entity_id=None)
+        elif operation == "update":
+            description = change.get("updateDescription") or {}
+            fields = tuple(description.get("updatedFields") or ()) + tuple(description.get("removedFields") or ())
+            event = classify(collection, document, fields)
+        else:
+            event = classify(collection, document, None)
+        self.dispatch(event, "stream")
+
+    async def _poll(self):
+        change_feed_polling.set(1)
+        watermarks = None
+        while True:
+            try:
+                if watermarks is None:
+                    for collection in WATCHED_COLLECTIONS:
+                        await self._db[collection].create_index("updated_at", name="updated_at")
+                    state = await self._load_state()
+                    now = datetime.utcnow().isoformat()
+                    watermarks = {collection: (state.get("watermarks") or {}).get(collection, now)
+                                  for collection in WATCHED_COLLECTIONS}
+                changed = False
+                for collection in WATCHED_COLLECTIONS:
+                    async for document in self._db[collection].find(
+                        {"updated_at": {"$gt": watermarks[collection]}},
+                        {"_id": 0, "id": 1, "is_active": 1, "updated_at": 1}
+                    ).sort("updated_at", 1).limit(1000):
+                        self.dispatch(classify(collection, document, None), "poll")
+                        watermarks[collection] = document['updated_at']
+                        changed = True
+                if changed:
+                    await self._save_state(watermarks=watermarks)
+            except PyMongoError as e:
+                change_feed_restarts_total.inc(reason="error")
+                logger.error(f"Change feed poll failed: {e}")
+            except Exception as e:
+                change_feed_restarts_total.inc(reason="unexpected")
+                logger.error(f"Change feed poll failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,257 @@
+"""Negotiated response compression (brotli / gzip)
+
+``CompressionMiddleware`` compresses complete JSON/text responses above
+COMPRESS_MIN_BYTES for clients that accept it. Streaming responses (more
+than one body message, e.g. server-sent events) and responses that already
+carry a Content-Encoding pass through untouched.
+
+Compression time is metered against COMPRESS_CPU_BUDGET, the share of one
+core a worker may spend compressing. When the budget is used up, responses
+go out uncompressed until it refills; a busy worker spends its CPU on
+requests rather than on saving bandwidth.
+
+``PrecompressedCatalog`` keeps the encoded bytes of cacheable catalog
+responses in the "catalog" cache namespace, so a repeat request skips both
+serialization and compression and a catalog invalidation drops them.
+
+Brotli needs the optional ``brotli`` package; without it only gzip is offered.
+"""
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_CPU_BUDGET = float(os.environ.get("COMPRESS_CPU_BUDGET", 0.25))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 4))
+# Precompressed payloads are encoded once per catalog generation, so spend more effort on them
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 9
+# Bodies this large are compressed on a worker thread instead of blocking the event loop
+COMPRESS_THREAD_MIN_BYTES = int(os.environ.get("COMPRESS_THREAD_MIN_BYTES", 65536))
+
+IDENTITY = "identity"
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+http_compression_total = metrics.REGISTRY.counter(
+    "http_compression_total", "Responses by compression outcome", ("encoding", "outcome"))
+http_compression_seconds = metrics.REGISTRY.histogram(
+    "http_compression_seconds", "Time spent compressing response bodies", ("encoding",))
+http_compression_saved_bytes = metrics.REGISTRY.counter(
+    "http_compression_saved_bytes", "Bytes not sent thanks to compression", ("encoding",))
+
+
+def available_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> str:
+    """Best encoding the client accepts: br over gzip at equal q, identity if neither"""
+    accepted = {}
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    best, best_q = IDENTITY, 0.0
+    for encoding in available_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else COMPRESS_BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else COMPRESS_GZIP_LEVEL)
+    return body
+
+
+async def compress_async(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    if len(body) < COMPRESS_THREAD_MIN_BYTES:
+        return compress(body, encoding, precompress)
+    return await asyncio.get_running_loop().run_in_executor(None, compress, body, encoding, precompress)
+
+
+class CpuBudget:
+    """Token bucket of compression seconds refilled at `share` seconds per second"""
+
+    def __init__(self, share: float, burst_seconds: float = 1.0):
+        self.share = share
+        self.capacity = share * burst_seconds
+        self._available = self.capacity
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.capacity, self._available + (now - self._refilled_at) * self.share)
+            self._refilled_at = now
+            return self._available > 0
+
+    def spend(self, seconds: float):
+        with self._lock:
+            self._available -= seconds
+
+
+def render_json(content: Any) -> bytes:
+    """Serialize like FastAPI's JSONResponse"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _weaken_etag(headers: MutableHeaders):
+    # A compressed body is a different representation; a strong ETag would claim byte equality
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["etag"] = "W/" + etag
+
+
+def _add_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = vary + ", Accept-Encoding"
+
+
+def encoded_response(body: bytes, encoding: str, headers: Optional[dict] = None,
+                     media_type: str = "application/json") -> Response:
+    """Response for a body already encoded with `encoding`"""
+    response = Response(content=body, media_type=media_type, headers=headers)
+    _add_vary(response.headers)
+    if encoding != IDENTITY:
+        response.headers["content-encoding"] = encoding
+        _weaken_etag(response.headers)
+    return response
+
+
+class PrecompressedCatalog:
+    """Encoded catalog payloads stored in the versioned cache, one entry per encoding"""
+
+    def __init__(self, cache, namespace: str = "catalog"):
+        self.cache = cache
+        self.namespace = namespace
+
+    async def get_or_render(self, key: str, encoding: str, render: Callable[[], Awaitable[Any]]) -> bytes:
+        """Encoded body for `key`; render() supplies the JSON-ready content on a miss"""
+        async def load():
+            body = render_json(await render())
+            return await compress_async(body, encoding, precompress=True)
+
+        body = await self.cache.get_or_load(self.namespace, f"http:{key}:{encoding}", load)
+        http_compression_total.inc(encoding=encoding, outcome="precompressed")
+        return body
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses for clients that accept it"""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, cpu_share: float = COMPRESS_CPU_BUDGET):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.budget = CpuBudget(cpu_share)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding == IDENTITY:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            passthrough = True
+            if message.get("more_body", False):
+                # Streaming response: forward as is rather than buffering it
+                await send(start_message)
+                await send(message)
+                return
+            await self._send_complete(start_message, message, encoding, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, start_message, body: bytes) -> bool:
+        status_code = start_message["status"]
+        if status_code < 200 or status_code in (204, 206, 304):
+            return False
+        headers = Headers(raw=start_message["headers"])
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith("text/event-stream"):
+            return False
+        return len(body) >= self.minimum_size
+
+    async def _send_complete(self, start_message, message, encoding: str, send):
+        body = message.get("body", b"")
+        if not self._compressible(start_message, body):
+            await send(start_message)
+            await send(message)
+            return
+        if not self.budget.allow():
+            http_compression_total.inc(encoding=IDENTITY, outcome="over_budget")
+            await send(start_message)
+            await send(message)
+            return
+
+        started = time.perf_counter()
+        compressed = await compress_async(body, encoding)
+        elapsed = time.perf_counter() - started
+        self.budget.spend(elapsed)
+        http_compression_seconds.observe(elapsed, encoding=encoding)
+
+        if len(compressed) >= len(body):
+            http_compression_total.inc(encoding=IDENTITY, outcome="incompressible")
+            await send(start_message)
+            await send(message)
+            return
+
+        http_compression_total.inc(encoding=encoding, outcome="compressed")
+        http_compression_saved_bytes.inc(len(body) - len(compressed), encoding=encoding)
+        headers = MutableHeaders(raw=start_message["headers"])
+        headers["content-encoding"] = encoding
+        headers["content-length"] = str(len(compressed))
+        _add_vary(headers)
+        _weaken_etag(headers)
+        await send(start_message)
+        await send({"type": "http.response.body", "body": compressed, "more_body": False})
@@ -0,0 +1,99 @@
+"""MongoDB client settings read from the environment
+
+Pool size and timeouts default to the driver's own defaults so behaviour only
+changes when a variable is set:
+
+    MONGO_MAX_POOL_SIZE              maxPoolSize (100)
+    MONGO_MIN_POOL_SIZE              minPoolSize (0), also opened on startup
+    MONGO_MAX_IDLE_TIME_MS           maxIdleTimeMS (unset: never)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS      waitQueueTimeoutMS (unset: wait forever)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS serverSelectionTimeoutMS (30000)
+    MONGO_CONNECT_TIMEOUT_MS         connectTimeoutMS (20000)
+    MONGO_SOCKET_TIMEOUT_MS          socketTimeoutMS (unset: none)
+    MONGO_APP_NAME                   appname shown in server logs/currentOp
+    MONGO_ANALYTICS_MAX_STALENESS_S  maxStalenessSeconds for analytics reads (90, the server minimum)
+    READ_ROUTES                      per-route read class overrides, e.g. "dashboard_stats=consistent"
+"""
+import asyncio
+import os
+from typing import Optional
+
+from pydantic import BaseModel, Field, ValidationError, model_validator
+
+_ENV_FIELDS = {
+    "max_pool_size": "MONGO_MAX_POOL_SIZE",
+    "min_pool_size": "MONGO_MIN_POOL_SIZE",
+    "max_idle_time_ms": "MONGO_MAX_IDLE_TIME_MS",
+    "wait_queue_timeout_ms": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "server_selection_timeout_ms": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "connect_timeout_ms": "MONGO_CONNECT_TIMEOUT_MS",
+    "socket_timeout_ms": "MONGO_SOCKET_TIMEOUT_MS",
+    "app_name": "MONGO_APP_NAME",
+    "analytics_max_staleness_seconds": "MONGO_ANALYTICS_MAX_STALENESS_S",
+    "read_routes": "READ_ROUTES",
+}
+
+
+class DBSettings(BaseModel):
+    mongo_url: str
+    db_name: str = "reservation_system"
+    max_pool_size: int = Field(100, ge=1)
+    min_pool_size: int = Field(0, ge=0)
+    max_idle_time_ms: Optional[int] = Field(None, gt=0)
+    wait_queue_timeout_ms: Optional[int] = Field(None, gt=0)
+    server_selection_timeout_ms: int = Field(30000, gt=0)
+    connect_timeout_ms: int = Field(20000, gt=0)
+    socket_timeout_ms: Optional[int] = Field(None, gt=0)
+    app_name: str = "corporate-reservation-api"
+    analytics_max_staleness_seconds: int = Field(90, ge=90)
+    read_routes: str = ""
+
+    @model_validator(mode="after")
+    def check_pool_bounds(self):
+        if self.min_pool_size > self.max_pool_size:
+            raise ValueError(
+                f"MONGO_MIN_POOL_SIZE ({self.min_pool_size}) exceeds MONGO_MAX_POOL_SIZE ({self.max_pool_size})")
+        return self
+
+    @classmethod
+    def from_env(cls, environ=None) -> "DBSettings":
+        """Build settings from environment variables; raises RuntimeError naming the bad variables"""
+        environ = os.environ if environ is None else environ
+        values = {"mongo_url": environ.get("MONGO_URL"), "db_name": environ.get("DB_NAME", "reservation_system")}
+        for field, variable in _ENV_FIELDS.items():
+            if environ.get(variable, "") != "":
+                values[field] = environ[variable]
+        try:
+            return cls(**values)
+        except ValidationError as e:
+            problems = []
+            for error in e.errors():
+                field = error["loc"][0] if error["loc"] else None
+                variable = _ENV_FIELDS.get(field) or (field.upper() if field else "pool")
+                problems.append(f"{variable}: {error['msg']}")
+            raise RuntimeError(f"Invalid MongoDB settings: {'; '.join(problems)}") from None
+
+    def client_kwargs(self) -> dict:
+        """Keyword arguments for AsyncIOMotorClient/MongoClient"""
+        kwargs = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "appname": self.app_name,
+        }
+        optional = {
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+        }
+        kwargs.update({key: value for key, value in optional.items() if value is not None})
+        return kwargs
+
+
+async def prewarm_pool(database, connections: int) -> int:
+    """Open `connections` pooled sockets up front by running that many pings concurrently"""
+    if connections <= 0:
+        return 0
+    await asyncio.gather(*(database.command("ping") for _ in range(connections)))
+    return connections
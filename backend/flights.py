@@ -0,0 +1,227 @@
+"""Flight search across several suppliers
+
+A supplier adapter is any object with a ``name``, a ``timeout`` in seconds
+and ``async search(query) -> List[dict]`` returning offers in the common
+shape (segments, cabin, price, currency, seats_left, refundable). Adapters
+are listed in FLIGHT_SUPPLIERS and built from ``SUPPLIER_FACTORIES``; the
+stubs below generate a deterministic schedule per route and day so the
+rest of the pipeline can be exercised without a GDS contract.
+
+``FlightSearch.search`` asks every supplier concurrently. A supplier that
+misses its deadline or fails is reported in the response and the others'
+offers are returned (``partial``). The same flight sold by several suppliers
+is merged into one fare at the cheapest price. Complete results are cached
+per (route, date, cabin) for FLIGHT_CACHE_TTL_SECONDS, and concurrent
+identical searches share a single fan-out. Policy annotation happens after
+the cache, per user, because it depends on the applicable booking rule.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from models import CabinClass, FlightSearchRequest
+
+FLIGHT_SUPPLIERS = os.environ.get("FLIGHT_SUPPLIERS", "stub-gds,stub-ndc")
+FLIGHT_SUPPLIER_TIMEOUT_SECONDS = float(os.environ.get("FLIGHT_SUPPLIER_TIMEOUT_SECONDS", 2.5))
+FLIGHT_CACHE_TTL_SECONDS = int(os.environ.get("FLIGHT_CACHE_TTL_SECONDS", 120))
+
+CABIN_RANK = {CabinClass.ECONOMY.value: 0, CabinClass.BUSINESS.value: 1, CabinClass.FIRST.value: 2}
+
+logger = logging.getLogger(__name__)
+
+flight_supplier_seconds = metrics.REGISTRY.histogram(
+    "flight_supplier_seconds", "Flight supplier search latency", ("supplier",))
+flight_supplier_results_total = metrics.REGISTRY.counter(
+    "flight_supplier_results_total", "Flight supplier calls by outcome", ("supplier", "status"))
+
+
+def cache_key(query: FlightSearchRequest) -> str:
+    return f"{query.origin}:{query.destination}:{query.departure_date.isoformat()}:{query.cabin.value}"
+
+
+def itinerary_key(offer: dict) -> str:
+    """Same flights in the same cabin are the same fare, whoever sells them"""
+    flights = "|".join(f"{s['carrier']}{s['flight_number']}@{s['departure_at']}" for s in offer['segments'])
+    return f"{flights}|{offer['cabin']}"
+
+
+def fare_id(key: str) -> str:
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def _seeded(*parts) -> random.Random:
+    return random.Random(hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest())
+
+
+class StubFlightSupplier:
+    """Deterministic fake supplier
+
+    The schedule (which flights operate) depends only on route and day, so
+    stubs overlap the way real suppliers do; which flights a stub sells, its
+    prices and its latency depend on its own name.
+    """
+
+    CARRIERS = ("TK", "PC", "AJ", "XQ")
+    CABIN_MULTIPLIER = {"economy": 1.0, "business": 3.2, "first": 5.5}
+
+    def __init__(self, name: str, currency: str = "TRY", base_price: tuple = (1200.0, 4200.0),
+                 coverage: float = 0.75, latency: tuple = (0.05, 0.3),
+                 timeout: float = FLIGHT_SUPPLIER_TIMEOUT_SECONDS):
+        self.name = name
+        self.currency = currency
+        self.base_price = base_price
+        self.coverage = coverage
+        self.latency = latency
+        self.timeout = timeout
+
+    def schedule(self, origin: str, destination: str, day: date) -> List[dict]:
+        rng = _seeded("schedule", origin, destination, day.isoformat())
+        flights = []
+        for _ in range(rng.randint(4, 10)):
+            departure = datetime.combine(day, datetime.min.time()) + timedelta(
+                hours=rng.randint(6, 22), minutes=rng.choice((0, 15, 30, 45))
+            )
+            carrier = rng.choice(self.CARRIERS)
+            flights.append({
+                "carrier": carrier,
+                "flight_number": str(rng.randint(100, 3999)),
+                "origin": origin,
+                "destination": destination,
+                "departure_at": departure.isoformat(),
+                "arrival_at": (departure + timedelta(minutes=rng.randint(55, 140))).isoformat(),
+            })
+        return sorted(flights, key=lambda f: f['departure_at'])
+
+    async def search(self, query: FlightSearchRequest) -> List[dict]:
+        rng = _seeded(self.name, cache_key(query))
+        await asyncio.sleep(rng.uniform(*self.latency))
+        offers = []
+        for segment in self.schedule(query.origin, query.destination, query.departure_date):
+            if rng.random() > self.coverage:
+                continue
+            price = rng.uniform(*self.base_price) * self.CABIN_MULTIPLIER[query.cabin.value]
+            offers.append({
+                "segments": [segment],
+                "cabin": query.cabin.value,
+                "price": round(price, 2),
+                "currency": self.currency,
+                "seats_left": rng.randint(1, 9),
+                "refundable": rng.random() < 0.3,
+            })
+        return offers
+
+
+SUPPLIER_FACTORIES: Dict[str, Callable[[], object]] = {
+    "stub-gds": lambda: StubFlightSupplier("stub-gds"),
+    "stub-ndc": lambda: StubFlightSupplier("stub-ndc", currency="EUR", base_price=(35.0, 120.0),
+                                           coverage=0.6, latency=(0.1, 0.6)),
+}
+
+
+def build_flight_suppliers(names: str = FLIGHT_SUPPLIERS) -> list:
+    suppliers = []
+    for name in filter(None, (n.strip() for n in names.split(","))):
+        if name not in SUPPLIER_FACTORIES:
+            raise RuntimeError(f"Unknown flight supplier '{name}', expected one of {sorted(SUPPLIER_FACTORIES)}")
+        suppliers.append(SUPPLIER_FACTORIES[name]())
+    return suppliers
+
+
+def policy_violations(fare: dict, limits: dict, departure_date: date, today: date) -> List[str]:
+    """Which of the rule's flight_limits this fare breaks; none when the limits are disabled"""
+    if not limits or not limits.get('enabled'):
+        return []
+    violations = []
+    if limits.get('max_price') is not None and fare['price_try'] > limits['max_price']:
+        violations.append("max_price")
+    restriction = limits.get('flight_class_restriction')
+    if restriction in CABIN_RANK and CABIN_RANK[fare['cabin']] > CABIN_RANK[restriction]:
+        violations.append("cabin_class")
+    if limits.get('min_days_before') is not None and (departure_date - today).days < limits['min_days_before']:
+        violations.append("min_days_before")
+    return violations
+
+
+class FlightSearch:
+    """Fan-out, merge and cache in front of the configured suppliers"""
+
+    def __init__(self, suppliers: list, cache, convert: Callable[[float, str], float],
+                 ttl: int = FLIGHT_CACHE_TTL_SECONDS):
+        self.suppliers = suppliers
+        self.cache = cache
+        self.convert = convert
+        self.ttl = ttl
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def _ask(self, supplier, query: FlightSearchRequest):
+        started = time.perf_counter()
+        offers = []
+        try:
+            offers = await asyncio.wait_for(supplier.search(query), supplier.timeout)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except Exception as e:
+            logger.error(f"Flight supplier {supplier.name} failed for {cache_key(query)}: {e}")
+            outcome = "error"
+        elapsed = time.perf_counter() - started
+        flight_supplier_seconds.observe(elapsed, supplier=supplier.name)
+        flight_supplier_results_total.inc(supplier=supplier.name, status=outcome)
+        status = {"name": supplier.name, "status": outcome, "fares": len(offers),
+                  "elapsed_ms": round(elapsed * 1000, 1)}
+        return status, [{**offer, "supplier": supplier.name} for offer in offers]
+
+    def merge(self, offers: List[dict]) -> List[dict]:
+        fares: Dict[str, dict] = {}
+        for offer in offers:
+            key = itinerary_key(offer)
+            fare = {**offer, "id": fare_id(key), "price_try": round(self.convert(offer['price'], offer['currency']), 2)}
+            existing = fares.get(key)
+            sellers = sorted({offer['supplier'], *(existing['offered_by'] if existing else ())})
+            if existing is None or fare['price_try'] < existing['price_try']:
+                existing = fares[key] = fare
+            existing['offered_by'] = sellers
+        return sorted(fares.values(), key=lambda fare: fare['price_try'])
+
+    async def _fan_out(self, query: FlightSearchRequest, key: str) -> dict:
+        stamp = self.cache.stamp("flights", key)
+        answers = await asyncio.gather(*(self._ask(supplier, query) for supplier in self.suppliers))
+        statuses = [status for status, _ in answers]
+        result = {
+            "fares": self.merge([offer for _, offers in answers for offer in offers]),
+            "suppliers": statuses,
+            "partial": any(status['status'] != "ok" for status in statuses),
+        }
+        # A partial answer is not cached: the next search gives the slow supplier another chance
+        if not result['partial']:
+            self.cache.set("flights", key, result, stamp, self.ttl)
+        return result
+
+    async def search(self, query: FlightSearchRequest, limits: Optional[dict] = None,
+                     today: Optional[date] = None) -> dict:
+        """Merged fares for the query with per-fare policy flags for `limits` (a rule's flight_limits)"""
+        key = cache_key(query)
+        result = self.cache.get("flights", key)
+        cached = result is not None
+        if not cached:
+            task = self._in_flight.get(key)
+            if task is None:
+                task = self._in_flight[key] = asyncio.ensure_future(self._fan_out(query, key))
+                task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            # Shielded: one client going away must not cancel the search others are waiting on
+            result = await asyncio.shield(task)
+
+        today = today or datetime.utcnow().date()
+        fares = []
+        for fare in result['fares']:
+            if fare['seats_left'] < query.passengers:
+                continue
+            violations = policy_violations(fare, limits, query.departure_date, today)
+            fares.append({**fare, "in_policy": not violations, "policy_violations": violations})
+        return {**result, "fares": fares, "cached": cached}
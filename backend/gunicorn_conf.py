@@ -0,0 +1,47 @@
+"""Multi-worker deployment: gunicorn managing uvicorn workers
+
+    pip install gunicorn
+    CACHE_BACKEND=shared gunicorn -c gunicorn_conf.py server:app
+
+Without gunicorn, uvicorn's own supervisor gives the same process layout:
+
+    CACHE_BACKEND=shared uvicorn server:app --host 0.0.0.0 --port 8001 --workers 4
+
+Each worker is a separate process with its own event loop, Motor client,
+bcrypt threads and metrics registry, so scrape /api/metrics per worker (or
+via the load balancer's sticky target). CACHE_BACKEND=shared keeps the
+principal, catalog and rule caches coherent across workers; the default
+in-process cache only sees its own worker's invalidations.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8001")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# server.py opens its Mongo client at import time; importing in the master
+# and forking would share driver sockets and threads between workers.
+preload_app = False
+
+timeout = int(os.environ.get("WORKER_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("KEEPALIVE", 5))
+
+# Recycle workers now and then so slow leaks can't accumulate
+max_requests = int(os.environ.get("MAX_REQUESTS", 0))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", 0))
+
+# bcrypt threads per worker; the default (cpu_count in every worker) oversubscribes the box
+raw_env = [f"BCRYPT_WORKERS={os.environ.get('BCRYPT_WORKERS', max(1, multiprocessing.cpu_count() // workers))}"]
+
+accesslog = os.environ.get("ACCESS_LOG", None)
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    if os.environ.get("CACHE_BACKEND", "local") != "shared" and workers > 1:
+        server.log.warning(
+            "Running %d workers with CACHE_BACKEND=local: cache invalidations stay inside one worker "
+            "until entries expire. Set CACHE_BACKEND=shared.", workers)
@@ -0,0 +1,89 @@
+"""Conditional GET helpers (ETag / Last-Modified / 304)"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Union
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+CATALOG_MAX_AGE_SECONDS = int(os.environ.get("CATALOG_MAX_AGE_SECONDS", 300))
+# Catalog data changes rarely: let the browser reuse it, then revalidate cheaply
+CATALOG_CACHE_CONTROL = f"private, max-age={CATALOG_MAX_AGE_SECONDS}, stale-while-revalidate=60"
+# Company settings must reflect edits immediately, but a 304 still saves the body
+COMPANY_CACHE_CONTROL = "private, no-cache"
+# Per-user payloads assembled on every request; the client revalidates sections itself
+PRIVATE_NO_STORE = "private, no-store"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that identify one version of a representation"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _as_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # HTTP dates have second precision
+    return value.replace(microsecond=0)
+
+
+def latest(values: Iterable[Union[str, datetime, None]]) -> Optional[datetime]:
+    parsed = [dt for dt in (_as_datetime(v) for v in values) if dt is not None]
+    return max(parsed) if parsed else None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence; If-Modified-Since is then ignored
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def validator_headers(etag: str, last_modified: Union[str, datetime, None], cache_control: str) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    modified = _as_datetime(last_modified)
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+    return headers
+
+
+def conditional(request: Request, response: Response, etag: str,
+                last_modified: Union[str, datetime, None], cache_control: str) -> Optional[Response]:
+    """304 response if the client's copy is current; otherwise sets validators on `response` and returns None"""
+    headers = validator_headers(etag, last_modified, cache_control)
+    if request.method in ("GET", "HEAD") and is_not_modified(request, etag, _as_datetime(last_modified)):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def etag_listed(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag among the ones the client holds"""
+    header = request.headers.get("if-none-match")
+    return header is not None and _etag_matches(header, etag)
+
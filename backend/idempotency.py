@@ -0,0 +1,169 @@
+"""Idempotency-Key support for create endpoints"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 60 * 60 * 24))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", 10000))
+# An in_progress claim older than this is presumed dead (crashed worker) and may be taken over
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", 60))
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+
+class _ResponseCache:
+    """Small in-process LRU of completed responses, keyed by (scope, key)"""
+
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, cache_key: tuple) -> Optional[dict]:
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(cache_key, None)
+            return None
+        self._entries.move_to_end(cache_key)
+        return record
+
+    def put(self, cache_key: tuple, record: dict) -> None:
+        self._entries[cache_key] = (time.monotonic() + self.ttl_seconds, record)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+_cache = _ResponseCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS)
+
+
+async def ensure_idempotency_indexes(db):
+    """Create the unique (scope, key) index and the TTL index on created_at"""
+    await db.idempotency_keys.create_index(
+        [("scope", 1), ("key", 1)], unique=True, name="scope_key_unique"
+    )
+    await db.idempotency_keys.create_index(
+        "created_at", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS, name="created_at_ttl"
+    )
+
+
+def hash_payload(payload: Any) -> str:
+    """Stable hash of a request body so a reused key with a different body is rejected"""
+    if isinstance(payload, BaseModel):
+        # Only what the client sent; defaults like BookingRule.id are regenerated per parse
+        payload = payload.model_dump(mode="json", exclude_unset=True)
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _replay(record: dict, request_hash: str, response: Optional[Response]):
+    if record.get("request_hash") != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+    if response is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+    return record["response"]
+
+
+async def run_idempotent(
+    db,
+    key: Optional[str],
+    scope: str,
+    payload: Any,
+    create: Callable[[], Awaitable[Any]],
+    response: Optional[Response] = None,
+):
+    """Run create() at most once per (scope, key) and replay its stored result on retries.
+
+    Concurrent duplicates race on the unique index: the first insert claims the
+    key, later ones see DuplicateKeyError and either replay the stored response
+    or get 409 while the first request is still running. A claim that is not
+    completed within IDEMPOTENCY_LEASE_SECONDS (the worker died before it could
+    release it) is taken over by the next retry.
+    """
+    if not key:
+        return await create()
+
+    request_hash = hash_payload(payload)
+    cache_key = (scope, key)
+
+    cached = _cache.get(cache_key)
+    metrics.record_cache("idempotency", cached is not None)
+    if cached is not None:
+        return _replay(cached, request_hash, response)
+
+    now = datetime.utcnow()
+    # Millisecond precision, as BSON stores it, so the claim can be matched exactly later
+    claimed_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    try:
+        await db.idempotency_keys.insert_one({
+            "scope": scope,
+            "key": key,
+            "request_hash": request_hash,
+            "status": STATUS_IN_PROGRESS,
+            # TTL indexes only expire BSON dates, so this stays a datetime
+            "created_at": claimed_at,
+            "claimed_at": claimed_at,
+        })
+    except DuplicateKeyError:
+        record = await db.idempotency_keys.find_one({"scope": scope, "key": key}, {"_id": 0})
+        if record is not None and record.get("status") == STATUS_COMPLETED:
+            _cache.put(cache_key, record)
+            return _replay(record, request_hash, response)
+        taken_over = None
+        lease_expired_before = claimed_at - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+        if record is not None and record.get("claimed_at", record["created_at"]) < lease_expired_before:
+            if record.get("request_hash") != request_hash:
+                _replay(record, request_hash, response)  # Raises the 422
+            # Conditional on the stale claim, so only one retry takes it over
+            taken_over = await db.idempotency_keys.find_one_and_update(
+                {"scope": scope, "key": key, "status": STATUS_IN_PROGRESS,
+                 "claimed_at": record.get("claimed_at")},
+                {"$set": {"claimed_at": claimed_at}},
+                return_document=ReturnDocument.AFTER
+            )
+        if taken_over is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is already in progress"
+            )
+
+    completed = False
+    try:
+        result = await create()
+        record = {
+            "request_hash": request_hash,
+            "status": STATUS_COMPLETED,
+            "response": jsonable_encoder(result),
+        }
+        await db.idempotency_keys.update_one(
+            {"scope": scope, "key": key},
+            {"$set": {"status": STATUS_COMPLETED, "response": record["response"]}}
+        )
+        completed = True
+    finally:
+        if not completed:
+            # Failed, cancelled (client gone, shutdown) or unrecorded attempts must not pin the key.
+            # Only our own claim: a retry may have taken a stale one over meanwhile
+            await db.idempotency_keys.delete_one({"scope": scope, "key": key, "claimed_at": claimed_at})
+    _cache.put(cache_key, record)
+    return result
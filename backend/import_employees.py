@@ -0,0 +1,282 @@
+"""Bulk import employees from a CSV or JSON file
+
+Usage:
+    python import_employees.py employees.csv --company-id <id>
+    python import_employees.py employees.jsonl --company-id <id> --chunk-size 2000 --workers 8
+
+CSV columns: email, password, full_name, phone, role, department,
+requires_approval, approver_id (or approver_email). JSON files may hold a
+list of objects or one object per line (.jsonl/.ndjson).
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from auth import get_password_hash
+from models import EmployeeCreate, User, UserRole
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ.get('DB_NAME', 'reservation_system')]
+
+TRUE_VALUES = {"1", "true", "yes", "evet", "y"}
+
+
+def iter_rows(path: Path) -> Iterator[dict]:
+    """Stream raw rows from a CSV, JSON list or JSON-lines file"""
+    suffix = path.suffix.lower()
+    with open(path, encoding="utf-8-sig") as f:
+        if suffix == ".csv":
+            yield from csv.DictReader(f)
+        elif suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def iter_chunks(rows: Iterator[dict], size: int) -> Iterator[List[tuple]]:
+    """Group rows into (row_number, row) chunks; row numbers are 1-based"""
+    chunk = []
+    for number, row in enumerate(rows, start=1):
+        chunk.append((number, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    """Runs in a worker process"""
+    return [get_password_hash(password) for password in passwords]
+
+
+def _normalize(row: dict, company_id: Optional[str]) -> dict:
+    """Turn CSV strings into EmployeeCreate input"""
+    data = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+    data = {k: v for k, v in data.items() if v not in ("", None)}
+    if company_id and not data.get('company_id'):
+        data['company_id'] = company_id
+    if isinstance(data.get('requires_approval'), str):
+        data['requires_approval'] = data['requires_approval'].lower() in TRUE_VALUES
+    if data.get('email'):
+        data['email'] = data['email'].lower()
+    return data
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.inserted = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+
+    def error(self, row_number: int, email: Optional[str], message: str):
+        self.errors.append({"row": row_number, "email": email, "error": message})
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+
+async def _resolve_approvers(approver_ids: set, approver_emails: set, known: Dict[str, dict]):
+    """Load unseen approvers by id and email in one query each; results are cached in known"""
+    missing_ids = [i for i in approver_ids if i not in known]
+    missing_emails = [e for e in approver_emails if e not in known]
+    projection = {"_id": 0, "id": 1, "email": 1, "role": 1}
+    if missing_ids:
+        async for user in db.users.find({"id": {"$in": missing_ids}}, projection):
+            known[user['id']] = user
+    if missing_emails:
+        async for user in db.users.find({"email": {"$in": missing_emails}}, projection):
+            known[user['email']] = user
+            known[user['id']] = user
+
+
+async def import_chunk(
+    chunk: List[tuple],
+    company_id: Optional[str],
+    pool: ProcessPoolExecutor,
+    workers: int,
+    seen_emails: set,
+    approvers: Dict[str, dict],
+    report: ImportReport,
+    dry_run: bool = False,
+):
+    """Validate, de-duplicate, hash and insert one chunk of rows"""
+    report.total += len(chunk)
+    valid = []
+    for number, row in chunk:
+        data = _normalize(row, company_id)
+        approver_email = data.pop('approver_email', None)
+        try:
+            employee = EmployeeCreate(**data)
+        except ValidationError as e:
+            report.error(number, data.get('email'), "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        if employee.email in seen_emails:
+            report.error(number, employee.email, "Duplicate email in import file")
+            continue
+        seen_emails.add(employee.email)
+        valid.append((number, employee, approver_email))
+
+    if not valid:
+        return
+
+    # Batched lookups instead of one query per row
+    emails = [employee.email for _, employee, _ in valid]
+    existing = set()
+    async for user in db.users.find({"email": {"$in": emails}}, {"_id": 0, "email": 1}):
+        existing.add(user['email'])
+    await _resolve_approvers(
+        {employee.approver_id for _, employee, _ in valid if employee.approver_id},
+        {email.lower() for _, _, email in valid if email},
+        approvers,
+    )
+
+    accepted = []
+    for number, employee, approver_email in valid:
+        if employee.email in existing:
+            report.error(number, employee.email, "Email already registered")
+            continue
+        approver_key = employee.approver_id or (approver_email.lower() if approver_email else None)
+        if approver_key:
+            approver = approvers.get(approver_key)
+            if not approver:
+                report.error(number, employee.email, "Approver not found")
+                continue
+            if approver.get('role') not in [UserRole.MANAGER, UserRole.ADMIN]:
+                report.error(number, employee.email, "Approver must be a manager or admin")
+                continue
+            employee.approver_id = approver['id']
+        accepted.append((number, employee))
+
+    if dry_run:
+        report.inserted += len(accepted)
+        return
+    if not accepted:
+        return
+
+    # bcrypt dominates; spread it across all cores
+    passwords = [employee.password for _, employee in accepted]
+    slice_size = max(1, -(-len(passwords) // workers))
+    loop = asyncio.get_running_loop()
+    hashed_slices = await asyncio.gather(*(
+        loop.run_in_executor(pool, _hash_many, passwords[i:i + slice_size])
+        for i in range(0, len(passwords), slice_size)
+    ))
+    hashes = [h for hashed in hashed_slices for h in hashed]
+
+    documents = []
+    for (number, employee), password_hash in zip(accepted, hashes):
+        user = User(
+            email=employee.email,
+            full_name=employee.full_name,
+            phone=employee.phone,
+            role=employee.role,
+            company_id=employee.company_id,
+            department=employee.department,
+            requires_approval=employee.requires_approval,
+            approver_id=employee.approver_id,
+            password_hash=password_hash
+        )
+        user_dict = user.model_dump()
+        user_dict['created_at'] = user_dict['created_at'].isoformat()
+        user_dict['updated_at'] = user_dict['updated_at'].isoformat()
+        documents.append(user_dict)
+
+    try:
+        result = await db.users.insert_many(documents, ordered=False)
+        report.inserted += len(result.inserted_ids)
+    except BulkWriteError as e:
+        failed = {err['index'] for err in e.details.get('writeErrors', [])}
+        for err in e.details.get('writeErrors', []):
+            number, employee = accepted[err['index']]
+            report.error(number, employee.email, err.get('errmsg', 'Insert failed'))
+        report.inserted += len(documents) - len(failed)
+
+
+async def run_import(
+    path: Path,
+    company_id: Optional[str],
+    chunk_size: int,
+    workers: int,
+    dry_run: bool = False,
+) -> ImportReport:
+    report = ImportReport()
+    seen_emails: set = set()
+    approvers: Dict[str, dict] = {}
+
+    if company_id and not await db.companies.find_one({"id": company_id}, {"_id": 1}):
+        raise SystemExit(f"Company not found: {company_id}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in iter_chunks(iter_rows(path), chunk_size):
+            await import_chunk(chunk, company_id, pool, workers, seen_emails, approvers, report, dry_run)
+            print(f"  ... {report.total} rows processed, {report.inserted} inserted, "
+                  f"{len(report.errors)} errors ({report.rows_per_second:.0f} rows/s)")
+    report.errors.sort(key=lambda error: error['row'])
+    return report
+
+
+def write_errors(report: ImportReport, path: Path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["row", "email", "error"])
+        writer.writeheader()
+        writer.writerows(report.errors)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk import employees")
+    parser.add_argument("path", type=Path, help="CSV, JSON or JSON-lines file")
+    parser.add_argument("--company-id", help="Company for rows without company_id")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Password hashing processes (default: all cores)")
+    parser.add_argument("--errors-out", type=Path, help="Write per-row errors to this CSV")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, insert nothing")
+    args = parser.parse_args()
+
+    print("=== Employee Import ===\n")
+    report = await run_import(args.path, args.company_id, args.chunk_size, args.workers, args.dry_run)
+
+    print(f"\n✓ {report.inserted} of {report.total} employees "
+          f"{'valid' if args.dry_run else 'imported'} in {report.elapsed:.1f}s "
+          f"({report.rows_per_second:.0f} rows/s)")
+    if report.errors:
+        print(f"✗ {len(report.errors)} rows rejected")
+        for error in report.errors[:20]:
+            print(f"  - row {error['row']} ({error['email']}): {error['error']}")
+        if len(report.errors) > 20:
+            print(f"  ... {len(report.errors) - 20} more")
+        if args.errors_out:
+            write_errors(report, args.errors_out)
+            print(f"  Errors written to {args.errors_out}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,332 @@
+"""Durable background jobs stored in MongoDB
+
+Request handlers enqueue small job documents; workers claim them one at a
+time with an atomic ``find_one_and_update`` that sets a lease. A worker
+extends its lease while a job runs. If the worker dies, the lease expires
+and another worker picks the job up again.
+
+Failures are retried with exponential backoff until ``max_attempts``;
+after that the job is dead-lettered (status ``dead``) and kept for
+inspection and a manual retry via ``/api/admin/jobs``.
+
+Workers run inside the API process (JOBS_WORKER=inprocess, the default) or
+as a separate process:
+
+    JOBS_WORKER=off uvicorn server:app ...
+    python jobs.py --concurrency 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+import metrics
+from db_settings import DBSettings
+
+JOBS_WORKER = os.environ.get("JOBS_WORKER", "inprocess")
+JOBS_CONCURRENCY = int(os.environ.get("JOBS_CONCURRENCY", 2))
+JOBS_LEASE_SECONDS = int(os.environ.get("JOBS_LEASE_SECONDS", 60))
+JOBS_POLL_INTERVAL_SECONDS = float(os.environ.get("JOBS_POLL_INTERVAL_SECONDS", 2.0))
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", 5))
+JOBS_BACKOFF_BASE_SECONDS = float(os.environ.get("JOBS_BACKOFF_BASE_SECONDS", 10))
+JOBS_BACKOFF_MAX_SECONDS = float(os.environ.get("JOBS_BACKOFF_MAX_SECONDS", 3600))
+JOBS_RETENTION_SECONDS = int(os.environ.get("JOBS_RETENTION_SECONDS", 7 * 24 * 3600))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+logger = logging.getLogger(__name__)
+
+jobs_enqueued_total = metrics.REGISTRY.counter(
+    "jobs_enqueued_total", "Jobs added to the queue", ("type",))
+jobs_finished_total = metrics.REGISTRY.counter(
+    "jobs_finished_total", "Job attempts by outcome (done, retry, dead)", ("type", "outcome"))
+job_duration_seconds = metrics.REGISTRY.histogram(
+    "job_duration_seconds", "Handler run time per attempt", ("type",))
+job_queue_delay_seconds = metrics.REGISTRY.histogram(
+    "job_queue_delay_seconds", "Time from run_at to claim", ("type",))
+
+JobHandler = Callable[[object, dict], Awaitable[None]]
+
+# Job type -> handler(db, payload); filled by @job_handler in the modules that define them
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+_local_workers = set()
+
+
+def job_handler(job_type: str):
+    """Register an async handler(db, payload) for a job type"""
+    def register(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = func
+        return func
+    return register
+
+
+async def ensure_job_indexes(db):
+    """Claim order, lease expiry, enqueue de-duplication and cleanup of finished jobs"""
+    await db.jobs.create_index("id", unique=True, name="id_unique")
+    await db.jobs.create_index([("status", 1), ("run_at", 1)], name="status_run_at")
+    await db.jobs.create_index([("status", 1), ("lease_until", 1)], name="status_lease_until")
+    await db.jobs.create_index(
+        "dedupe_key", unique=True, name="dedupe_key_unique",
+        partialFilterExpression={"dedupe_key": {"$type": "string"}}
+    )
+    # TTL indexes only expire BSON dates; dead jobs have no finished_at and are kept
+    await db.jobs.create_index(
+        "finished_at", expireAfterSeconds=JOBS_RETENTION_SECONDS, name="finished_at_ttl"
+    )
+
+
+def new_job(job_type: str, payload: dict, dedupe_key: Optional[str] = None,
+            run_at: Optional[datetime] = None, max_attempts: int = JOBS_MAX_ATTEMPTS) -> dict:
+    now = datetime.utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "type": job_type,
+        "payload": payload,
+        "status": QUEUED,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        # Scheduling fields stay BSON dates so claims compare them and TTL can expire them
+        "run_at": run_at or now,
+        "lease_until": None,
+        "locked_by": None,
+        "last_error": None,
+        "created_at": now,
+        "finished_at": None,
+    }
+    if dedupe_key:
+        job["dedupe_key"] = dedupe_key
+    return job
+
+
+async def enqueue(db, *jobs: dict) -> int:
+    """Insert jobs; ones whose dedupe_key is already queued or done are skipped. Returns the count added."""
+    if not jobs:
+        return 0
+    try:
+        result = await db.jobs.insert_many([dict(job) for job in jobs], ordered=False)
+        added = len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        added = e.details.get("nInserted", 0)
+    for job in jobs:
+        jobs_enqueued_total.inc(type=job["type"])
+    for worker in _local_workers:
+        worker.wake()
+    return added
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(JOBS_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), JOBS_BACKOFF_MAX_SECONDS)
+    # Jitter keeps jobs that failed together from retrying together
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def retry_dead_job(db, job_id: str) -> Optional[dict]:
+    """Requeue a dead-lettered job with a fresh attempt budget"""
+    return await db.jobs.find_one_and_update(
+        {"id": job_id, "status": DEAD},
+        {"$set": {"status": QUEUED, "attempts": 0, "run_at": datetime.utcnow(), "last_error": None}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+class JobWorker:
+    """Claims and runs jobs with `concurrency` asyncio tasks"""
+
+    def __init__(self, db=None, handlers: Optional[Dict[str, JobHandler]] = None,
+                 concurrency: int = JOBS_CONCURRENCY, lease_seconds: int = JOBS_LEASE_SECONDS,
+                 poll_interval: float = JOBS_POLL_INTERVAL_SECONDS):
+        self.db = db
+        self.handlers = JOB_HANDLERS if handlers is None else handlers
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def start(self, db=None):
+        """Start the claim loops on the running loop (call from startup)"""
+        if self._tasks:
+            return
+        if db is not None:
+            self.db = db
+        self._stopping = False
+        self._wake = asyncio.Event()
+        _local_workers.add(self)
+        self._tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+
+    async def run(self):
+        """Run until stop() or cancellation (separate worker process)"""
+        self.start()
+        await asyncio.gather(*self._tasks)
+
+    def wake(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self, grace_seconds: float = 10.0):
+        """Let running jobs finish for up to grace_seconds; unfinished ones are retried after their lease expires"""
+        self._stopping = True
+        _local_workers.discard(self)
+        self.wake()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=grace_seconds)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self):
+        while not self._stopping:
+            try:
+                if await self.run_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.db.jobs.find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "run_at": {"$lte": now}},
+                # A worker that died mid-job leaves an expired lease behind
+                {"status": RUNNING, "lease_until": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "locked_by": self.worker_id,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def run_once(self) -> bool:
+        """Claim and run one job; False when nothing is due"""
+        job = await self.claim()
+        if job is None:
+            return False
+        job_queue_delay_seconds.observe(
+            max(0.0, (datetime.utcnow() - job["run_at"]).total_seconds()), type=job["type"])
+
+        handler = self.handlers.get(job["type"])
+        if handler is None:
+            await self._finish(job, f"No handler registered for job type '{job['type']}'", retry=False)
+            return True
+        if job["attempts"] > job["max_attempts"]:
+            # Claimed again after its lease expired too often: the job keeps killing workers
+            await self._finish(job, job.get("last_error") or "Lease expired on every attempt", retry=False)
+            return True
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.perf_counter()
+        try:
+            await handler(self.db, job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self._finish(job, traceback.format_exc(limit=5))
+        else:
+            await self._finish(job)
+        finally:
+            heartbeat.cancel()
+            job_duration_seconds.observe(time.perf_counter() - started, type=job["type"])
+        return True
+
+    async def _heartbeat(self, job: dict):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            result = await self.db.jobs.update_one(
+                {"id": job["id"], "locked_by": self.worker_id, "status": RUNNING},
+                {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+            )
+            if result.matched_count == 0:
+                logger.warning(f"Lost the lease on job {job['id']} ({job['type']})")
+                return
+
+    async def _finish(self, job: dict, error: Optional[str] = None, retry: bool = True):
+        now = datetime.utcnow()
+        if error is None:
+            outcome, update = DONE, {"status": DONE, "finished_at": now, "lease_until": None}
+        elif retry and job["attempts"] < job["max_attempts"]:
+            outcome = "retry"
+            update = {
+                "status": QUEUED, "last_error": error, "lease_until": None, "locked_by": None,
+                "run_at": now + timedelta(seconds=backoff_seconds(job["attempts"])),
+            }
+        else:
+            outcome, update = DEAD, {"status": DEAD, "last_error": error, "lease_until": None, "dead_at": now}
+            logger.error(f"Job {job['id']} ({job['type']}) dead-lettered after {job['attempts']} attempts")
+        # Only the lease holder may settle the job
+        await self.db.jobs.update_one({"id": job["id"], "locked_by": self.worker_id}, {"$set": update})
+        jobs_finished_total.inc(type=job["type"], outcome=outcome)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--concurrency", type=int, default=JOBS_CONCURRENCY)
+    parser.add_argument("--drain", action="store_true", help="Exit once no job is due")
+    args = parser.parse_args()
+
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Imported for their @job_handler registrations; after load_dotenv so they see MAIL_* and friends
+    import notifications  # noqa: F401
+    import archival  # noqa: F401
+
+    settings = DBSettings.from_env()
+    client = AsyncIOMotorClient(settings.mongo_url, **settings.client_kwargs())
+    db = client[settings.db_name]
+    await ensure_job_indexes(db)
+
+    worker = JobWorker(db, concurrency=args.concurrency)
+    logger.info(f"Job worker {worker.worker_id} handling {sorted(worker.handlers)}")
+    try:
+        if args.drain:
+            while await worker.run_once():
+                pass
+        else:
+            await worker.run()
+    finally:
+        await worker.stop()
+        client.close()
+
+
+if __name__ == "__main__":
+    # Run main() from the importable module: handler modules register into jobs.JOB_HANDLERS,
+    # which would be a different dict from this __main__ copy
+    import jobs
+    try:
+        asyncio.run(jobs.main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,249 @@
+"""Server-push reservation updates (Server-Sent Events)
+
+The booking path publishes a ``ReservationLiveEvent`` after every create and
+status change. Each open ``GET /api/events/stream`` connection holds one
+``Subscription`` and receives only the events whose reservation it could
+read through ``GET /reservations`` (its ``_reservation_scope``), plus the
+ones routed to it as approver. Clients load the list once per connection
+(on the ``ready`` event) and apply deltas afterwards, instead of polling.
+
+Publishing goes through a backend chosen by LIVE_BACKEND:
+
+- ``local`` (default): delivered in-process; enough for a single worker.
+- ``mongo``: events are appended to the capped ``live_events`` collection
+  and every worker tails it, so subscribers on any worker see events
+  published by all of them.
+
+A subscriber that falls LIVE_QUEUE_SIZE events behind gets one ``resync``
+event instead of the backlog and reloads its list.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Optional, Set
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+import metrics
+
+LIVE_BACKEND = os.environ.get("LIVE_BACKEND", "local")
+LIVE_QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", 100))
+LIVE_HEARTBEAT_SECONDS = float(os.environ.get("LIVE_HEARTBEAT_SECONDS", 15.0))
+LIVE_EVENTS_CAPPED_BYTES = int(os.environ.get("LIVE_EVENTS_CAPPED_BYTES", 16 * 1024 * 1024))
+# Events published this long before a tail (re)opens are still delivered; ids filter the repeats
+LIVE_TAIL_SLACK_SECONDS = 5.0
+
+logger = logging.getLogger(__name__)
+
+live_subscribers = metrics.REGISTRY.gauge(
+    "live_subscribers", "Open event-stream connections on this worker")
+live_events_published_total = metrics.REGISTRY.counter(
+    "live_events_published_total", "Live events published", ("type",))
+live_events_delivered_total = metrics.REGISTRY.counter(
+    "live_events_delivered_total", "Live events queued for a subscriber")
+live_resyncs_total = metrics.REGISTRY.counter(
+    "live_resyncs_total", "Subscribers that fell behind and were told to reload")
+
+Deliver = Callable[[dict], None]
+
+# Queued in place of the events a slow subscriber missed
+RESYNC = {"type": "resync", "id": None}
+
+
+def format_sse(event: str, data: Optional[dict] = None, event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data or {}, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """One open stream: a bounded queue plus the reservation scope it may see"""
+
+    def __init__(self, user_id: str, scope: dict, queue_size: int = LIVE_QUEUE_SIZE):
+        self.user_id = user_id
+        self.scope = scope
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def matches(self, event: dict) -> bool:
+        if event.get('approver_id') == self.user_id:
+            return True
+        return all(event.get(field) == value for field, value in self.scope.items())
+
+    def offer(self, event: dict) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Replacing the backlog with one marker is cheaper for everyone than replaying it
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            live_resyncs_total.inc()
+            return False
+
+    def close(self):
+        self.closed = True
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class LocalLiveBackend:
+    """Single worker: publishing is delivering"""
+
+    def __init__(self):
+        self._deliver: Deliver = lambda event: None
+
+    async def start(self, db, deliver: Deliver):
+        self._deliver = deliver
+
+    async def publish(self, event: dict):
+        self._deliver(event)
+
+    async def stop(self):
+        pass
+
+
+class MongoLiveBackend:
+    """Capped collection shared by all workers, each tailing it with an await cursor"""
+
+    def __init__(self, collection: str = "live_events", size_bytes: int = LIVE_EVENTS_CAPPED_BYTES):
+        self.collection_name = collection
+        self.size_bytes = size_bytes
+        self._task: Optional[asyncio.Task] = None
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    async def start(self, db, deliver: Deliver):
+        try:
+            await db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # Created by another worker
+        self._collection = db[self.collection_name]
+        self._task = asyncio.create_task(self._tail(deliver))
+
+    async def publish(self, event: dict):
+        await self._collection.insert_one({"event": event, "at": datetime.utcnow()})
+
+    def _first_time(self, event_id: str) -> bool:
+        if event_id in self._seen:
+            return False
+        self._seen[event_id] = None
+        if len(self._seen) > 10000:
+            self._seen.popitem(last=False)
+        return True
+
+    async def _tail(self, deliver: Deliver):
+        since = datetime.utcnow()
+        while True:
+            try:
+                cursor = self._collection.find(
+                    {"at": {"$gte": since - timedelta(seconds=LIVE_TAIL_SLACK_SECONDS)}},
+                    cursor_type=CursorType.TAILABLE_AWAIT
+                )
+                while cursor.alive:
+                    async for document in cursor:
+                        since = max(since, document['at'])
+                        if self._first_time(document['event']['id']):
+                            deliver(document['event'])
+                    await asyncio.sleep(0)
+            except PyMongoError as e:
+                logger.error(f"Live event tail failed: {e}")
+            # The cursor dies on an empty collection or after falling off the capped end
+            await asyncio.sleep(1.0)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def build_live_backend(backend: str = LIVE_BACKEND):
+    if backend == "local":
+        return LocalLiveBackend()
+    if backend == "mongo":
+        return MongoLiveBackend()
+    raise RuntimeError(f"LIVE_BACKEND must be 'local' or 'mongo', got '{backend}'")
+
+
+class LiveBroker:
+    """Routes published events to the matching subscriptions of this worker"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or build_live_backend()
+        self._subscriptions: Set[Subscription] = set()
+        self._started = False
+
+    async def start(self, db):
+        if not self._started:
+            await self.backend.start(db, self.deliver)
+            self._started = True
+
+    async def stop(self):
+        for subscription in list(self._subscriptions):
+            subscription.close()
+        await self.backend.stop()
+        self._started = False
+
+    async def publish(self, event: dict):
+        """Best effort: a failed publish costs clients a delta, never the booking"""
+        try:
+            await self.backend.publish(event)
+            live_events_published_total.inc(type=event['type'])
+        except Exception as e:
+            logger.error(f"Live event {event.get('type')} for {event.get('reservation_id')} not published: {e}")
+
+    def deliver(self, event: dict):
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event) and subscription.offer(event):
+                live_events_delivered_total.inc()
+
+    def subscribe(self, user_id: str, scope: dict) -> Subscription:
+        subscription = Subscription(user_id, scope)
+        self._subscriptions.add(subscription)
+        live_subscribers.set(len(self._subscriptions))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+        live_subscribers.set(len(self._subscriptions))
+
+    def disconnect_user(self, user_id: Optional[str]):
+        """End the streams of a user (e.g. deactivated); None ends every stream"""
+        for subscription in list(self._subscriptions):
+            if user_id is None or subscription.user_id == user_id:
+                subscription.close()
+
+    async def stream(self, subscription: Subscription, is_disconnected,
+                     heartbeat: float = LIVE_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        """SSE body for one subscription; ends when the client goes away or the stream is closed"""
+        try:
+            yield format_sse("ready")
+            while not subscription.closed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    # Comment line: keeps proxies from timing out an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                if event is RESYNC:
+                    yield format_sse("resync")
+                    continue
+                yield format_sse(event['type'], event, event['id'])
+        finally:
+            self.unsubscribe(subscription)
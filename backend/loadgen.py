@@ -0,0 +1,353 @@
+"""Load generator with user journeys against a running server
+
+Simulates concurrent users hitting a deployed API over HTTP:
+
+- employee:      login -> search hotels -> hotel detail -> book
+- manager:       login -> list pending approvals -> approve one
+- agency_admin:  login -> list companies -> read fees -> write fees back
+
+Open-loop mode starts journeys at fixed arrival rates (Poisson) regardless of
+how the server keeps up, which exposes queueing; closed-loop mode runs N
+virtual users back-to-back and ramps N until throughput stops growing to find
+the max sustainable RPS. Accounts are sampled from the target database, e.g.
+one loaded with synthetic_data.py.
+
+Usage:
+    python loadgen.py --base-url http://localhost:8001 --rate employee=5,manager=1,agency_admin=0.2 --duration 60
+    python loadgen.py --base-url http://localhost:8001 --closed --ramp 1,2,4,8,16,32,64 --step-duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from benchmark import summarize
+from synthetic_data import SYNTHETIC_PASSWORD
+
+ROOT_DIR = Path(__file__).parent
+ROLES = ("employee", "manager", "agency_admin")
+
+
+class StepRecorder:
+    """Latency samples and outcomes per journey step"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.journeys = Counter()
+        self.failed_journeys = Counter()
+        self.shed = Counter()
+        self.completions: List[float] = []
+
+    def record(self, step: str, elapsed: float, status: int, expected=()):
+        self.latencies[step].append(elapsed)
+        if (status >= 400 or status == 0) and status not in expected:
+            self.errors[step][str(status)] += 1
+        self.completions.append(time.perf_counter())
+
+    def report(self, elapsed: float) -> dict:
+        steps = {}
+        for step in sorted(self.latencies):
+            errors = self.errors[step]
+            summary = summarize(self.latencies[step], sum(errors.values()), elapsed)
+            summary["error_rate"] = round(summary["errors"] / summary["requests"], 4) if summary["requests"] else 0.0
+            summary["errors_by_status"] = dict(errors)
+            steps[step] = summary
+        total = sum(len(values) for values in self.latencies.values())
+        errors = sum(sum(counter.values()) for counter in self.errors.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "journeys": dict(self.journeys),
+            "failed_journeys": dict(self.failed_journeys),
+            "shed_journeys": dict(self.shed),
+            "steps": steps,
+        }
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class Journeys:
+    """The three user journeys, timed step by step"""
+
+    def __init__(self, client, recorder: StepRecorder, accounts: Dict[str, List[dict]],
+                 cities: List[str], password: str, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.accounts = accounts
+        self.cities = cities
+        self.password = password
+        self.rng = rng
+
+    async def _call(self, step: str, method: str, path: str, token: Optional[str] = None, body=None,
+                    expected=()):
+        """Timed request; statuses in `expected` are normal outcomes, not errors (returns None)"""
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, json=body, headers=headers)
+            status = response.status_code
+        except Exception:
+            self.recorder.record(step, time.perf_counter() - started, 0)
+            raise JourneyFailed(step)
+        self.recorder.record(step, time.perf_counter() - started, status, expected)
+        if status in expected:
+            return None
+        if status >= 400:
+            raise JourneyFailed(step)
+        return response.json() if response.content else None
+
+    async def _login(self, role: str) -> dict:
+        account = self.rng.choice(self.accounts[role])
+        return await self._call(f"{role}.login", "POST", "/api/auth/login",
+                                body={"email": account["email"], "password": self.password})
+
+    async def employee(self):
+        login = await self._login("employee")
+        token, me = login["access_token"], login["user"]
+        check_in = date.today() + timedelta(days=self.rng.randint(7, 60))
+        check_out = check_in + timedelta(days=self.rng.randint(1, 4))
+        hotels = await self._call("employee.search", "POST", "/api/hotels/search", token, {
+            "city": self.rng.choice(self.cities), "check_in_date": check_in.isoformat(),
+            "check_out_date": check_out.isoformat(), "guests": 1,
+        })
+        if not hotels:
+            return
+        hotel = await self._call("employee.hotel_detail", "GET", f"/api/hotels/{self.rng.choice(hotels)['id']}", token)
+        await self._call("employee.book", "POST", "/api/reservations", token, {
+            "service_type": "hotel", "user_id": me["id"], "company_id": me["company_id"],
+            "hotel_id": hotel["id"], "room_type_id": self.rng.choice(hotel["room_types"])["id"],
+            "check_in_date": check_in.isoformat(), "check_out_date": check_out.isoformat(), "guests": 1,
+        })
+
+    async def manager(self):
+        token = (await self._login("manager"))["access_token"]
+        pending = await self._call("manager.list_pending", "GET", "/api/approvals/pending?limit=20", token)
+        if not pending["reservations"]:
+            return
+        reservation = self.rng.choice(pending["reservations"])
+        # Another manager may have decided it first; that 409 is an expected outcome
+        await self._call("manager.approve", "PUT", f"/api/reservations/{reservation['id']}", token,
+                         {"status": "approved"}, expected=(409,))
+
+    async def agency_admin(self):
+        token = (await self._login("agency_admin"))["access_token"]
+        companies = await self._call("agency_admin.list_companies", "GET", "/api/companies", token)
+        if not companies:
+            return
+        company_id = self.rng.choice(companies)["id"]
+        fees = await self._call("agency_admin.get_fees", "GET", f"/api/companies/{company_id}/service-fees", token)
+        # Writes the same fees back so repeated runs leave the data unchanged
+        await self._call("agency_admin.update_fees", "PUT", f"/api/companies/{company_id}/service-fees", token,
+                         {"service_fees": fees["service_fees"]})
+
+    async def run(self, role: str):
+        self.recorder.journeys[role] += 1
+        try:
+            await getattr(self, role)()
+        except JourneyFailed:
+            self.recorder.failed_journeys[role] += 1
+
+
+async def run_open_loop(journeys: Journeys, rates: Dict[str, float], duration: float,
+                        max_in_flight: int, rng: random.Random) -> dict:
+    """Start journeys with exponential inter-arrival times; shed them beyond max_in_flight"""
+    recorder = journeys.recorder
+    in_flight = set()
+    offered = Counter()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def arrivals(role: str, rate: float):
+        next_at = time.perf_counter()
+        while True:
+            next_at += rng.expovariate(rate)
+            if next_at >= deadline:
+                return
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            offered[role] += 1
+            if len(in_flight) >= max_in_flight:
+                recorder.shed[role] += 1
+                continue
+            task = asyncio.create_task(journeys.run(role))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    await asyncio.gather(*(arrivals(role, rate) for role, rate in rates.items() if rate > 0))
+    if in_flight:
+        await asyncio.gather(*list(in_flight))
+    report = recorder.report(time.perf_counter() - started)
+    report["offered_journeys"] = dict(offered)
+    report["timeline"] = _timeline(recorder.completions, started)
+    return report
+
+
+def _timeline(completions: List[float], started: float) -> List[int]:
+    """Completed requests per second, to spot where throughput stops tracking the offered rate"""
+    if not completions:
+        return []
+    buckets = [0] * (int(max(completions) - started) + 1)
+    for finished in completions:
+        buckets[int(finished - started)] += 1
+    return buckets
+
+
+async def run_closed_loop(make_journeys, mix: Dict[str, float], users: int, duration: float,
+                          rng: random.Random) -> dict:
+    """`users` virtual users each run journeys back-to-back for `duration` seconds"""
+    journeys = make_journeys()
+    roles = [role for role, weight in mix.items() if weight > 0]
+    weights = [mix[role] for role in roles]
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def virtual_user():
+        while time.perf_counter() < deadline:
+            await journeys.run(rng.choices(roles, weights=weights)[0])
+
+    await asyncio.gather(*(virtual_user() for _ in range(users)))
+    report = journeys.recorder.report(time.perf_counter() - started)
+    report["users"] = users
+    return report
+
+
+async def find_max_rps(make_journeys, mix: Dict[str, float], ramp: List[int], step_duration: float,
+                       p95_slo_ms: float, max_error_rate: float, rng: random.Random) -> dict:
+    """Ramp closed-loop concurrency until throughput plateaus or the SLO breaks"""
+    steps = []
+    best = None
+    for users in ramp:
+        report = await run_closed_loop(make_journeys, mix, users, step_duration, rng)
+        p95 = max((step["p95_ms"] for step in report["steps"].values()), default=0.0)
+        report["worst_step_p95_ms"] = p95
+        steps.append(report)
+        print(f"  users {users:>4}  {report['throughput_rps']:>9.1f} rps  worst p95 {p95:>9.1f}ms  "
+              f"errors {report['error_rate'] * 100:.2f}%")
+        if p95 > p95_slo_ms or report["error_rate"] > max_error_rate:
+            print(f"  ✗ SLO broken at {users} users")
+            break
+        plateaued = best is not None and report["throughput_rps"] < best["throughput_rps"] * 1.05
+        if best is None or report["throughput_rps"] > best["throughput_rps"]:
+            best = report
+        if plateaued:
+            print(f"  ✓ Throughput plateaued at {users} users")
+            break
+    return {
+        "max_sustainable_rps": best["throughput_rps"] if best else 0.0,
+        "at_users": best["users"] if best else 0,
+        "p95_slo_ms": p95_slo_ms,
+        "steps": steps,
+    }
+
+
+async def load_accounts(mongo_url: str, db_name: str, per_role: int) -> Dict[str, List[dict]]:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        database = client[db_name]
+        accounts = {}
+        for role in ROLES:
+            accounts[role] = await database.users.find(
+                {"role": role, "is_active": True}, {"_id": 0, "email": 1}
+            ).to_list(per_role)
+        cities = await database.hotels.distinct("city", {"is_active": True})
+        return {"accounts": accounts, "cities": cities}
+    finally:
+        client.close()
+
+
+def parse_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        role, _, rate = part.partition("=")
+        if role not in ROLES:
+            raise argparse.ArgumentTypeError(f"Unknown role: {role}")
+        rates[role] = float(rate)
+    return rates
+
+
+def print_report(report: dict):
+    print(f"\n  {report['requests']} requests in {report['elapsed_s']}s "
+          f"({report['throughput_rps']} rps, {report['error_rate'] * 100:.2f}% errors)")
+    if report.get("shed_journeys"):
+        print(f"  shed journeys (client saturated): {report['shed_journeys']}")
+    for step, r in report["steps"].items():
+        print(f"  {step:28s} n={r['requests']:<6} p50 {r['p50_ms']:>8.1f}ms  p95 {r['p95_ms']:>8.1f}ms  "
+              f"p99 {r['p99_ms']:>8.1f}ms  err {r['error_rate'] * 100:5.2f}%")
+
+
+async def main():
+    load_dotenv(ROOT_DIR / '.env')
+    parser = argparse.ArgumentParser(description="HTTP load generator with user journeys")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+                        help="Database to sample accounts and cities from")
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "reservation_system"))
+    parser.add_argument("--password", default=SYNTHETIC_PASSWORD, help="Password shared by the sampled accounts")
+    parser.add_argument("--accounts-per-role", type=int, default=500)
+    parser.add_argument("--rate", type=parse_rates, default=parse_rates("employee=5,manager=1,agency_admin=0.2"),
+                        help="Open loop: journeys/second per role, also the closed-loop mix")
+    parser.add_argument("--duration", type=float, default=60, help="Open-loop duration in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--closed", action="store_true", help="Closed loop: ramp virtual users to find max RPS")
+    parser.add_argument("--ramp", default="1,2,4,8,16,32,64")
+    parser.add_argument("--step-duration", type=float, default=20)
+    parser.add_argument("--p95-slo-ms", type=float, default=1000)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("loadgen needs httpx: pip install httpx")
+
+    rng = random.Random(args.seed)
+    catalog = await load_accounts(args.mongo_url, args.db_name, args.accounts_per_role)
+    accounts, cities = catalog["accounts"], catalog["cities"] or ["İstanbul"]
+    roles = {role: rate for role, rate in args.rate.items() if accounts.get(role)}
+    for role in set(args.rate) - set(roles):
+        print(f"  ! No active {role} accounts in {args.db_name}, skipping that journey")
+    if not roles:
+        raise SystemExit("No accounts to drive load with")
+
+    print(f"=== Load ({args.base_url}) ===\n")
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        def make_journeys():
+            return Journeys(client, StepRecorder(), accounts, cities, args.password, rng)
+
+        if args.closed:
+            ramp = [int(n) for n in args.ramp.split(",") if n.strip()]
+            report = await find_max_rps(make_journeys, roles, ramp, args.step_duration,
+                                        args.p95_slo_ms, args.max_error_rate, rng)
+            print(f"\n✓ Max sustainable ~{report['max_sustainable_rps']} rps at {report['at_users']} users")
+            if report["steps"]:
+                print_report(report["steps"][-1])
+        else:
+            report = await run_open_loop(make_journeys(), roles, args.duration, args.max_in_flight, rng)
+            print_report(report)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\n✓ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
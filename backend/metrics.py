@@ -0,0 +1,371 @@
+"""In-process metrics exposed in Prometheus text format"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterable[str]:
+        return ()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [bucket counts..., sum, count]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# HTTP
+http_requests_total = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_request_duration_seconds = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_requests_in_flight = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method",))
+http_request_size_bytes = REGISTRY.histogram(
+    "http_request_size_bytes", "HTTP request body size", ("method", "route"), SIZE_BUCKETS)
+http_response_size_bytes = REGISTRY.histogram(
+    "http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS)
+
+# MongoDB
+mongo_command_duration_seconds = REGISTRY.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command"))
+mongo_command_failures_total = REGISTRY.counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command"))
+mongo_pool_checkout_wait_seconds = REGISTRY.histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("address",),
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+mongo_pool_checkout_failures_total = REGISTRY.counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts (timeout, conn_error, pool_closed)",
+    ("address", "reason"))
+mongo_pool_connections_in_use = REGISTRY.gauge(
+    "mongo_pool_connections_in_use", "Connections checked out of the pool", ("address",))
+mongo_pool_connections_open = REGISTRY.gauge(
+    "mongo_pool_connections_open", "Open pooled connections (idle + in use)", ("address",))
+mongo_pool_cleared_total = REGISTRY.counter(
+    "mongo_pool_cleared_total", "Times the pool was cleared after a network/server error", ("address",))
+
+# Caches
+cache_requests_total = REGISTRY.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+
+# Password hashing
+bcrypt_queue_wait_seconds = REGISTRY.histogram(
+    "bcrypt_queue_wait_seconds", "Time bcrypt jobs wait for a hashing thread", ("operation",))
+bcrypt_duration_seconds = REGISTRY.histogram(
+    "bcrypt_duration_seconds", "Time spent hashing/verifying passwords", ("operation",))
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# Commands whose first field is not the collection name
+_NON_COLLECTION_COMMANDS = {"ping", "hello", "ismaster", "isMaster", "buildInfo", "endSessions",
+                            "getMore", "killCursors", "listCollections", "listDatabases",
+                            "saslStart", "saslContinue", "abortTransaction", "commitTransaction"}
+
+
+def command_collection(command_name: str, command) -> str:
+    """Best-effort collection name for a command document"""
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+    if command_name in _NON_COLLECTION_COMMANDS:
+        return ""
+    value = command.get(command_name)
+    return value if isinstance(value, str) else ""
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command by collection and command name.
+
+    Callbacks run on the driver's threads, so state is keyed by request_id
+    under a lock.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, int], Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = command_collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.request_id, event.operation_id or 0)] = (collection, event.command_name)
+
+    def _finish(self, event) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            return self._pending.pop((event.request_id, event.operation_id or 0), None)
+
+    def succeeded(self, event):
+        labels = self._finish(event)
+        if labels:
+            mongo_command_duration_seconds.observe(
+                event.duration_micros / 1e6, collection=labels[0], command=labels[1])
+
+    def failed(self, event):
+        labels = self._finish(event)
+        if labels:
+            mongo_command_duration_seconds.observe(
+                event.duration_micros / 1e6, collection=labels[0], command=labels[1])
+            mongo_command_failures_total.inc(collection=labels[0], command=labels[1])
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool (CMAP) metrics plus a rolling window of checkout waits for health checks.
+
+    A checkout's started and checked-out/failed events fire on the same
+    driver thread, so the start time is kept in a thread-local.
+    """
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._in_use: Dict[str, int] = {}
+        self._open: Dict[str, int] = {}
+        self._recent = deque()  # (finished_at, wait_seconds, failed)
+
+    def _address(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _adjust(self, counts: Dict[str, int], gauge: Gauge, address: str, delta: int):
+        with self._lock:
+            counts[address] = max(0, counts.get(address, 0) + delta)
+            value = counts[address]
+        gauge.set(value, address=address)
+
+    def _finish_checkout(self, failed: bool) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        wait = time.perf_counter() - started if started is not None else 0.0
+        now = time.monotonic()
+        with self._lock:
+            self._recent.append((now, wait, failed))
+            while self._recent and self._recent[0][0] < now - self.window_seconds:
+                self._recent.popleft()
+        return wait
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        address = self._address(event)
+        mongo_pool_checkout_wait_seconds.observe(self._finish_checkout(False), address=address)
+        self._adjust(self._in_use, mongo_pool_connections_in_use, address, 1)
+
+    def connection_check_out_failed(self, event):
+        address = self._address(event)
+        self._finish_checkout(True)
+        mongo_pool_checkout_failures_total.inc(address=address, reason=str(event.reason))
+
+    def connection_checked_in(self, event):
+        self._adjust(self._in_use, mongo_pool_connections_in_use, self._address(event), -1)
+
+    def connection_created(self, event):
+        self._adjust(self._open, mongo_pool_connections_open, self._address(event), 1)
+
+    def connection_closed(self, event):
+        self._adjust(self._open, mongo_pool_connections_open, self._address(event), -1)
+
+    def pool_cleared(self, event):
+        mongo_pool_cleared_total.inc(address=self._address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self, max_pool_size: int, degraded_wait_ms: float) -> dict:
+        """Pool state over the last window; 'degraded' when checkouts queue up or fail"""
+        now = time.monotonic()
+        with self._lock:
+            recent = [item for item in self._recent if item[0] >= now - self.window_seconds]
+            in_use = dict(self._in_use)
+            open_connections = dict(self._open)
+        waits = sorted(wait for _, wait, failed in recent if not failed)
+        failures = sum(1 for _, _, failed in recent if failed)
+        p95_ms = waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000 if waits else 0.0
+        busiest = max(in_use.values(), default=0)
+        utilization = busiest / max_pool_size if max_pool_size else 0.0
+        degraded = failures > 0 or p95_ms > degraded_wait_ms or utilization >= 0.9
+        return {
+            "status": "degraded" if degraded else "ok",
+            "window_seconds": self.window_seconds,
+            "checkouts": len(waits),
+            "checkout_failures": failures,
+            "checkout_wait_p95_ms": round(p95_ms, 3),
+            "checkout_wait_max_ms": round(waits[-1] * 1000, 3) if waits else 0.0,
+            "max_pool_size": max_pool_size,
+            "in_use": in_use,
+            "open": open_connections,
+            "utilization": round(utilization, 3),
+        }
+
+
+def route_template(scope) -> str:
+    """Route path template (e.g. /api/reservations/{reservation_id}) to keep label cardinality low"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
+
+
+async def metrics_middleware(request, call_next):
+    """Record latency, in-flight count, status and payload sizes per route"""
+    method = request.method
+    started = time.perf_counter()
+    http_requests_in_flight.inc(method=method)
+    response = None
+    try:
+        response = await call_next(request)
+        return response
+    finally:
+        http_requests_in_flight.dec(method=method)
+        # scope["route"] is filled in by the router, so it is only known afterwards
+        route = route_template(request.scope)
+        status_code = response.status_code if response is not None else 500
+        http_request_duration_seconds.observe(time.perf_counter() - started, method=method, route=route)
+        http_requests_total.inc(method=method, route=route, status=str(status_code))
+        request_size = request.headers.get("content-length")
+        if request_size and request_size.isdigit():
+            http_request_size_bytes.observe(int(request_size), method=method, route=route)
+        response_size = response.headers.get("content-length") if response is not None else None
+        if response_size and response_size.isdigit():
+            http_response_size_bytes.observe(int(response_size), method=method, route=route)
@@ -1,5 +1,6 @@
 """Mock data for Turkish hotels"""
 import uuid
+from datetime import datetime
 
 TURKISH_HOTELS = [
     {
@@ -474,9 +475,18 @@ TURKISH_HOTELS = [
 
 async def init_mock_hotels(db):
     """Initialize mock hotel data in database"""
+    now = datetime.utcnow().isoformat()
     existing_count = await db.hotels.count_documents({})
     if existing_count == 0:
-        await db.hotels.insert_many(TURKISH_HOTELS)
+        await db.hotels.insert_many([
+            {**hotel, "version": 1, "created_at": now, "updated_at": now} for hotel in TURKISH_HOTELS
+        ])
         print(f"Inserted {len(TURKISH_HOTELS)} mock hotels into database")
     else:
         print(f"Hotels already exist in database ({existing_count} hotels)")
+    
+    # Hotels inserted before versioning get a stable version and timestamps (ETag/Last-Modified)
+    await db.hotels.update_many({"created_at": {"$exists": False}}, {"$set": {"created_at": now}})
+    await db.hotels.update_many(
+        {"version": {"$exists": False}}, {"$set": {"version": 1, "updated_at": now}}
+    )
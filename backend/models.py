@@ -23,6 +23,25 @@ class ReservationStatus(str, Enum):
     COMPLETED = "completed"
 
 
+# İzin verilen durum geçişleri (mevcut durum -> hedef durumlar)
+RESERVATION_TRANSITIONS = {
+    ReservationStatus.PENDING: {
+        ReservationStatus.APPROVED, ReservationStatus.CONFIRMED,
+        ReservationStatus.REJECTED, ReservationStatus.CANCELLED,
+    },
+    ReservationStatus.APPROVED: {ReservationStatus.CONFIRMED, ReservationStatus.CANCELLED},
+    ReservationStatus.CONFIRMED: {ReservationStatus.CANCELLED, ReservationStatus.COMPLETED},
+    ReservationStatus.REJECTED: set(),
+    ReservationStatus.CANCELLED: set(),
+    ReservationStatus.COMPLETED: set(),
+}
+
+
+def allowed_source_statuses(target: ReservationStatus) -> List[ReservationStatus]:
+    """Statuses a reservation may be in for a transition to target"""
+    return [source for source, targets in RESERVATION_TRANSITIONS.items() if target in targets]
+
+
 class ServiceType(str, Enum):
     HOTEL = "hotel"
     FLIGHT = "flight"
@@ -162,6 +181,7 @@ class BookingRule(BaseModel):
     applies_to: RuleTarget = RuleTarget.ALL
     department_list: List[str] = []  # Departman isimleri
     employee_list: List[str] = []  # Çalışan ID'leri
+    approver_id: Optional[str] = None  # Çalışanın kendi onaylayıcısı yoksa bu kuralın onaylayıcısı
     
     # Servis bazlı limitler
     hotel_limits: ServiceLimits = Field(default_factory=lambda: ServiceLimits(enabled=True, max_stars=5, requires_approval=True))
@@ -248,7 +268,9 @@ class Hotel(BaseModel):
     email: Optional[str] = None
     cancellation_policy: str = "Ücretsiz iptal: Giriş tarihinden 48 saat öncesine kadar"
     is_active: bool = True
+    version: int = 1  # Otel her güncellendiğinde artırılır (ETag)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
 
 
 class HotelSearchRequest(BaseModel):
@@ -261,6 +283,140 @@ class HotelSearchRequest(BaseModel):
     max_price: Optional[float] = None
 
 
+# Flight Models
+class CabinClass(str, Enum):
+    ECONOMY = "economy"
+    BUSINESS = "business"
+    FIRST = "first"
+
+
+class FlightSearchRequest(BaseModel):
+    origin: str = Field(min_length=3, max_length=3)  # IATA havalimanı kodu (IST, ESB...)
+    destination: str = Field(min_length=3, max_length=3)
+    departure_date: date
+    passengers: int = Field(1, ge=1, le=9)
+    cabin: CabinClass = CabinClass.ECONOMY
+
+    @field_validator('origin', 'destination')
+    @classmethod
+    def upper_iata(cls, v: str) -> str:
+        return v.upper()
+
+
+class FlightSegment(BaseModel):
+    carrier: str  # Havayolu kodu (TK, PC...)
+    flight_number: str
+    origin: str
+    destination: str
+    departure_at: datetime
+    arrival_at: datetime
+
+
+class FlightFare(BaseModel):
+    id: str
+    segments: List[FlightSegment]
+    cabin: CabinClass
+    price: float  # Kişi başı, tedarikçinin para biriminde
+    currency: Currency = Currency.TRY
+    price_try: float
+    seats_left: int
+    refundable: bool = False
+    supplier: str  # En ucuz teklifi veren tedarikçi
+    offered_by: List[str] = []  # Aynı uçuşu sunan tüm tedarikçiler
+    in_policy: bool = True
+    policy_violations: List[str] = []  # max_price, cabin_class, min_days_before
+
+
+class FlightSupplierStatus(BaseModel):
+    name: str
+    status: str  # ok, timeout, error
+    fares: int = 0
+    elapsed_ms: float = 0.0
+
+
+class FlightSearchResponse(BaseModel):
+    fares: List[FlightFare] = []
+    suppliers: List[FlightSupplierStatus] = []
+    partial: bool = False  # En az bir tedarikçi süresinde cevap vermedi
+    cached: bool = False
+
+
+# Transfer / Car Rental Models
+class VehicleClass(str, Enum):
+    SEDAN = "sedan"  # 1-3 yolcu
+    MINIVAN = "minivan"  # 4-7 yolcu
+    MINIBUS = "minibus"  # 8-14 yolcu
+
+
+class CarClass(str, Enum):
+    ECONOMY = "economy"
+    COMPACT = "compact"
+    SUV = "suv"
+    PREMIUM = "premium"
+
+
+class TransferZone(BaseModel):
+    id: str  # Havalimanı kodu (IST) veya "Şehir/İlçe" (İstanbul/Beşiktaş)
+    kind: str  # airport, district
+    city: str
+    district: Optional[str] = None
+    name: str
+
+
+class TransferLeg(BaseModel):
+    from_zone: str
+    to_zone: str
+    passengers: int = Field(1, ge=1, le=14)
+    vehicle: Optional[VehicleClass] = None  # Boşsa yolcu sayısına uyan en küçük araç
+
+
+class CarRentalRequest(BaseModel):
+    pickup_zone: str
+    dropoff_zone: Optional[str] = None  # Boşsa aynı yere iade
+    pickup_date: date
+    return_date: date
+    car_class: CarClass = CarClass.ECONOMY
+
+
+class QuoteRequest(BaseModel):
+    """Bir seyahatin tüm transfer ve araç kiralama kalemleri tek istekte"""
+    transfers: List[TransferLeg] = Field(default_factory=list, max_length=50)
+    car_rentals: List[CarRentalRequest] = Field(default_factory=list, max_length=10)
+
+
+class TransferQuote(BaseModel):
+    from_zone: str
+    to_zone: str
+    passengers: int
+    available: bool = True  # Farklı şehirler arası transfer yok
+    vehicle: Optional[VehicleClass] = None
+    distance_km: Optional[float] = None
+    price: Optional[float] = None  # TRY
+    service_fee: float = 0.0
+    total: Optional[float] = None
+    in_policy: bool = True
+
+
+class CarRentalQuote(BaseModel):
+    pickup_zone: str
+    dropoff_zone: str
+    car_class: CarClass
+    days: int
+    daily_rate: float  # Sezon etkisi dahil ortalama günlük fiyat
+    rental_price: float
+    one_way_fee: float = 0.0
+    price: float
+    service_fee: float = 0.0
+    total: float
+    in_policy: bool = True
+
+
+class QuoteResponse(BaseModel):
+    transfers: List[TransferQuote] = []
+    car_rentals: List[CarRentalQuote] = []
+    total: float = 0.0
+
+
 # Reservation Models
 class ReservationBase(BaseModel):
     service_type: ServiceType
@@ -298,8 +454,20 @@ class Reservation(ReservationBase):
     grand_total: Optional[float] = None
     special_requests: Optional[str] = None
     
+    # Flight specific fields
+    flight_fare_id: Optional[str] = None
+    flight_segments: Optional[List[FlightSegment]] = None
+    cabin: Optional[CabinClass] = None
+    passengers: Optional[int] = None
+    supplier: Optional[str] = None
+    policy_violations: List[str] = []  # Uçuş kuralı (flight_limits) ihlalleri
+    
+    # Seyahat paketi (POST /trips) bileşeni ise
+    trip_id: Optional[str] = None
+    
     # Approval workflow
     requires_approval: bool = False
+    approver_id: Optional[str] = None  # Oluşturma anında kullanıcı/kuraldan çözülen onaylayıcı
     approved_by: Optional[str] = None
     approved_at: Optional[datetime] = None
     rejection_reason: Optional[str] = None
@@ -315,12 +483,93 @@ class ReservationUpdate(BaseModel):
     cancellation_reason: Optional[str] = None
 
 
+BULK_STATUS_MAX_ITEMS = 200
+
+
+class ReservationBulkStatusUpdate(BaseModel):
+    """Toplu onay/red/iptal isteği"""
+    reservation_ids: List[str] = Field(min_length=1, max_length=BULK_STATUS_MAX_ITEMS)
+    status: ReservationStatus
+    rejection_reason: Optional[str] = None
+    cancellation_reason: Optional[str] = None
+
+
+class BulkStatusResult(str, Enum):
+    APPLIED = "applied"
+    STALE = "stale"  # Durum bu geçişe izin vermiyor / başka biri değiştirdi
+    FORBIDDEN = "forbidden"
+    NOT_FOUND = "not_found"
+
+
+class ReservationBulkStatusItem(BaseModel):
+    id: str
+    result: BulkStatusResult
+    status: Optional[ReservationStatus] = None
+
+
+class ReservationBulkStatusResponse(BaseModel):
+    applied: int = 0
+    results: List[ReservationBulkStatusItem] = []
+
+
 class ReservationResponse(Reservation):
     user_name: Optional[str] = None
     user_email: Optional[str] = None
     company_name: Optional[str] = None
 
 
+class PendingApprovalsResponse(BaseModel):
+    """Onaylayıcının kendi bekleyen kuyruğu"""
+    total: int = 0
+    assigned: int = 0  # approver_id bu kullanıcı olanlar
+    unassigned: int = 0  # Şirkette onaylayıcısı belirlenmemiş olanlar
+    reservations: List[ReservationResponse] = []
+
+
+# Trip Models
+class TripHotelItem(BaseModel):
+    hotel_id: str
+    room_type_id: str
+    check_in_date: date
+    check_out_date: date
+    guests: int = 1
+    special_requests: Optional[str] = None
+
+
+class TripFlightItem(FlightSearchRequest):
+    """Aramada seçilen ücret; arama parametreleri fiyatı yeniden doğrulamak için gönderilir"""
+    fare_id: str
+
+
+TRIP_MAX_ITEMS = 10
+
+
+class TripCreate(BaseModel):
+    name: Optional[str] = None  # Ör. "Ankara müşteri ziyareti"
+    hotels: List[TripHotelItem] = Field(default_factory=list, max_length=TRIP_MAX_ITEMS)
+    flights: List[TripFlightItem] = Field(default_factory=list, max_length=TRIP_MAX_ITEMS)
+
+
+class Trip(BaseModel):
+    """Tek istekte, tek onay kararıyla oluşturulan çok servisli seyahat"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    company_id: Optional[str] = None
+    name: Optional[str] = None
+    reservation_ids: List[str] = []
+    total_price: float = 0.0
+    service_fee: float = 0.0
+    grand_total: float = 0.0
+    requires_approval: bool = False
+    approver_id: Optional[str] = None
+    status: ReservationStatus = ReservationStatus.PENDING  # Bileşenlerin durumundan türetilir
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class TripResponse(Trip):
+    reservations: List[ReservationResponse] = []
+
+
 # Dashboard Models
 class DashboardStats(BaseModel):
     total_reservations: int = 0
@@ -332,6 +581,71 @@ class DashboardStats(BaseModel):
     budget_used_percentage: Optional[float] = None
 
 
+# Audit Models
+class AuditAction(str, Enum):
+    RESERVATION_APPROVED = "reservation.approved"
+    RESERVATION_REJECTED = "reservation.rejected"
+    RESERVATION_CANCELLED = "reservation.cancelled"
+    RESERVATION_UPDATED = "reservation.updated"
+    SERVICE_FEES_UPDATED = "company.service_fees_updated"
+    APPROVER_CHANGED = "employee.approver_changed"
+    EMPLOYEE_UPDATED = "employee.updated"
+
+
+class AuditEvent(BaseModel):
+    """Kim, neyi, ne zaman değiştirdi; yalnızca eklenir, güncellenmez"""
+    id: str
+    action: AuditAction
+    entity_type: str  # reservation, company, user
+    entity_id: str
+    actor_id: Optional[str] = None
+    actor_role: Optional[str] = None
+    company_id: Optional[str] = None
+    before: Optional[Dict[str, Any]] = None  # Yalnızca değişen alanların eski değerleri
+    after: Optional[Dict[str, Any]] = None
+    at: datetime
+
+
+class AuditEventPage(BaseModel):
+    total: int = 0
+    events: List[AuditEvent] = []
+
+
+# Live Update Models
+class LiveEventType(str, Enum):
+    RESERVATION_CREATED = "reservation.created"
+    RESERVATION_STATUS_CHANGED = "reservation.status_changed"
+
+
+class ReservationLiveEvent(BaseModel):
+    """/api/events/stream üzerinden gönderilen değişiklik (delta)"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: LiveEventType
+    reservation_id: str
+    status: ReservationStatus
+    previous_status: Optional[ReservationStatus] = None
+    company_id: Optional[str] = None
+    user_id: Optional[str] = None
+    approver_id: Optional[str] = None
+    reservation: Optional[ReservationResponse] = None  # Toplu işlemlerde gönderilmez, yalnızca durum
+    at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# Bootstrap Models
+class BootstrapSection(BaseModel):
+    """Açılış yükünün bir bölümü"""
+    etag: str
+    not_modified: bool = False  # İstemcideki kopya güncel, data gönderilmedi
+    data: Optional[Any] = None
+
+
+class BootstrapResponse(BaseModel):
+    user: BootstrapSection
+    company: BootstrapSection
+    stats: BootstrapSection
+    reservations: BootstrapSection
+
+
 # Token Models
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,199 @@
+"""Reservation notifications and post-booking work, run as background jobs
+
+Email goes through a sink chosen by MAIL_BACKEND:
+
+- ``file`` (default): one .eml file per message under MAIL_DIR, for local
+  development and tests.
+- ``smtp``: MAIL_SMTP_HOST:MAIL_SMTP_PORT without auth or TLS, e.g. a local
+  debugging server (``python -m aiosmtpd -n -l localhost:1025``) or a relay.
+"""
+import asyncio
+import os
+import smtplib
+import uuid
+from datetime import datetime
+from email.message import EmailMessage
+from pathlib import Path
+from typing import List, Optional
+
+from jobs import job_handler, new_job
+
+MAIL_BACKEND = os.environ.get("MAIL_BACKEND", "file")
+MAIL_DIR = Path(os.environ.get("MAIL_DIR", Path(__file__).parent / "outbox"))
+MAIL_FROM = os.environ.get("MAIL_FROM", "B2BTravel <no-reply@b2btravel.local>")
+MAIL_SMTP_HOST = os.environ.get("MAIL_SMTP_HOST", "localhost")
+MAIL_SMTP_PORT = int(os.environ.get("MAIL_SMTP_PORT", 1025))
+VOUCHER_DIR = Path(os.environ.get("VOUCHER_DIR", Path(__file__).parent / "vouchers"))
+
+STATUS_LABELS = {
+    "pending": "Onay bekliyor",
+    "confirmed": "Onaylandı",
+    "rejected": "Reddedildi",
+    "cancelled": "İptal edildi",
+    "completed": "Tamamlandı",
+}
+
+
+class FileMailSink:
+    """Writes each message to MAIL_DIR as an .eml file"""
+
+    def __init__(self, directory: Path = MAIL_DIR):
+        self.directory = Path(directory)
+
+    async def send(self, message: EmailMessage):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.eml"
+        (self.directory / name).write_bytes(bytes(message))
+
+
+class SmtpMailSink:
+    """Plain SMTP delivery; smtplib blocks, so it runs on the default executor"""
+
+    def __init__(self, host: str = MAIL_SMTP_HOST, port: int = MAIL_SMTP_PORT):
+        self.host = host
+        self.port = port
+
+    def _send(self, message: EmailMessage):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            smtp.send_message(message)
+
+    async def send(self, message: EmailMessage):
+        await asyncio.get_running_loop().run_in_executor(None, self._send, message)
+
+
+def build_mail_sink(backend: str = MAIL_BACKEND):
+    if backend == "file":
+        return FileMailSink()
+    if backend == "smtp":
+        return SmtpMailSink()
+    raise RuntimeError(f"MAIL_BACKEND must be 'file' or 'smtp', got '{backend}'")
+
+
+mail_sink = build_mail_sink()
+
+
+def build_message(to: str, subject: str, body: str, attachment: Optional[Path] = None) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = MAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    if attachment is not None:
+        message.add_attachment(attachment.read_bytes(), maintype="text", subtype="plain", filename=attachment.name)
+    return message
+
+
+def reservation_jobs(reservation: dict, event: str) -> List[dict]:
+    """Jobs to enqueue after a reservation is created or changes status"""
+    reservation_id = reservation['id']
+    reservation_status = getattr(reservation['status'], "value", reservation['status'])
+    jobs = []
+    if event == "created":
+        jobs.append(new_job("notify.reservation_created", {"reservation_id": reservation_id},
+                            dedupe_key=f"notify.reservation_created:{reservation_id}"))
+    else:
+        jobs.append(new_job("notify.reservation_status",
+                            {"reservation_id": reservation_id, "status": reservation_status},
+                            dedupe_key=f"notify.reservation_status:{reservation_id}:{reservation_status}"))
+    if reservation_status == "confirmed" and reservation.get('service_type', "hotel") == "hotel":
+        jobs.append(new_job("reservation.voucher", {"reservation_id": reservation_id},
+                            dedupe_key=f"reservation.voucher:{reservation_id}"))
+    return jobs
+
+
+def _summary(reservation: dict) -> str:
+    if reservation.get('service_type') == "flight":
+        flights = ", ".join(
+            f"{s['carrier']}{s['flight_number']} {s['origin']}-{s['destination']} {s['departure_at'][:16].replace('T', ' ')}"
+            for s in reservation.get('flight_segments') or ()
+        )
+        return (
+            f"Uçuş: {flights} ({reservation.get('cabin')}, {reservation.get('passengers')} yolcu)\n"
+            f"Tutar: {reservation.get('grand_total', 0):.2f} {reservation.get('currency', 'TRY')}\n"
+            f"Rezervasyon No: {reservation['id']}\n"
+        )
+    return (
+        f"Otel: {reservation.get('hotel_name')} ({reservation.get('room_type_name')})\n"
+        f"Tarih: {reservation.get('check_in_date')} - {reservation.get('check_out_date')} "
+        f"({reservation.get('nights')} gece)\n"
+        f"Tutar: {reservation.get('grand_total', 0):.2f} {reservation.get('currency', 'TRY')}\n"
+        f"Rezervasyon No: {reservation['id']}\n"
+    )
+
+
+async def _load(db, reservation_id: str):
+    reservation = await db.reservations.find_one({"id": reservation_id}, {"_id": 0})
+    if reservation is None:
+        # Deleted since enqueueing: nothing to tell anyone, so the job is done
+        return None, None
+    traveler = await db.users.find_one(
+        {"id": reservation['user_id']}, {"_id": 0, "email": 1, "full_name": 1}
+    )
+    return reservation, traveler
+
+
+async def _approvers(db, reservation: dict) -> List[dict]:
+    if reservation.get('approver_id'):
+        approver = await db.users.find_one({"id": reservation['approver_id']}, {"_id": 0, "email": 1})
+        return [approver] if approver else []
+    # No resolved approver: the company's managers share the queue (see /approvals/pending)
+    return await db.users.find(
+        {"company_id": reservation['company_id'], "role": "manager", "is_active": True},
+        {"_id": 0, "email": 1}
+    ).to_list(50)
+
+
+@job_handler("notify.reservation_created")
+async def notify_reservation_created(db, payload: dict):
+    reservation, traveler = await _load(db, payload['reservation_id'])
+    if reservation is None:
+        return
+    status_label = STATUS_LABELS.get(reservation['status'], reservation['status'])
+    if traveler:
+        await mail_sink.send(build_message(
+            traveler['email'], f"Rezervasyon talebiniz alındı - {status_label}",
+            f"Merhaba {traveler.get('full_name', '')},\n\n{_summary(reservation)}Durum: {status_label}\n"
+        ))
+    if reservation['status'] == "pending":
+        requester = traveler.get('full_name', '') if traveler else reservation['user_id']
+        for approver in await _approvers(db, reservation):
+            await mail_sink.send(build_message(
+                approver['email'], "Onayınızı bekleyen rezervasyon",
+                f"{requester} onayınızı bekleyen bir rezervasyon oluşturdu.\n\n{_summary(reservation)}"
+            ))
+
+
+@job_handler("notify.reservation_status")
+async def notify_reservation_status(db, payload: dict):
+    reservation, traveler = await _load(db, payload['reservation_id'])
+    if reservation is None or traveler is None:
+        return
+    status_label = STATUS_LABELS.get(payload['status'], payload['status'])
+    reason = reservation.get('rejection_reason') or reservation.get('cancellation_reason')
+    await mail_sink.send(build_message(
+        traveler['email'], f"Rezervasyon durumu: {status_label}",
+        f"Merhaba {traveler.get('full_name', '')},\n\n{_summary(reservation)}Durum: {status_label}\n"
+        + (f"Açıklama: {reason}\n" if reason else "")
+    ))
+
+
+@job_handler("reservation.voucher")
+async def generate_voucher(db, payload: dict):
+    reservation, traveler = await _load(db, payload['reservation_id'])
+    if reservation is None or reservation['status'] not in ("confirmed", "completed"):
+        return
+    VOUCHER_DIR.mkdir(parents=True, exist_ok=True)
+    path = VOUCHER_DIR / f"{reservation['id']}.txt"
+    guest = traveler.get('full_name', '') if traveler else ''
+    # Rewriting the same file makes a retried job harmless
+    path.write_text(f"OTEL VOUCHER\n\nMisafir: {guest}\nKişi sayısı: {reservation.get('guests')}\n"
+                    f"{_summary(reservation)}", encoding="utf-8")
+    await db.reservations.update_one(
+        {"id": reservation['id']}, {"$set": {"voucher_issued_at": datetime.utcnow().isoformat()}}
+    )
+    if traveler:
+        await mail_sink.send(build_message(
+            traveler['email'], f"Otel voucher - {reservation.get('hotel_name')}",
+            f"Merhaba {guest},\n\nRezervasyonunuza ait voucher ektedir.\n\n{_summary(reservation)}",
+            attachment=path
+        ))
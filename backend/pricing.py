@@ -0,0 +1,35 @@
+"""Currency conversion and company service fees, shared by every booking path"""
+from typing import Union
+
+# Exchange rates (mock - in production, use real-time API)
+EXCHANGE_RATES = {
+    "TRY": 1.0,
+    "USD": 32.50,
+    "EUR": 35.20,
+    "GBP": 41.30
+}
+
+
+def convert_to_try(amount: float, currency: str) -> float:
+    """Convert amount to TRY"""
+    return amount * EXCHANGE_RATES.get(currency, 1.0)
+
+
+def calculate_service_fee(fee_config: Union[dict, float, None], total_price: float) -> float:
+    """Service fee in TRY for one booking, from a company's per-service fee item"""
+    # Handle both old format (float) and new format (dict)
+    if isinstance(fee_config, dict):
+        fee_type = fee_config.get('type', 'fixed')
+        fee_value = fee_config.get('value', 0.0)
+        additional_fee = fee_config.get('additional_fee', 0.0)
+        currency = fee_config.get('currency', 'TRY')
+        
+        if fee_type == 'percentage':
+            # Percentage is always calculated on the base price
+            # Convert additional fee to TRY if in different currency
+            return (total_price * fee_value / 100) + convert_to_try(additional_fee, currency)
+        # fixed: convert both value and additional fee to TRY
+        return convert_to_try(fee_value, currency) + convert_to_try(additional_fee, currency)
+    
+    # Backward compatibility for old float format
+    return float(fee_config) if fee_config else 0.0
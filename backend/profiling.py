@@ -0,0 +1,198 @@
+"""Opt-in per-request profiling
+
+A request is profiled when it carries a valid signed ``X-Profile`` header or
+is picked by PROFILE_SAMPLE_RATE. Two modes are available:
+
+- ``cprofile``: deterministic, written as a .pstats file
+- ``sample``: a background thread samples the event loop thread's stack,
+  written as speedscope JSON (https://www.speedscope.app)
+
+Only one request is profiled at a time, because cProfile is process-wide.
+Neither mode isolates that request: while it awaits, the loop runs other
+requests' coroutines, and those show up in the profile too. Profile under
+low concurrency (or a single benchmark client) when that matters.
+"""
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "sample")
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", Path(__file__).parent / "profiles"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", 1))
+PROFILE_HEADER = "X-Profile"
+PROFILE_MODE_HEADER = "X-Profile-Mode"
+MODES = ("cprofile", "sample")
+
+_active = threading.Lock()
+
+
+def sign_profile_token(ttl_seconds: int = 3600, secret: Optional[str] = None) -> str:
+    """Header value enabling profiling until now + ttl_seconds"""
+    expires = str(int(time.time()) + ttl_seconds)
+    signature = hmac.new((secret or PROFILE_SECRET).encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(token: Optional[str]) -> bool:
+    if not token or not PROFILE_SECRET or "." not in token:
+        return False
+    expires, signature = token.split(".", 1)
+    expected = hmac.new(PROFILE_SECRET.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        return False
+    return expires.isdigit() and int(expires) >= time.time()
+
+
+def should_profile(headers) -> bool:
+    if verify_profile_token(headers.get(PROFILE_HEADER)):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and exports speedscope JSON"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: List[dict] = []
+        self._frame_index: Dict[tuple, int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self.started = 0.0
+        self.duration = 0.0
+
+    def _frame_id(self, frame) -> int:
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def speedscope(self, name: str) -> dict:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "corporate-reservation-api",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+def _profile_name(method: str, path: str, elapsed_ms: float, suffix: str) -> str:
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:80] or "root"
+    return f"{stamp}_{method}_{slug}_{int(elapsed_ms)}ms{suffix}"
+
+
+async def profiling_middleware(request, call_next):
+    """Wrap selected requests in a profiler and persist the result"""
+    if not should_profile(request.headers) or not _active.acquire(blocking=False):
+        return await call_next(request)
+
+    mode = request.headers.get(PROFILE_MODE_HEADER, PROFILE_MODE)
+    if mode not in MODES:
+        mode = PROFILE_MODE
+    started = time.perf_counter()
+    profiler = sampler = None
+    try:
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000.0)
+            sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        if profiler is not None:
+            name = _profile_name(request.method, request.url.path, elapsed_ms, ".pstats")
+            profiler.dump_stats(str(PROFILE_DIR / name))
+        else:
+            name = _profile_name(request.method, request.url.path, elapsed_ms, ".speedscope.json")
+            with open(PROFILE_DIR / name, "w") as f:
+                json.dump(sampler.speedscope(f"{request.method} {request.url.path}"), f)
+        response.headers["X-Profile-Id"] = name
+        return response
+    finally:
+        _active.release()
+
+
+def list_profiles() -> List[dict]:
+    if not PROFILE_DIR.exists():
+        return []
+    profiles = []
+    for path in PROFILE_DIR.iterdir():
+        if path.is_file() and (path.name.endswith(".pstats") or path.name.endswith(".speedscope.json")):
+            stat = path.stat()
+            profiles.append({
+                "name": path.name,
+                "size": stat.st_size,
+                "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+            })
+    profiles.sort(key=lambda item: item["name"], reverse=True)
+    return profiles
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """Resolve a profile name inside PROFILE_DIR, rejecting anything else"""
+    if "/" in name or "\\" in name or name.startswith("."):
+        return None
+    path = PROFILE_DIR / name
+    return path if path.is_file() else None
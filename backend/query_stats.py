@@ -0,0 +1,284 @@
+"""Slow-query log and per-shape query statistics for MongoDB commands"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+QUERY_EXPLAIN = os.environ.get("QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes")
+MAX_SHAPES = int(os.environ.get("QUERY_STATS_MAX_SHAPES", 2000))
+
+# Where each command keeps its filter
+_FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+_EXPLAINABLE = {"find", "aggregate", "count", "distinct"}
+_TRACKED = set(_FILTER_FIELDS) | {"aggregate", "update", "delete"}
+# Session/cluster fields the driver adds; explain rejects or ignores them
+_DRIVER_FIELDS = {"lsid", "$clusterTime", "$db", "txnNumber", "$readPreference",
+                  "signature", "autocommit", "startTransaction", "readConcern"}
+
+
+def redact(value: Any) -> Any:
+    """Replace literal values with '?' while keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in: [...] and friends collapse to one placeholder so list length doesn't split shapes
+        return [redact(value[0])] if value else []
+    return "?"
+
+
+def command_filter(command_name: str, command) -> Any:
+    """Filter (or pipeline) portion of a command, unredacted"""
+    if command_name in _FILTER_FIELDS:
+        return command.get(_FILTER_FIELDS[command_name]) or {}
+    if command_name == "aggregate":
+        return command.get("pipeline") or []
+    if command_name == "update":
+        updates = command.get("updates") or [{}]
+        return updates[0].get("q", {})
+    if command_name == "delete":
+        deletes = command.get("deletes") or [{}]
+        return deletes[0].get("q", {})
+    return {}
+
+
+def query_shape(command_name: str, command) -> str:
+    shape = redact(command_filter(command_name, command))
+    if command_name == "find" and command.get("sort"):
+        shape = {"filter": shape, "sort": dict(command["sort"])}
+    return json.dumps(shape, sort_keys=True, default=str)
+
+
+def _returned_docs(command_name: str, reply) -> int:
+    cursor = reply.get("cursor") if isinstance(reply, dict) else None
+    if cursor:
+        return len(cursor.get("firstBatch", []))
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    return int(reply.get("n", 0) or 0)
+
+
+def _find_key(document: Any, key: str) -> Optional[Any]:
+    """Depth-first search for key; explain output nests differently per command/version"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        for value in document.values():
+            found = _find_key(value, key)
+            if found is not None:
+                return found
+    elif isinstance(document, list):
+        for value in document:
+            found = _find_key(value, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _plan_stages(plan: Any, stages: List[Tuple[str, Optional[str]]]):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append((plan["stage"], plan.get("indexName")))
+        for value in plan.values():
+            _plan_stages(value, stages)
+    elif isinstance(plan, list):
+        for value in plan:
+            _plan_stages(value, stages)
+
+
+def summarize_plan(explain: dict) -> dict:
+    stages: List[Tuple[str, Optional[str]]] = []
+    _plan_stages(_find_key(explain, "winningPlan"), stages)
+    indexes = sorted({index for stage, index in stages if index})
+    execution = _find_key(explain, "executionStats") or {}
+    return {
+        "plan": "COLLSCAN" if any(stage == "COLLSCAN" for stage, _ in stages) else
+                ("IXSCAN" if indexes else (stages[0][0] if stages else "UNKNOWN")),
+        "indexes": indexes,
+        "docs_examined": execution.get("totalDocsExamined"),
+        "keys_examined": execution.get("totalKeysExamined"),
+        "n_returned": execution.get("nReturned"),
+    }
+
+
+class ShapeStats:
+    __slots__ = ("collection", "command", "shape", "count", "slow_count", "total_ms",
+                 "max_ms", "docs_returned", "explain")
+
+    def __init__(self, collection: str, command: str, shape: str):
+        self.collection = collection
+        self.command = command
+        self.shape = shape
+        self.count = 0
+        self.slow_count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.docs_returned = 0
+        self.explain: Optional[dict] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "collection": self.collection,
+            "command": self.command,
+            "shape": json.loads(self.shape),
+            "count": self.count,
+            "slow_count": self.slow_count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "docs_returned": self.docs_returned,
+            "explain": self.explain,
+        }
+
+
+class QueryStatsListener(monitoring.CommandListener):
+    """Aggregates command timings by (collection, command, redacted filter shape).
+
+    Commands slower than SLOW_QUERY_MS are logged; with QUERY_EXPLAIN enabled
+    the first slow sample of each new shape is queued for a background explain.
+    Driver callbacks run on worker threads, hence the lock and the
+    call_soon_threadsafe hand-off to the event loop.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain: bool = QUERY_EXPLAIN):
+        self.threshold_ms = threshold_ms
+        self.explain_enabled = explain
+        self._pending: Dict[Tuple[int, int], tuple] = {}
+        self._shapes: Dict[Tuple[str, str, str], ShapeStats] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explain_queue: Optional[asyncio.Queue] = None
+        self._explain_task: Optional[asyncio.Task] = None
+
+    # ---- driver callbacks ----
+
+    def started(self, event):
+        if event.command_name not in _TRACKED:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+        shape = query_shape(event.command_name, event.command)
+        sample = None
+        if self.explain_enabled and event.command_name in _EXPLAINABLE:
+            sample = {k: v for k, v in event.command.items() if k not in _DRIVER_FIELDS}
+        with self._lock:
+            self._pending[(event.request_id, event.operation_id or 0)] = (
+                collection, event.command_name, shape, event.database_name, sample
+            )
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event, {})
+
+    def _finish(self, event, reply):
+        with self._lock:
+            pending = self._pending.pop((event.request_id, event.operation_id or 0), None)
+        if pending is None:
+            return
+        collection, command_name, shape, database_name, sample = pending
+        elapsed_ms = event.duration_micros / 1000.0
+        slow = elapsed_ms >= self.threshold_ms
+        key = (collection, command_name, shape)
+
+        with self._lock:
+            stats = self._shapes.get(key)
+            new_shape = stats is None
+            if new_shape:
+                if len(self._shapes) >= MAX_SHAPES:
+                    return
+                stats = self._shapes[key] = ShapeStats(collection, command_name, shape)
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.docs_returned += _returned_docs(command_name, reply)
+            if slow:
+                stats.slow_count += 1
+            wants_explain = slow and sample is not None and stats.explain is None
+            if wants_explain:
+                stats.explain = {"status": "queued"}
+
+        if slow:
+            logger.warning(
+                f"Slow query: {database_name}.{collection} {command_name} "
+                f"{elapsed_ms:.1f}ms shape={shape}"
+            )
+        if wants_explain and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._enqueue, key, database_name, sample)
+
+    # ---- background explain ----
+
+    def _enqueue(self, key, database_name, sample):
+        try:
+            self._explain_queue.put_nowait((key, database_name, sample))
+        except asyncio.QueueFull:
+            with self._lock:
+                self._shapes[key].explain = None
+
+    def start(self, client):
+        """Start the explain worker on the running loop (call from startup)"""
+        if not self.explain_enabled or self._explain_task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._explain_queue = asyncio.Queue(maxsize=100)
+        self._explain_task = asyncio.create_task(self._explain_worker(client))
+
+    async def stop(self):
+        if self._explain_task is not None:
+            self._explain_task.cancel()
+            try:
+                await self._explain_task
+            except asyncio.CancelledError:
+                pass
+            self._explain_task = None
+            self._loop = None
+
+    async def _explain_worker(self, client):
+        while True:
+            key, database_name, sample = await self._explain_queue.get()
+            try:
+                # explain is not in _TRACKED, so this does not feed back into the stats
+                result = await client[database_name].command(
+                    {"explain": sample, "verbosity": "executionStats"}
+                )
+                summary = summarize_plan(result)
+            except Exception as e:
+                summary = {"status": "failed", "error": str(e)}
+            with self._lock:
+                if key in self._shapes:
+                    self._shapes[key].explain = summary
+            if summary.get("plan") == "COLLSCAN":
+                logger.warning(f"COLLSCAN on {key[0]} for {key[1]} shape={key[2]}")
+
+    # ---- reporting ----
+
+    def report(self, sort_by: str = "total_ms", limit: int = 50) -> dict:
+        with self._lock:
+            shapes = [stats.as_dict() for stats in self._shapes.values()]
+        shapes.sort(key=lambda item: item.get(sort_by) or 0, reverse=True)
+        return {
+            "threshold_ms": self.threshold_ms,
+            "explain_enabled": self.explain_enabled,
+            "shape_count": len(shapes),
+            "shapes": shapes[:limit],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+listener = QueryStatsListener()
@@ -0,0 +1,77 @@
+"""Per-route read routing between the primary and secondaries
+
+Two read classes:
+
+- ``consistent``: primary. Auth, booking, approval queues and anything read
+  right after a write so users see their own changes, including the company
+  and user lists the management pages reload after saving. A lagging
+  secondary would also answer their ETag revalidation with a stale 304.
+- ``analytics``: secondaryPreferred with a max-staleness bound. Dashboard
+  stats, the hotel catalog and the audit log, which tolerate slightly old
+  data and should not compete with booking writes on the primary.
+
+Writes always go to the primary regardless of the handle's read preference.
+On a standalone server secondaryPreferred simply reads from that server.
+"""
+from typing import Dict
+
+from pymongo.read_preferences import SecondaryPreferred
+
+import metrics
+
+CONSISTENT = "consistent"
+ANALYTICS = "analytics"
+READ_CLASSES = (CONSISTENT, ANALYTICS)
+
+# Route name -> read class; READ_ROUTES overrides entries at startup
+DEFAULT_ROUTES: Dict[str, str] = {
+    "dashboard_stats": ANALYTICS,
+    "hotel_search": ANALYTICS,
+    "hotel_detail": ANALYTICS,
+    "audit_events": ANALYTICS,
+    "company_list": CONSISTENT,
+    "company_detail": CONSISTENT,
+    "user_list": CONSISTENT,
+    "reservation_list": CONSISTENT,
+    "reservation_detail": CONSISTENT,
+    "approvals_pending": CONSISTENT,
+}
+
+mongo_reads_routed_total = metrics.REGISTRY.counter(
+    "mongo_reads_routed_total", "Requests served per read class", ("route", "read_class"))
+
+
+def parse_routes(value: str) -> Dict[str, str]:
+    """Parse "route=class,route=class"; raises RuntimeError on unknown classes"""
+    routes = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        route, _, read_class = part.partition("=")
+        read_class = read_class.strip()
+        if read_class not in READ_CLASSES:
+            raise RuntimeError(f"READ_ROUTES: unknown read class '{read_class}' for route '{route.strip()}'")
+        routes[route.strip()] = read_class
+    return routes
+
+
+class ReadRouter:
+    """Hands out a database handle with the read preference configured for a route"""
+
+    def __init__(self, max_staleness_seconds: int, overrides: Dict[str, str] = None):
+        self.read_preference = SecondaryPreferred(max_staleness=max_staleness_seconds)
+        self.routes = {**DEFAULT_ROUTES, **(overrides or {})}
+        # Keyed by id() so tests/benchmarks that swap the database get a fresh handle
+        self._analytics = {}
+
+    def read_class(self, route: str) -> str:
+        return self.routes.get(route, CONSISTENT)
+
+    def database(self, database, route: str):
+        read_class = self.read_class(route)
+        mongo_reads_routed_total.inc(route=route, read_class=read_class)
+        if read_class == CONSISTENT:
+            return database
+        cached = self._analytics.get(id(database))
+        if cached is None or cached[0] is not database:
+            cached = self._analytics[id(database)] = (
+                database, database.client.get_database(database.name, read_preference=self.read_preference))
+        return cached[1]
@@ -1,51 +1,57 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
 from fastapi.security import HTTPBearer
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
 import os
+import asyncio
+import hashlib
+import json
 import logging
+import uuid
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
-# Exchange rates (mock - in production, use real-time API)
-EXCHANGE_RATES = {
-    "TRY": 1.0,
-    "USD": 32.50,
-    "EUR": 35.20,
-    "GBP": 41.30
-}
-
-def convert_to_try(amount: float, currency: str) -> float:
-    """Convert amount to TRY"""
-    return amount * EXCHANGE_RATES.get(currency, 1.0)
-
 
-def get_applicable_rule(company_rules: dict, user: dict) -> dict:
-    """Get the applicable booking rule for a user"""
+def compile_booking_rules(company_rules: dict) -> List[dict]:
+    """Rules sorted by priority (lowest number = highest priority) with target lists as sets"""
     rules_list = company_rules.get('rules', [])
-    
-    # Sort by priority (lowest number = highest priority)
-    sorted_rules = sorted(rules_list, key=lambda x: x.get('priority', 100))
+    return [
+        {
+            'rule': rule,
+            'applies_to': rule.get('applies_to', 'all'),
+            'employees': set(rule.get('employee_list', [])),
+            'departments': set(rule.get('department_list', [])),
+        }
+        for rule in sorted(rules_list, key=lambda x: x.get('priority', 100))
+    ]
+
+
+def get_applicable_rule(company_rules: dict, user: dict, compiled: Optional[List[dict]] = None) -> dict:
+    """Get the applicable booking rule for a user"""
+    sorted_rules = compiled if compiled is not None else compile_booking_rules(company_rules)
     
     user_id = user.get('id')
     user_department = user.get('department')
     
-    for rule in sorted_rules:
-        applies_to = rule.get('applies_to', 'all')
+    for entry in sorted_rules:
+        applies_to = entry['applies_to']
         
         if applies_to == 'all':
-            return rule
+            return entry['rule']
         elif applies_to == 'employees':
-            if user_id in rule.get('employee_list', []):
-                return rule
+            if user_id in entry['employees']:
+                return entry['rule']
         elif applies_to == 'departments':
-            if user_department and user_department in rule.get('department_list', []):
-                return rule
+            if user_department and user_department in entry['departments']:
+                return entry['rule']
     
     # Fallback: return first rule or default
-    return sorted_rules[0] if sorted_rules else {
+    return sorted_rules[0]['rule'] if sorted_rules else {
         'requires_manager_approval': True,
         'hotel_max_stars': 5
     }
@@ -56,22 +62,88 @@ from models import (
     Company, CompanyCreate, CompanyUpdateBasic, ServiceFeeUpdate,
     Hotel, HotelSearchRequest,
     Reservation, HotelReservationCreate, ReservationUpdate, ReservationResponse,
-    ReservationStatus, UserRole, ServiceType,
-    Token, DashboardStats
+    ReservationBulkStatusUpdate, ReservationBulkStatusItem, ReservationBulkStatusResponse,
+    BulkStatusResult, PendingApprovalsResponse,
+    ReservationStatus, UserRole, ServiceType, allowed_source_statuses,
+    Token, DashboardStats, BootstrapResponse, AuditAction, AuditEventPage,
+    LiveEventType, ReservationLiveEvent, FlightSearchRequest, FlightSearchResponse,
+    Trip, TripCreate, TripResponse, TransferZone, QuoteRequest, QuoteResponse
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
+    get_password_hash_async, verify_password_async, create_access_token,
     get_current_user, require_role
 )
 from mock_data import init_mock_hotels
+from idempotency import IDEMPOTENCY_HEADER, ensure_idempotency_indexes, run_idempotent
+import metrics
+import query_stats
+import profiling
+from db_settings import DBSettings, prewarm_pool
+from read_routing import ReadRouter, parse_routes
+from cache import build_cache
+import http_cache
+import compression
+from audit import audit_log, ensure_audit_indexes
+from jobs import JOBS_WORKER, JobWorker, enqueue, ensure_job_indexes, retry_dead_job
+from notifications import reservation_jobs
+from archival import archived_totals, ensure_archive_indexes, find_reservation, schedule_archival
+import change_feed as feed
+from live_updates import LiveBroker
+from flights import FlightSearch, build_flight_suppliers
+from pricing import calculate_service_fee, convert_to_try
+from transfers import quote_engine, within_limits
+from trips import (RELEASING_STATUSES, ensure_trip_indexes, flight_holds, hotel_holds, release_holds, trip_status,
+                   write_reservation, write_trip)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'reservation_system')]
+# MongoDB connection (pool size and timeouts from MONGO_* env, see db_settings.py)
+db_settings = DBSettings.from_env()
+pool_metrics = metrics.PoolMetrics()
+POOL_DEGRADED_WAIT_MS = float(os.environ.get('POOL_DEGRADED_WAIT_MS', 50))
+client = AsyncIOMotorClient(
+    db_settings.mongo_url,
+    event_listeners=[metrics.MongoCommandMetrics(), query_stats.listener, pool_metrics],
+    **db_settings.client_kwargs()
+)
+db = client[db_settings.db_name]
+
+# Consistent reads stay on the primary; analytics reads may use secondaries (see read_routing.py)
+read_router = ReadRouter(db_settings.analytics_max_staleness_seconds, parse_routes(db_settings.read_routes))
+
+# Principal, catalog and compiled-rule caches (CACHE_BACKEND=local|shared, see cache.py)
+cache = build_cache()
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', 60))
+# Encoded hotel detail / default search bodies, dropped with the catalog namespace
+precompressed = compression.PrecompressedCatalog(cache)
+
+# Writes from other workers and scripts reach the caches above through the change feed (CHANGE_FEED, see change_feed.py)
+def _invalidate_rules(event):
+    cache.invalidate("rules", event.entity_id)
+
+
+def _invalidate_principal(event):
+    cache.invalidate("principal", event.entity_id)
+
+
+def _invalidate_catalog(event):
+    cache.invalidate("catalog")
+
+
+feed.change_feed.subscribe(feed.COMPANY_RULES_CHANGED, _invalidate_rules)
+feed.change_feed.subscribe((feed.USER_DEACTIVATED, feed.USER_UPDATED), _invalidate_principal)
+feed.change_feed.subscribe(feed.HOTEL_UPDATED, _invalidate_catalog)
+
+# Reservation deltas pushed to /api/events/stream (LIVE_BACKEND=local|mongo, see live_updates.py)
+live = LiveBroker()
+feed.change_feed.subscribe(feed.USER_DEACTIVATED, lambda event: live.disconnect_user(event.entity_id))
+
+# Supplier fan-out for flight search (FLIGHT_SUPPLIERS, see flights.py); results cached in the "flights" namespace
+flight_search = FlightSearch(build_flight_suppliers(), cache, convert_to_try)
+
+# Notifications and post-booking work (JOBS_WORKER=inprocess|off, see jobs.py)
+job_worker = JobWorker()
 
 # Create the main app
 app = FastAPI(title="Corporate Reservation System API")
@@ -93,9 +165,52 @@ async def get_db():
     return db
 
 
+def get_read_db(route: str):
+    """Dependency returning the database handle for a route's read class"""
+    async def dependency():
+        return read_router.database(db, route)
+    return dependency
+
+
+async def ensure_reservation_indexes(database):
+    """Indexes behind the role-scoped reservation listings and approval queues"""
+    await database.reservations.create_index("id", unique=True, name="id_unique")
+    await database.reservations.create_index(
+        [("approver_id", 1), ("status", 1), ("created_at", -1)], name="approver_status_created"
+    )
+    await database.reservations.create_index(
+        [("company_id", 1), ("status", 1), ("created_at", -1)], name="company_status_created"
+    )
+    await database.reservations.create_index(
+        [("user_id", 1), ("status", 1), ("created_at", -1)], name="user_status_created"
+    )
+
+
 # Dependency to get current user with db
 async def get_current_user_dep(credentials = Depends(security)):
-    return await get_current_user(credentials, db)
+    return await get_current_user(credentials, db, cache, PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+async def _get_hotel_doc(database, hotel_id: str) -> Optional[dict]:
+    return await cache.get_or_load(
+        "catalog", hotel_id, lambda: database.hotels.find_one({"id": hotel_id}, {"_id": 0})
+    )
+
+
+async def _get_booking_context(database, company_id: str) -> Optional[dict]:
+    """Company service fees and compiled booking rules, cached per company"""
+    async def load():
+        company = await database.companies.find_one(
+            {"id": company_id}, {"_id": 0, "service_fees": 1, "booking_rules": 1}
+        )
+        if company is None:
+            return None
+        return {
+            'service_fees': company.get('service_fees', {}),
+            'rules': compile_booking_rules(company.get('booking_rules', {}))
+        }
+    
+    return await cache.get_or_load("rules", company_id, load)
 
 
 # Role-based dependencies
@@ -140,8 +255,23 @@ async def require_admin_or_manager_or_agency(current_user: dict = Depends(get_cu
 # ==================== AUTHENTICATION ENDPOINTS ====================
 
 @api_router.post("/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, database = Depends(get_db)):
+async def register(
+    user_data: UserCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    database = Depends(get_db)
+):
     """Register a new user"""
+    # No caller id before registration: scope by the submitted email (hashed, it is stored with the key)
+    email_hash = hashlib.sha256(user_data.email.lower().encode("utf-8")).hexdigest()
+    return await run_idempotent(
+        database, idempotency_key, f"register:{email_hash}", user_data,
+        lambda: _register_user(user_data, database), response
+    )
+
+
+async def _register_user(user_data: UserCreate, database) -> UserResponse:
+    """Insert a self-registered user"""
     # Check if user already exists
     existing_user = await database.users.find_one({"email": user_data.email}, {"_id": 0})
     if existing_user:
@@ -153,7 +283,7 @@ async def register(user_data: UserCreate, database = Depends(get_db)):
     # Create new user
     user = User(
         **user_data.model_dump(exclude={'password'}),
-        password_hash=get_password_hash(user_data.password)
+        password_hash=await get_password_hash_async(user_data.password)
     )
     
     # Convert to dict for MongoDB
@@ -177,7 +307,7 @@ async def login(credentials: UserLogin, database = Depends(get_db)):
     """Login user and return access token"""
     # Find user
     user = await database.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user['password_hash']):
+    if not user or not await verify_password_async(credentials.password, user['password_hash']):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -228,6 +358,7 @@ async def update_me(
             {"id": current_user['id']},
             {"$set": update_data}
         )
+        cache.invalidate("principal", current_user['id'])
     
     updated_user = await database.users.find_one({"id": current_user['id']}, {"_id": 0})
     return UserResponse(**updated_user)
@@ -248,6 +379,7 @@ async def accept_gdpr(
             "updated_at": datetime.utcnow().isoformat()
         }}
     )
+    cache.invalidate("principal", current_user['id'])
     return {"message": "GDPR policy accepted successfully"}
 
 
@@ -256,10 +388,20 @@ async def accept_gdpr(
 @api_router.post("/companies", response_model=Company, status_code=status.HTTP_201_CREATED)
 async def create_company(
     company_data: CompanyCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     current_user: dict = Depends(require_agency_admin),
     database = Depends(get_db)
 ):
     """Create a new company (AGENCY_ADMIN only)"""
+    return await run_idempotent(
+        database, idempotency_key, f"create_company:{current_user['id']}", company_data,
+        lambda: _insert_company(company_data, database), response
+    )
+
+
+async def _insert_company(company_data: CompanyCreate, database) -> Company:
+    """Insert a new company document"""
     company = Company(**company_data.model_dump())
     
     company_dict = company.model_dump()
@@ -270,13 +412,34 @@ async def create_company(
     return company
 
 
+def _company_list_validators(companies: List[dict]) -> tuple:
+    """(ETag, Last-Modified) of a company list, from each company's (id, updated_at)"""
+    etag = http_cache.make_etag(*(f"{c.get('id')}@{c.get('updated_at')}" for c in companies))
+    return etag, http_cache.latest(c.get('updated_at') for c in companies)
+
+
 @api_router.get("/companies", response_model=List[Company])
 async def get_companies(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user_dep),
-    database = Depends(get_db)
+    database = Depends(get_read_db("company_list"))
 ):
     """Get all companies"""
+    # Validators come from (id, updated_at) alone so a 304 never loads full documents
+    stamps = await database.companies.find({}, {"_id": 0, "id": 1, "updated_at": 1}).to_list(1000)
+    not_modified = http_cache.conditional(
+        request, response, *_company_list_validators(stamps), http_cache.COMPANY_CACHE_CONTROL
+    )
+    if not_modified:
+        return not_modified
+    
     companies = await database.companies.find({}, {"_id": 0}).to_list(1000)
+    # Re-derived from the documents returned: a company updated between the two reads must not
+    # leave the new body under the old ETag
+    response.headers.update(http_cache.validator_headers(
+        *_company_list_validators(companies), http_cache.COMPANY_CACHE_CONTROL
+    ))
     
     for company in companies:
         if isinstance(company.get('created_at'), str):
@@ -290,14 +453,23 @@ async def get_companies(
 @api_router.get("/companies/{company_id}", response_model=Company)
 async def get_company(
     company_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user_dep),
-    database = Depends(get_db)
+    database = Depends(get_read_db("company_detail"))
 ):
     """Get company by ID"""
     company = await database.companies.find_one({"id": company_id}, {"_id": 0})
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
+    not_modified = http_cache.conditional(
+        request, response, http_cache.make_etag(company['id'], company.get('updated_at')),
+        company.get('updated_at'), http_cache.COMPANY_CACHE_CONTROL
+    )
+    if not_modified:
+        return not_modified
+    
     if isinstance(company.get('created_at'), str):
         company['created_at'] = datetime.fromisoformat(company['created_at'])
     if isinstance(company.get('updated_at'), str):
@@ -330,6 +502,7 @@ async def update_company(
         {"id": company_id},
         {"$set": update_data}
     )
+    cache.invalidate("rules", company_id)
     
     updated = await database.companies.find_one({"id": company_id}, {"_id": 0})
     if isinstance(updated.get('created_at'), str):
@@ -375,6 +548,13 @@ async def update_service_fees(
         {"id": company_id},
         {"$set": update_data}
     )
+    cache.invalidate("rules", company_id)
+    await audit_log.record(
+        AuditAction.SERVICE_FEES_UPDATED, "company", company_id, current_user,
+        before={'service_fees': existing.get('service_fees')},
+        after={'service_fees': update_data['service_fees']},
+        company_id=company_id
+    )
     
     return {"message": "Service fees updated successfully", "service_fees": update_data['service_fees']}
 
@@ -384,8 +564,9 @@ async def update_service_fees(
 @api_router.post("/hotels/search", response_model=List[Hotel])
 async def search_hotels(
     search: HotelSearchRequest,
+    request: Request,
     current_user: dict = Depends(get_current_user_dep),
-    database = Depends(get_db)
+    database = Depends(get_read_db("hotel_search"))
 ):
     """Search hotels based on criteria"""
     query = {"is_active": True}
@@ -402,19 +583,30 @@ async def search_hotels(
         else:
             query["stars"] = {"$lte": search.max_stars}
     
-    hotels = await database.hotels.find(query, {"_id": 0}).to_list(1000)
+    # Cached per (city, stars) filter; the price filter below runs on the cached list
+    search_key = f"search:{(search.city or '').lower()}:{search.min_stars}:{search.max_stars}"
     
-    # Filter by price if specified
-    if search.max_price:
-        filtered_hotels = []
-        for hotel in hotels:
-            has_affordable_room = any(
-                room['price_per_night'] <= search.max_price
-                for room in hotel.get('room_types', [])
-            )
-            if has_affordable_room:
-                filtered_hotels.append(hotel)
-        hotels = filtered_hotels
+    async def load_hotels():
+        return await cache.get_or_load(
+            "catalog", search_key, lambda: database.hotels.find(query, {"_id": 0}).to_list(1000)
+        )
+    
+    if not search.max_price:
+        # Without a price filter the cached list is the whole answer: keep it encoded per catalog generation
+        async def render():
+            return jsonable_encoder([Hotel(**hotel) for hotel in await load_hotels()])
+        
+        encoding = compression.negotiate(request.headers.get("accept-encoding"))
+        body = await precompressed.get_or_render(search_key, encoding, render)
+        return compression.encoded_response(body, encoding)
+    
+    hotels = await load_hotels()
+    
+    # Filter by price
+    hotels = [
+        hotel for hotel in hotels
+        if any(room['price_per_night'] <= search.max_price for room in hotel.get('room_types', []))
+    ]
     
     for hotel in hotels:
         if isinstance(hotel.get('created_at'), str):
@@ -426,18 +618,103 @@ async def search_hotels(
 @api_router.get("/hotels/{hotel_id}", response_model=Hotel)
 async def get_hotel(
     hotel_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user_dep),
-    database = Depends(get_db)
+    database = Depends(get_read_db("hotel_detail"))
 ):
     """Get hotel details by ID"""
-    hotel = await database.hotels.find_one({"id": hotel_id}, {"_id": 0})
+    hotel = await _get_hotel_doc(database, hotel_id)
     if not hotel:
         raise HTTPException(status_code=404, detail="Hotel not found")
     
+    etag = http_cache.make_etag(hotel['id'], hotel.get('version', 1))
+    last_modified = hotel.get('updated_at') or hotel.get('created_at')
+    not_modified = http_cache.conditional(
+        request, response, etag, last_modified, http_cache.CATALOG_CACHE_CONTROL
+    )
+    if not_modified:
+        return not_modified
+    
     if isinstance(hotel.get('created_at'), str):
         hotel['created_at'] = datetime.fromisoformat(hotel['created_at'])
     
-    return Hotel(**hotel)
+    async def render():
+        return jsonable_encoder(Hotel(**hotel))
+    
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    body = await precompressed.get_or_render(f"hotel:{etag}", encoding, render)
+    return compression.encoded_response(
+        body, encoding, http_cache.validator_headers(etag, last_modified, http_cache.CATALOG_CACHE_CONTROL)
+    )
+
+
+# ==================== FLIGHT ENDPOINTS ====================
+
+@api_router.post("/flights/search", response_model=FlightSearchResponse)
+async def search_flights(
+    search: FlightSearchRequest,
+    current_user: dict = Depends(get_current_user_dep),
+    database = Depends(get_db)
+):
+    """Search all flight suppliers; fares are flagged against the user's flight_limits"""
+    if search.origin == search.destination:
+        raise HTTPException(status_code=400, detail="Origin and destination must differ")
+    if search.departure_date < datetime.utcnow().date():
+        raise HTTPException(status_code=400, detail="Departure date is in the past")
+    
+    limits = None
+    if current_user.get('company_id'):
+        company = await _get_booking_context(database, current_user['company_id'])
+        if company:
+            limits = get_applicable_rule({}, current_user, company['rules']).get('flight_limits')
+    
+    return await flight_search.search(search, limits)
+
+
+# ==================== TRANSFER ENDPOINTS ====================
+
+@api_router.get("/transfers/zones", response_model=List[TransferZone])
+async def get_transfer_zones(current_user: dict = Depends(get_current_user_dep)):
+    """Airports and hotel districts that transfers and car rentals can start or end at"""
+    return quote_engine.zones
+
+
+@api_router.post("/transfers/quote", response_model=QuoteResponse)
+async def quote_ground_transport(
+    quote: QuoteRequest,
+    current_user: dict = Depends(get_current_user_dep),
+    database = Depends(get_db)
+):
+    """Price all transfer legs and car rentals of a trip at once, from in-memory tables"""
+    try:
+        transfers = quote_engine.quote_transfers(quote.transfers)
+        car_rentals = [quote_engine.quote_car_rental(rental) for rental in quote.car_rentals]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Fees and limits come from the cached booking context
+    company = None
+    if current_user.get('company_id'):
+        company = await _get_booking_context(database, current_user['company_id'])
+    rule = get_applicable_rule({}, current_user, company['rules']) if company else {}
+    fees = company.get('service_fees', {}) if company else {}
+    
+    for item in transfers:
+        if item['available']:
+            item['service_fee'] = calculate_service_fee(fees.get('transfer', {}), item['price'])
+            item['total'] = item['price'] + item['service_fee']
+        item['in_policy'] = within_limits(item['price'], rule.get('transfer_limits'))
+    for item in car_rentals:
+        item['service_fee'] = calculate_service_fee(fees.get('car_rental', {}), item['price'])
+        item['total'] = item['price'] + item['service_fee']
+        item['in_policy'] = within_limits(item['price'], rule.get('car_rental_limits'))
+    
+    return QuoteResponse(
+        transfers=transfers,
+        car_rentals=car_rentals,
+        total=sum(item['total'] for item in transfers + car_rentals if item.get('total') is not None)
+    )
 
 
 # ==================== RESERVATION ENDPOINTS ====================
@@ -445,12 +722,26 @@ async def get_hotel(
 @api_router.post("/reservations", response_model=Reservation, status_code=status.HTTP_201_CREATED)
 async def create_reservation(
     reservation_data: HotelReservationCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     current_user: dict = Depends(get_current_user_dep),
     database = Depends(get_db)
 ):
     """Create a new hotel reservation"""
+    return await run_idempotent(
+        database, idempotency_key, f"create_reservation:{current_user['id']}", reservation_data,
+        lambda: _insert_reservation(reservation_data, current_user, database), response
+    )
+
+
+async def _insert_reservation(
+    reservation_data: HotelReservationCreate,
+    current_user: dict,
+    database
+) -> Reservation:
+    """Price and insert a hotel reservation"""
     # Get hotel and room details
-    hotel = await database.hotels.find_one({"id": reservation_data.hotel_id}, {"_id": 0})
+    hotel = await _get_hotel_doc(database, reservation_data.hotel_id)
     if not hotel:
         raise HTTPException(status_code=404, detail="Hotel not found")
     
@@ -467,37 +758,20 @@ async def create_reservation(
     total_price = price_per_night * nights
     
     # Get company and service fee
-    company = await database.companies.find_one({"id": current_user['company_id']}, {"_id": 0})
+    company = await _get_booking_context(database, current_user['company_id'])
     service_fee = 0.0
     requires_approval = True
+    # Employee-level approver wins; otherwise the matching rule may name one
+    approver_id = current_user.get('approver_id')
     
     if company:
         # Calculate service fee based on type (fixed or percentage)
-        hotel_fee_config = company.get('service_fees', {}).get('hotel', {})
-        
-        # Handle both old format (float) and new format (dict)
-        if isinstance(hotel_fee_config, dict):
-            fee_type = hotel_fee_config.get('type', 'fixed')
-            fee_value = hotel_fee_config.get('value', 0.0)
-            additional_fee = hotel_fee_config.get('additional_fee', 0.0)
-            currency = hotel_fee_config.get('currency', 'TRY')
-            
-            if fee_type == 'percentage':
-                # Percentage is always calculated on the base price
-                service_fee = (total_price * fee_value / 100)
-                # Convert additional fee to TRY if in different currency
-                service_fee += convert_to_try(additional_fee, currency)
-            else:  # fixed
-                # Convert both value and additional fee to TRY
-                service_fee = convert_to_try(fee_value, currency) + convert_to_try(additional_fee, currency)
-        else:
-            # Backward compatibility for old float format
-            service_fee = float(hotel_fee_config) if hotel_fee_config else 0.0
+        service_fee = calculate_service_fee(company.get('service_fees', {}).get('hotel', {}), total_price)
         
         # Get applicable rule for this user
-        booking_rules = company.get('booking_rules', {})
-        applicable_rule = get_applicable_rule(booking_rules, current_user)
+        applicable_rule = get_applicable_rule({}, current_user, company['rules'])
         requires_approval = applicable_rule.get('requires_manager_approval', True)
+        approver_id = approver_id or applicable_rule.get('approver_id')
     
     grand_total = total_price + service_fee
     
@@ -512,6 +786,7 @@ async def create_reservation(
         service_fee=service_fee,
         grand_total=grand_total,
         requires_approval=requires_approval,
+        approver_id=approver_id if requires_approval else None,
         status=ReservationStatus.PENDING if requires_approval else ReservationStatus.CONFIRMED
     )
     
@@ -520,69 +795,114 @@ async def create_reservation(
     reservation_dict['updated_at'] = reservation_dict['updated_at'].isoformat()
     reservation_dict['check_in_date'] = reservation_dict['check_in_date'].isoformat()
     reservation_dict['check_out_date'] = reservation_dict['check_out_date'].isoformat()
+    # Same room-night counters as trips, so the two cannot oversell each other
+    reservation_dict['inventory_holds'] = hotel_holds(
+        hotel['id'], room_type, reservation_data.check_in_date, reservation_data.check_out_date
+    )
     
-    await database.reservations.insert_one(reservation_dict)
+    await write_reservation(database, reservation_dict)
+    # Emails and the voucher run in the job worker, not on the request path
+    await enqueue(database, *reservation_jobs(reservation_dict, "created"))
+    # The booker is the current user, so the delta needs no enrichment query
+    await _publish_reservation_event(
+        LiveEventType.RESERVATION_CREATED, reservation_dict,
+        ReservationResponse(**reservation.model_dump(), user_name=current_user.get('full_name'),
+                            user_email=current_user.get('email'))
+    )
     return reservation
 
 
+async def _publish_reservation_event(event_type: LiveEventType, reservation: dict,
+                                     response: Optional[ReservationResponse] = None,
+                                     previous_status: Optional[str] = None):
+    event = ReservationLiveEvent(
+        type=event_type,
+        reservation_id=reservation['id'],
+        status=reservation['status'],
+        previous_status=previous_status,
+        company_id=reservation.get('company_id'),
+        user_id=reservation.get('user_id'),
+        approver_id=reservation.get('approver_id'),
+        reservation=response
+    )
+    await live.publish(event.model_dump(mode="json"))
+
+
+def _parse_reservation_dates(reservation: dict) -> dict:
+    """Convert stored ISO strings back to date/datetime objects"""
+    for field in ('created_at', 'updated_at', 'approved_at', 'cancelled_at'):
+        if isinstance(reservation.get(field), str):
+            reservation[field] = datetime.fromisoformat(reservation[field])
+    for field in ('check_in_date', 'check_out_date'):
+        if isinstance(reservation.get(field), str):
+            reservation[field] = date.fromisoformat(reservation[field])
+    return reservation
+
+
+async def _enrich_reservations(reservations: List[dict], database) -> List[dict]:
+    """Attach user and company names with one batched query per collection"""
+    user_ids = list({res['user_id'] for res in reservations if res.get('user_id')})
+    company_ids = list({res['company_id'] for res in reservations if res.get('company_id')})
+    
+    users = {}
+    if user_ids:
+        async for user in database.users.find(
+            {"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "full_name": 1, "email": 1}
+        ):
+            users[user['id']] = user
+    
+    companies = {}
+    if company_ids:
+        async for company in database.companies.find(
+            {"id": {"$in": company_ids}}, {"_id": 0, "id": 1, "name": 1}
+        ):
+            companies[company['id']] = company
+    
+    for res in reservations:
+        _parse_reservation_dates(res)
+        user = users.get(res.get('user_id'))
+        if user:
+            res['user_name'] = user.get('full_name')
+            res['user_email'] = user.get('email')
+        company = companies.get(res.get('company_id'))
+        if company:
+            res['company_name'] = company.get('name')
+    
+    return reservations
+
+
 @api_router.get("/reservations", response_model=List[ReservationResponse])
 async def get_reservations(
     status: Optional[ReservationStatus] = None,
+    include_archived: bool = False,
     current_user: dict = Depends(get_current_user_dep),
-    database = Depends(get_db)
+    database = Depends(get_read_db("reservation_list"))
 ):
     """Get reservations based on user role"""
-    query = {}
-    
-    # Filter based on role
-    if current_user['role'] == UserRole.EMPLOYEE:
-        query['user_id'] = current_user['id']
-    elif current_user['role'] == UserRole.MANAGER:
-        query['company_id'] = current_user['company_id']
-    # Admin sees all
+    query = _reservation_scope(current_user)
     
     if status:
         query['status'] = status
     
     reservations = await database.reservations.find(query, {"_id": 0}).to_list(1000)
+    if include_archived:
+        # Finished trips older than ARCHIVE_AFTER_DAYS live in reservations_archive
+        reservations += await database.reservations_archive.find(
+            query, {"_id": 0, "archived_at": 0}
+        ).sort("created_at", -1).to_list(max(0, 1000 - len(reservations)))
     
     # Enrich with user and company information
-    for res in reservations:
-        # Convert date strings to datetime/date objects
-        if isinstance(res.get('created_at'), str):
-            res['created_at'] = datetime.fromisoformat(res['created_at'])
-        if isinstance(res.get('updated_at'), str):
-            res['updated_at'] = datetime.fromisoformat(res['updated_at'])
-        if isinstance(res.get('check_in_date'), str):
-            res['check_in_date'] = date.fromisoformat(res['check_in_date'])
-        if isinstance(res.get('check_out_date'), str):
-            res['check_out_date'] = date.fromisoformat(res['check_out_date'])
-        if isinstance(res.get('approved_at'), str):
-            res['approved_at'] = datetime.fromisoformat(res['approved_at'])
-        if isinstance(res.get('cancelled_at'), str):
-            res['cancelled_at'] = datetime.fromisoformat(res['cancelled_at'])
-        
-        user = await database.users.find_one({"id": res['user_id']}, {"_id": 0})
-        if user:
-            res['user_name'] = user.get('full_name')
-            res['user_email'] = user.get('email')
-        
-        if res.get('company_id'):
-            company = await database.companies.find_one({"id": res['company_id']}, {"_id": 0})
-            if company:
-                res['company_name'] = company.get('name')
-    
-    return reservations
+    return await _enrich_reservations(reservations, database)
 
 
 @api_router.get("/reservations/{reservation_id}", response_model=ReservationResponse)
 async def get_reservation(
     reservation_id: str,
     current_user: dict = Depends(get_current_user_dep),
-    database = Depends(get_db)
+    database = Depends(get_read_db("reservation_detail"))
 ):
     """Get reservation by ID"""
-    reservation = await database.reservations.find_one({"id": reservation_id}, {"_id": 0})
+    reservation = await find_reservation(database, reservation_id)
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
     
@@ -590,34 +910,70 @@ async def get_reservation(
     if current_user['role'] == UserRole.EMPLOYEE and reservation['user_id'] != current_user['id']:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Convert dates
-    if isinstance(reservation.get('created_at'), str):
-        reservation['created_at'] = datetime.fromisoformat(reservation['created_at'])
-    if isinstance(reservation.get('updated_at'), str):
-        reservation['updated_at'] = datetime.fromisoformat(reservation['updated_at'])
-    if isinstance(reservation.get('check_in_date'), str):
-        reservation['check_in_date'] = date.fromisoformat(reservation['check_in_date'])
-    if isinstance(reservation.get('check_out_date'), str):
-        reservation['check_out_date'] = date.fromisoformat(reservation['check_out_date'])
-    if isinstance(reservation.get('approved_at'), str):
-        reservation['approved_at'] = datetime.fromisoformat(reservation['approved_at'])
-    if isinstance(reservation.get('cancelled_at'), str):
-        reservation['cancelled_at'] = datetime.fromisoformat(reservation['cancelled_at'])
-    
     # Enrich with user and company information
-    user = await database.users.find_one({"id": reservation['user_id']}, {"_id": 0})
-    if user:
-        reservation['user_name'] = user.get('full_name')
-        reservation['user_email'] = user.get('email')
-    
-    if reservation.get('company_id'):
-        company = await database.companies.find_one({"id": reservation['company_id']}, {"_id": 0})
-        if company:
-            reservation['company_name'] = company.get('name')
+    await _enrich_reservations([reservation], database)
     
     return ReservationResponse(**reservation)
 
 
+def _reservation_scope(current_user: dict) -> dict:
+    """Filter restricting which reservations a user may see or change"""
+    if current_user['role'] == UserRole.EMPLOYEE:
+        return {"user_id": current_user['id']}
+    if current_user['role'] == UserRole.MANAGER:
+        return {"company_id": current_user['company_id']}
+    return {}
+
+
+def _build_transition(updates: ReservationUpdate, current_user: dict) -> dict:
+    """Validate the requested status change and build its $set document"""
+    now = datetime.utcnow().isoformat()
+    update_data = updates.model_dump(exclude_unset=True)
+    update_data['updated_at'] = now
+    
+    if 'status' in update_data and update_data['status'] is None:
+        raise HTTPException(status_code=400, detail="Status cannot be null")
+    
+    if updates.status in (
+        ReservationStatus.APPROVED, ReservationStatus.CONFIRMED,
+        ReservationStatus.REJECTED, ReservationStatus.COMPLETED
+    ):
+        if current_user['role'] not in [UserRole.ADMIN, UserRole.MANAGER]:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Only managers and admins can set status to {updates.status.value}"
+            )
+    
+    # Handle status changes
+    if updates.status == ReservationStatus.APPROVED:
+        update_data['approved_by'] = current_user['id']
+        update_data['approved_at'] = now
+        update_data['status'] = ReservationStatus.CONFIRMED
+    
+    elif updates.status == ReservationStatus.CANCELLED:
+        update_data['cancelled_at'] = now
+    
+    return update_data
+
+
+_STATUS_AUDIT_ACTIONS = {
+    ReservationStatus.CONFIRMED: AuditAction.RESERVATION_APPROVED,  # Approval confirms the booking
+    ReservationStatus.REJECTED: AuditAction.RESERVATION_REJECTED,
+    ReservationStatus.CANCELLED: AuditAction.RESERVATION_CANCELLED,
+}
+
+
+async def _audit_reservation_change(current_user: dict, before: dict, update_data: dict):
+    fields = [field for field in update_data if field != 'updated_at']
+    await audit_log.record(
+        _STATUS_AUDIT_ACTIONS.get(update_data.get('status'), AuditAction.RESERVATION_UPDATED),
+        "reservation", before['id'], current_user,
+        before={field: before.get(field) for field in fields},
+        after={field: update_data[field] for field in fields},
+        company_id=before.get('company_id')
+    )
+
+
 @api_router.put("/reservations/{reservation_id}", response_model=ReservationResponse)
 async def update_reservation(
     reservation_id: str,
@@ -626,34 +982,355 @@ async def update_reservation(
     database = Depends(get_db)
 ):
     """Update reservation status (approve, reject, cancel)"""
-    reservation = await database.reservations.find_one({"id": reservation_id}, {"_id": 0})
-    if not reservation:
-        raise HTTPException(status_code=404, detail="Reservation not found")
-    
-    update_data = updates.model_dump(exclude_unset=True)
-    update_data['updated_at'] = datetime.utcnow().isoformat()
+    update_data = _build_transition(updates, current_user)
+    
+    query = {"id": reservation_id, **_reservation_scope(current_user)}
+    if 'status' in update_data:
+        # Conditional on the current status so concurrent or stale transitions cannot both win
+        query['status'] = {"$in": allowed_source_statuses(update_data['status'])}
+    
+    # BEFORE gives the audit trail the old values; the new document is the old one plus $set
+    previous = await database.reservations.find_one_and_update(
+        query,
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
     
-    # Handle status changes
-    if updates.status == ReservationStatus.APPROVED:
-        if current_user['role'] not in [UserRole.ADMIN, UserRole.MANAGER]:
-            raise HTTPException(status_code=403, detail="Only managers and admins can approve reservations")
-        update_data['approved_by'] = current_user['id']
-        update_data['approved_at'] = datetime.utcnow().isoformat()
-        update_data['status'] = ReservationStatus.CONFIRMED
+    if not previous:
+        # Only the failure path pays for a second read, to report why
+        current = await find_reservation(
+            database, reservation_id, {"_id": 0, "status": 1, "user_id": 1, "company_id": 1, "archived_at": 1}
+        )
+        if not current:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        if any(current.get(field) != value for field, value in _reservation_scope(current_user).items()):
+            raise HTTPException(status_code=403, detail="Access denied")
+        if current.get('archived_at'):
+            # Archived rows are immutable, whatever the update
+            raise HTTPException(status_code=409, detail="Reservation is archived")
+        target = update_data.get('status')
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot change reservation from {current['status']} to {target.value}" if target
+            else f"Reservation in status {current['status']} cannot be changed"
+        )
     
-    elif updates.status == ReservationStatus.REJECTED:
-        if current_user['role'] not in [UserRole.ADMIN, UserRole.MANAGER]:
-            raise HTTPException(status_code=403, detail="Only managers and admins can reject reservations")
+    await _audit_reservation_change(current_user, previous, update_data)
+    if update_data.get('status') in RELEASING_STATUSES:
+        await release_holds(database, previous)
+    reservation = {**previous, **update_data}
+    if 'status' in update_data:
+        await enqueue(database, *reservation_jobs(reservation, "status"))
+    await _enrich_reservations([reservation], database)
+    response = ReservationResponse(**reservation)
+    if 'status' in update_data:
+        await _publish_reservation_event(
+            LiveEventType.RESERVATION_STATUS_CHANGED, reservation, response, previous['status']
+        )
+    return response
+
+
+@api_router.post("/reservations/bulk-status", response_model=ReservationBulkStatusResponse)
+async def bulk_update_reservation_status(
+    bulk: ReservationBulkStatusUpdate,
+    current_user: dict = Depends(require_manager_or_admin),
+    database = Depends(get_db)
+):
+    """Approve, reject or cancel many reservations in one request (Manager/Admin only)"""
+    updates = ReservationUpdate(**bulk.model_dump(exclude_unset=True, exclude={'reservation_ids'}))
+    update_data = _build_transition(updates, current_user)
+    sources = allowed_source_statuses(update_data['status'])
+    scope = _reservation_scope(current_user)
+    reservation_ids = list(dict.fromkeys(bulk.reservation_ids))
+    
+    # One read to classify every row before writing
+    existing = {}
+    async for res in database.reservations.find(
+        {"id": {"$in": reservation_ids}},
+        {"_id": 0, "id": 1, "status": 1, "user_id": 1, "company_id": 1, "approver_id": 1, "inventory_holds": 1,
+         **{field: 1 for field in update_data}}
+    ):
+        existing[res['id']] = res
+    
+    results = {}
+    candidates = []
+    for reservation_id in reservation_ids:
+        res = existing.get(reservation_id)
+        if res is None:
+            results[reservation_id] = ReservationBulkStatusItem(
+                id=reservation_id, result=BulkStatusResult.NOT_FOUND
+            )
+        elif any(res.get(field) != value for field, value in scope.items()):
+            results[reservation_id] = ReservationBulkStatusItem(
+                id=reservation_id, result=BulkStatusResult.FORBIDDEN
+            )
+        elif res.get('status') not in sources:
+            results[reservation_id] = ReservationBulkStatusItem(
+                id=reservation_id, result=BulkStatusResult.STALE, status=res.get('status')
+            )
+        else:
+            candidates.append(reservation_id)
+    
+    applied_ids = set()
+    if candidates:
+        # Identifies the rows this request wrote even if another request changes them right after
+        bulk_op_id = str(uuid.uuid4())
+        # Same status condition as the single update, so rows changed since the read stay untouched
+        result = await database.reservations.bulk_write([
+            UpdateOne(
+                {"id": reservation_id, "status": {"$in": sources}, **scope},
+                {"$set": {**update_data, "bulk_op_id": bulk_op_id}}
+            )
+            for reservation_id in candidates
+        ], ordered=False)
+        
+        if result.modified_count == len(candidates):
+            applied_ids = set(candidates)
+        else:
+            # Some rows lost a race; the stamp identifies the ones this batch wrote
+            async for res in database.reservations.find(
+                {"id": {"$in": candidates}, "bulk_op_id": bulk_op_id},
+                {"_id": 0, "id": 1}
+            ):
+                applied_ids.add(res['id'])
+    
+    follow_up_jobs = []
+    for reservation_id in candidates:
+        if reservation_id in applied_ids:
+            await _audit_reservation_change(current_user, existing[reservation_id], update_data)
+            if update_data['status'] in RELEASING_STATUSES:
+                await release_holds(database, existing[reservation_id])
+            follow_up_jobs.extend(reservation_jobs({**existing[reservation_id], **update_data}, "status"))
+            # Status-only delta: the rows were never read in full, subscribers still hold them
+            await _publish_reservation_event(
+                LiveEventType.RESERVATION_STATUS_CHANGED, {**existing[reservation_id], **update_data},
+                previous_status=existing[reservation_id]['status']
+            )
+            results[reservation_id] = ReservationBulkStatusItem(
+                id=reservation_id, result=BulkStatusResult.APPLIED, status=update_data['status']
+            )
+        else:
+            results[reservation_id] = ReservationBulkStatusItem(
+                id=reservation_id, result=BulkStatusResult.STALE
+            )
     
-    elif updates.status == ReservationStatus.CANCELLED:
-        update_data['cancelled_at'] = datetime.utcnow().isoformat()
+    await enqueue(database, *follow_up_jobs)
     
-    await database.reservations.update_one(
-        {"id": reservation_id},
-        {"$set": update_data}
+    return ReservationBulkStatusResponse(
+        applied=len(applied_ids),
+        results=[results[reservation_id] for reservation_id in reservation_ids]
+    )
+
+
+# ==================== TRIP ENDPOINTS ====================
+
+@api_router.post("/trips", response_model=TripResponse, status_code=status.HTTP_201_CREATED)
+async def create_trip(
+    trip_data: TripCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    current_user: dict = Depends(get_current_user_dep),
+    database = Depends(get_db)
+):
+    """Book hotels and flights of one trip together, with one approval decision"""
+    return await run_idempotent(
+        database, idempotency_key, f"create_trip:{current_user['id']}", trip_data,
+        lambda: _insert_trip(trip_data, current_user, database), response
+    )
+
+
+async def _insert_trip(trip_data: TripCreate, current_user: dict, database) -> TripResponse:
+    """Price every component, then write them all or none (see trips.py)"""
+    if not trip_data.hotels and not trip_data.flights:
+        raise HTTPException(status_code=400, detail="A trip needs at least one hotel or flight")
+    
+    # Company, rule and fees once for the whole trip
+    company = None
+    if current_user.get('company_id'):
+        company = await _get_booking_context(database, current_user['company_id'])
+    rule = get_applicable_rule({}, current_user, company['rules']) if company else {}
+    fees = company.get('service_fees', {}) if company else {}
+    
+    components = []
+    policy_violations = False
+    hotel_ids = list(dict.fromkeys(item.hotel_id for item in trip_data.hotels))
+    hotels = dict(zip(hotel_ids, await asyncio.gather(*(_get_hotel_doc(database, hotel_id) for hotel_id in hotel_ids))))
+    for item in trip_data.hotels:
+        hotel = hotels.get(item.hotel_id)
+        if not hotel:
+            raise HTTPException(status_code=404, detail="Hotel not found")
+        room_type = next((r for r in hotel['room_types'] if r['id'] == item.room_type_id), None)
+        if not room_type:
+            raise HTTPException(status_code=404, detail="Room type not found")
+        nights = (item.check_out_date - item.check_in_date).days
+        if nights <= 0:
+            raise HTTPException(status_code=400, detail="Invalid date range")
+        total_price = room_type['price_per_night'] * nights
+        components.append(({
+            **item.model_dump(),
+            "service_type": ServiceType.HOTEL,
+            "hotel_name": hotel['name'],
+            "room_type_name": room_type['name'],
+            "nights": nights,
+            "price_per_night": room_type['price_per_night'],
+            "total_price": total_price,
+            "service_fee": calculate_service_fee(fees.get('hotel', {}), total_price),
+        }, hotel_holds(hotel['id'], room_type, item.check_in_date, item.check_out_date)))
+    
+    flight_limits = rule.get('flight_limits')
+    for item in trip_data.flights:
+        # Re-priced from the search cache (or suppliers) so the client cannot set the fare
+        result = await flight_search.search(FlightSearchRequest(**item.model_dump(exclude={'fare_id'})), flight_limits)
+        fare = next((f for f in result['fares'] if f['id'] == item.fare_id), None)
+        if not fare:
+            raise HTTPException(status_code=409, detail="Fare is no longer available, search again")
+        total_price = fare['price_try'] * item.passengers
+        policy_violations = policy_violations or bool(fare['policy_violations'])
+        components.append(({
+            "service_type": ServiceType.FLIGHT,
+            "flight_fare_id": fare['id'],
+            "flight_segments": fare['segments'],
+            "cabin": fare['cabin'],
+            "passengers": item.passengers,
+            "supplier": fare['supplier'],
+            "policy_violations": fare['policy_violations'],
+            "total_price": total_price,
+            "service_fee": calculate_service_fee(fees.get('flight', {}), total_price),
+        }, flight_holds(fare, item.passengers)))
+    
+    # One decision for the whole trip; an out-of-policy fare always needs a manager
+    requires_approval = rule.get('requires_manager_approval', True) or policy_violations
+    approver_id = (current_user.get('approver_id') or rule.get('approver_id')) if requires_approval else None
+    trip_status_value = ReservationStatus.PENDING if requires_approval else ReservationStatus.CONFIRMED
+    
+    trip = Trip(user_id=current_user['id'], company_id=current_user.get('company_id'), name=trip_data.name,
+                requires_approval=requires_approval, approver_id=approver_id, status=trip_status_value)
+    reservations = []
+    for fields, holds in components:
+        reservation = Reservation(
+            **fields,
+            user_id=current_user['id'],
+            company_id=current_user.get('company_id'),
+            trip_id=trip.id,
+            grand_total=fields['total_price'] + fields['service_fee'],
+            requires_approval=requires_approval,
+            approver_id=approver_id,
+            status=trip_status_value
+        ).model_dump(mode="json")
+        reservation['inventory_holds'] = holds
+        reservations.append(reservation)
+    trip.reservation_ids = [reservation['id'] for reservation in reservations]
+    trip.total_price = sum(reservation['total_price'] for reservation in reservations)
+    trip.service_fee = sum(reservation['service_fee'] for reservation in reservations)
+    trip.grand_total = trip.total_price + trip.service_fee
+    
+    await write_trip(database, trip.model_dump(mode="json"), reservations)
+    
+    await enqueue(database, *(job for reservation in reservations for job in reservation_jobs(reservation, "created")))
+    responses = []
+    for reservation in reservations:
+        responses.append(ReservationResponse(**reservation, user_name=current_user.get('full_name'),
+                                             user_email=current_user.get('email')))
+        await _publish_reservation_event(LiveEventType.RESERVATION_CREATED, reservation, responses[-1])
+    return TripResponse(**trip.model_dump(), reservations=responses)
+
+
+@api_router.get("/trips/{trip_id}", response_model=TripResponse)
+async def get_trip(
+    trip_id: str,
+    current_user: dict = Depends(get_current_user_dep),
+    database = Depends(get_read_db("reservation_detail"))
+):
+    """Trip with its component reservations; the status follows the components"""
+    trip = await database.trips.find_one({"id": trip_id, **_reservation_scope(current_user)}, {"_id": 0})
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    
+    reservations = await database.reservations.find(
+        {"id": {"$in": trip['reservation_ids']}}, {"_id": 0}
+    ).to_list(len(trip['reservation_ids']))
+    missing = set(trip['reservation_ids']) - {reservation['id'] for reservation in reservations}
+    if missing:
+        reservations += await database.reservations_archive.find(
+            {"id": {"$in": list(missing)}}, {"_id": 0, "archived_at": 0}
+        ).to_list(len(missing))
+    trip['status'] = trip_status(reservations) or trip['status']
+    await _enrich_reservations(reservations, database)
+    return TripResponse(**trip, reservations=reservations)
+
+
+# ==================== APPROVAL ENDPOINTS ====================
+
+@api_router.get("/approvals/pending", response_model=PendingApprovalsResponse)
+async def get_pending_approvals(
+    limit: int = Query(50, ge=1, le=200),
+    skip: int = Query(0, ge=0),
+    include_unassigned: bool = True,
+    current_user: dict = Depends(require_manager_or_admin),
+    database = Depends(get_read_db("approvals_pending"))
+):
+    """Pending reservations for the approval queue, newest first
+
+    Managers get the reservations routed to them plus the company's unassigned
+    ones. Admins keep the whole pending view they can act on (their
+    _reservation_scope), routed to anyone or not; `assigned`/`unassigned` still
+    break it down for them.
+    """
+    pending = {"status": ReservationStatus.PENDING}
+    assigned_query = {**pending, "approver_id": current_user['id']}
+    
+    if current_user['role'] == UserRole.ADMIN:
+        query = {**_reservation_scope(current_user), **pending}
+        queries = [query, {**query, "approver_id": current_user['id']}]
+        if include_unassigned:
+            queries.append({**query, "approver_id": None})
+        else:
+            query = {**query, "approver_id": {"$ne": None}}
+            queries[0] = query
+        counts = await asyncio.gather(*(database.reservations.count_documents(q) for q in queries))
+        total, assigned = counts[0], counts[1]
+        unassigned = counts[2] if include_unassigned else 0
+    else:
+        queries = [assigned_query]
+        # Bookings with no resolved approver stay visible to the company's managers
+        unassigned_query = None
+        if include_unassigned and current_user.get('company_id'):
+            unassigned_query = {**pending, "company_id": current_user['company_id'], "approver_id": None}
+            queries.append(unassigned_query)
+        query = queries[0] if len(queries) == 1 else {"$or": queries}
+        
+        counts = await asyncio.gather(*(database.reservations.count_documents(q) for q in queries))
+        assigned = counts[0]
+        unassigned = counts[1] if unassigned_query else 0
+        total = assigned + unassigned
+    
+    reservations = await database.reservations.find(query, {"_id": 0}) \
+        .sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    
+    return PendingApprovalsResponse(
+        total=total,
+        assigned=assigned,
+        unassigned=unassigned,
+        reservations=await _enrich_reservations(reservations, database)
+    )
+
+
+# ==================== LIVE UPDATE ENDPOINTS ====================
+
+@api_router.get("/events/stream")
+async def stream_events(
+    request: Request,
+    current_user: dict = Depends(get_current_user_dep)
+):
+    """Reservation create/status deltas visible to the current user, as Server-Sent Events"""
+    subscription = live.subscribe(current_user['id'], _reservation_scope(current_user))
+    return StreamingResponse(
+        live.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        # No proxy buffering or caching of an open stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    
-    return await get_reservation(reservation_id, current_user, database)
 
 
 # ==================== DASHBOARD ENDPOINTS ====================
@@ -661,17 +1338,14 @@ async def update_reservation(
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
     current_user: dict = Depends(get_current_user_dep),
-    database = Depends(get_db)
+    database = Depends(get_read_db("dashboard_stats"))
 ):
     """Get dashboard statistics based on user role"""
-    query = {}
-    
-    # Filter based on role
-    if current_user['role'] == UserRole.EMPLOYEE:
-        query['user_id'] = current_user['id']
-    elif current_user['role'] == UserRole.MANAGER:
-        query['company_id'] = current_user['company_id']
-    # Admin sees all
+    return await _dashboard_stats(current_user, database)
+
+
+async def _dashboard_stats(current_user: dict, database) -> DashboardStats:
+    query = _reservation_scope(current_user)
     
     # Get counts
     total_reservations = await database.reservations.count_documents(query)
@@ -693,6 +1367,12 @@ async def get_dashboard_stats(
         if res.get('status') in [ReservationStatus.CONFIRMED, ReservationStatus.COMPLETED]
     )
     
+    # Archived reservations only exist as rollups here (see archival.py)
+    archived = await archived_totals(database, query)
+    total_reservations += sum(entry['count'] for entry in archived.values())
+    cancelled_reservations += archived.get(ReservationStatus.CANCELLED.value, {}).get('count', 0)
+    total_spent += sum(entry['spent'] for entry in archived.values())
+    
     return DashboardStats(
         total_reservations=total_reservations,
         pending_approvals=pending_approvals,
@@ -702,12 +1382,72 @@ async def get_dashboard_stats(
     )
 
 
+# ==================== BOOTSTRAP ENDPOINTS ====================
+
+BOOTSTRAP_RESERVATIONS_PAGE = int(os.environ.get('BOOTSTRAP_RESERVATIONS_PAGE', 20))
+
+
+async def _bootstrap_company(current_user: dict, database) -> Optional[dict]:
+    if not current_user.get('company_id'):
+        return None
+    company = await database.companies.find_one({"id": current_user['company_id']}, {"_id": 0})
+    if company and current_user['role'] != UserRole.AGENCY_ADMIN:
+        # Fee structure is agency pricing, not something company users see
+        company.pop('service_fees', None)
+    return company
+
+
+async def _bootstrap_reservations(current_user: dict, database, limit: int) -> List[ReservationResponse]:
+    reservations = await database.reservations.find(
+        _reservation_scope(current_user), {"_id": 0}
+    ).sort("created_at", -1).limit(limit).to_list(limit)
+    return [ReservationResponse(**res) for res in await _enrich_reservations(reservations, database)]
+
+
+@api_router.get("/bootstrap", response_model=BootstrapResponse)
+async def bootstrap(
+    request: Request,
+    reservations_limit: int = Query(BOOTSTRAP_RESERVATIONS_PAGE, ge=1, le=100),
+    current_user: dict = Depends(get_current_user_dep)
+):
+    """User, company, dashboard stats and latest reservations in one round-trip.
+    
+    Send the section ETags from the previous payload in If-None-Match; sections
+    that still match come back with not_modified=true and no data.
+    """
+    sections = dict(zip(
+        ("company", "stats", "reservations"),
+        await asyncio.gather(
+            _bootstrap_company(current_user, read_router.database(db, "company_detail")),
+            _dashboard_stats(current_user, read_router.database(db, "dashboard_stats")),
+            _bootstrap_reservations(current_user, read_router.database(db, "reservation_list"), reservations_limit),
+        )
+    ))
+    sections["user"] = UserResponse(**current_user)
+    
+    payload = {}
+    for name in ("user", "company", "stats", "reservations"):
+        data = jsonable_encoder(sections[name])
+        # Content hash: equal ETags mean equal data, whichever user asked
+        etag = http_cache.make_etag(name, json.dumps(data, sort_keys=True, separators=(",", ":")))
+        if http_cache.etag_listed(request, etag):
+            payload[name] = {"etag": etag, "not_modified": True, "data": None}
+        else:
+            payload[name] = {"etag": etag, "not_modified": False, "data": data}
+    
+    # Compressed by CompressionMiddleware
+    return Response(
+        content=compression.render_json(payload), media_type="application/json",
+        headers={"Cache-Control": http_cache.PRIVATE_NO_STORE}
+    )
+
+
 # ==================== USER MANAGEMENT ENDPOINTS ====================
 
 @api_router.get("/users", response_model=List[UserResponse])
 async def get_users(
     current_user: dict = Depends(require_admin_or_manager_or_agency),
-    database = Depends(get_db)
+    database = Depends(get_read_db("user_list"))
 ):
     """Get all users (Admin, Manager, and Agency Admin)"""
     query = {}
@@ -726,10 +1466,20 @@ async def get_users(
 @api_router.post("/employees", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_employee(
     employee_data: EmployeeCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     current_user: dict = Depends(require_manager_or_admin),
     database = Depends(get_db)
 ):
     """Create a new employee with approval settings (Manager/Admin only)"""
+    return await run_idempotent(
+        database, idempotency_key, f"create_employee:{current_user['id']}", employee_data,
+        lambda: _insert_employee(employee_data, database), response
+    )
+
+
+async def _insert_employee(employee_data: EmployeeCreate, database) -> UserResponse:
+    """Validate approver settings and insert a new employee"""
     # Check if user already exists
     existing_user = await database.users.find_one({"email": employee_data.email}, {"_id": 0})
     if existing_user:
@@ -762,7 +1512,7 @@ async def create_employee(
         department=employee_data.department,
         requires_approval=employee_data.requires_approval,
         approver_id=employee_data.approver_id,
-        password_hash=get_password_hash(employee_data.password)
+        password_hash=await get_password_hash_async(employee_data.password)
     )
     
     # Convert to dict for MongoDB
@@ -807,12 +1557,25 @@ async def update_employee(
                 detail="Approver must be a manager or admin"
             )
     
+    changed = [
+        field for field, value in update_data.items()
+        if existing.get(field) != value and field != 'password_hash'
+    ]
     update_data['updated_at'] = datetime.utcnow().isoformat()
     
     await database.users.update_one(
         {"id": employee_id},
         {"$set": update_data}
     )
+    cache.invalidate("principal", employee_id)
+    if changed:
+        await audit_log.record(
+            AuditAction.APPROVER_CHANGED if 'approver_id' in changed else AuditAction.EMPLOYEE_UPDATED,
+            "user", employee_id, current_user,
+            before={field: existing.get(field) for field in changed},
+            after={field: update_data[field] for field in changed},
+            company_id=existing.get('company_id')
+        )
     
     updated = await database.users.find_one({"id": employee_id}, {"_id": 0, "password_hash": 0})
     
@@ -825,6 +1588,36 @@ async def update_employee(
     return UserResponse(**updated)
 
 
+# ==================== AUDIT ENDPOINTS ====================
+
+@api_router.get("/audit-events", response_model=AuditEventPage)
+async def get_audit_events(
+    entity_type: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    actor_id: Optional[str] = None,
+    action: Optional[AuditAction] = None,
+    limit: int = Query(50, ge=1, le=200),
+    skip: int = Query(0, ge=0),
+    current_user: dict = Depends(require_admin),
+    database = Depends(get_read_db("audit_events"))
+):
+    """Audit trail, newest first (Admin: own company, Agency Admin: all)"""
+    query = {}
+    for field, value in (
+        ('entity_type', entity_type), ('entity_id', entity_id), ('actor_id', actor_id), ('action', action)
+    ):
+        if value:
+            query[field] = value
+    if current_user['role'] != UserRole.AGENCY_ADMIN:
+        query['company_id'] = current_user.get('company_id')
+    
+    total, events = await asyncio.gather(
+        database.audit_events.count_documents(query),
+        database.audit_events.find(query, {"_id": 0}).sort("at", -1).skip(skip).limit(limit).to_list(limit)
+    )
+    return AuditEventPage(total=total, events=events)
+
+
 # ==================== ROOT ENDPOINTS ====================
 
 @api_router.get("/")
@@ -842,15 +1635,100 @@ async def health_check():
     try:
         # Check database connection
         await db.command("ping")
-        return {"status": "healthy", "database": "connected"}
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
+    pool = pool_metrics.snapshot(db_settings.max_pool_size, POOL_DEGRADED_WAIT_MS)
+    return {
+        "status": "healthy" if pool["status"] == "ok" else "degraded",
+        "database": "connected",
+        "pool": pool
+    }
+
+
+@api_router.get("/health/pool")
+async def pool_health():
+    """Connection pool checkout waits, failures and utilization over the last minute"""
+    return pool_metrics.snapshot(db_settings.max_pool_size, POOL_DEGRADED_WAIT_MS)
+
+
+@api_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics (latency histograms, Mongo timings, cache and bcrypt stats)"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@api_router.get("/admin/query-stats")
+async def get_query_stats(
+    sort_by: str = Query("total_ms", pattern="^(total_ms|count|max_ms|avg_ms|slow_count|docs_returned)$"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(require_agency_admin)
+):
+    """Top MongoDB query shapes by time, with slow counts and explain summaries (AGENCY_ADMIN only)"""
+    return query_stats.listener.report(sort_by=sort_by, limit=limit)
+
+
+@api_router.get("/admin/jobs")
+async def list_jobs(
+    job_status: str = Query("dead", alias="status", pattern="^(queued|running|done|dead)$"),
+    job_type: Optional[str] = Query(None, alias="type"),
+    limit: int = Query(50, ge=1, le=200),
+    skip: int = Query(0, ge=0),
+    current_user: dict = Depends(require_agency_admin),
+    database = Depends(get_db)
+):
+    """Background jobs by status, dead-lettered ones by default (AGENCY_ADMIN only)"""
+    query = {"status": job_status}
+    if job_type:
+        query["type"] = job_type
+    total, jobs = await asyncio.gather(
+        database.jobs.count_documents(query),
+        database.jobs.find(query, {"_id": 0}).sort("run_at", -1).skip(skip).limit(limit).to_list(limit)
+    )
+    return {"total": total, "jobs": jobs}
+
+
+@api_router.post("/admin/jobs/{job_id}/retry")
+async def retry_job(
+    job_id: str,
+    current_user: dict = Depends(require_agency_admin),
+    database = Depends(get_db)
+):
+    """Requeue a dead-lettered job (AGENCY_ADMIN only)"""
+    job = await retry_dead_job(database, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Dead job not found")
+    job_worker.wake()
+    return job
+
+
+@api_router.get("/admin/profiles")
+async def list_profiles(current_user: dict = Depends(require_agency_admin)):
+    """List captured request profiles (AGENCY_ADMIN only)"""
+    return {"profiles": profiling.list_profiles()}
+
+
+@api_router.get("/admin/profiles/{name}")
+async def download_profile(name: str, current_user: dict = Depends(require_agency_admin)):
+    """Download a .pstats or speedscope JSON profile (AGENCY_ADMIN only)"""
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name)
 
 
 # Include router in main app
 app.include_router(api_router)
 
+# gzip/brotli above COMPRESS_MIN_BYTES; registered first so metrics see the bytes actually sent
+app.add_middleware(compression.CompressionMiddleware)
+
+# Per-route request metrics
+app.middleware("http")(metrics.metrics_middleware)
+
+# Opt-in profiling (signed X-Profile header or PROFILE_SAMPLE_RATE)
+app.middleware("http")(profiling.profiling_middleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -867,8 +1745,36 @@ async def startup_event():
     """Initialize application on startup"""
     logger.info("Starting Corporate Reservation System API...")
     
+    # Open MONGO_MIN_POOL_SIZE connections now instead of on the first requests
+    warmed = await prewarm_pool(db, db_settings.min_pool_size)
+    if warmed:
+        logger.info(f"MongoDB pool pre-warmed with {warmed} connections")
+    
     # Initialize mock hotel data
     await init_mock_hotels(db)
+    cache.invalidate("catalog")
+    
+    # Idempotency keys: unique (scope, key) + TTL expiry
+    await ensure_idempotency_indexes(db)
+    await ensure_reservation_indexes(db)
+    
+    # Audit events are queued in memory and written in batches
+    await ensure_audit_indexes(db)
+    audit_log.start(db)
+    
+    await ensure_job_indexes(db)
+    await ensure_archive_indexes(db)
+    await ensure_trip_indexes(db)
+    # Daily move of finished reservations to reservations_archive, one job per day across workers
+    await schedule_archival(db)
+    if JOBS_WORKER == "inprocess":
+        job_worker.start(db)
+    
+    feed.change_feed.start(db)
+    await live.start(db)
+    
+    # Background explain() for new slow query shapes (QUERY_EXPLAIN=true)
+    query_stats.listener.start(client)
     
     logger.info("Application started successfully")
 
@@ -877,5 +1783,10 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection on shutdown"""
+    await query_stats.listener.stop()
+    await feed.change_feed.stop()
+    await live.stop()
+    await job_worker.stop()
+    await audit_log.close()
     client.close()
     logger.info("Application shutdown complete")
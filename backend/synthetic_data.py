@@ -0,0 +1,457 @@
+"""Deterministic synthetic data for scale testing
+
+Generates companies with realistic booking rules, departments, managers and
+employees, a Turkish hotel catalog and reservation histories. The same seed
+always produces the same data. Reservations are generated and inserted in
+independent batches (each with its own derived seed) on a process pool, so
+large loads scale with cores.
+
+Usage:
+    python synthetic_data.py --companies 50 --users 50000 --hotels 5000 --reservations 10000000 --drop
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+SYNTHETIC_PASSWORD = "Test123!"
+RESERVATION_BATCH_SIZE = 10000
+
+# City: (latitude, longitude, price factor, weight, districts)
+CITIES = {
+    "İstanbul": (41.0082, 28.9784, 1.30, 30, ["Beşiktaş", "Şişli", "Kadıköy", "Sultanahmet", "Beyoğlu",
+                                            "Harbiye", "Ataşehir", "Sarıyer", "Bakırköy", "Üsküdar"]),
+    "Ankara": (39.9334, 32.8597, 1.00, 14, ["Çankaya", "Kızılay", "Ulus", "Keçiören", "Yenimahalle"]),
+    "İzmir": (38.4237, 27.1428, 1.05, 10, ["Konak", "Alsancak", "Karşıyaka", "Bornova", "Çeşme"]),
+    "Antalya": (36.8969, 30.7133, 1.10, 9, ["Merkez", "Lara", "Konyaaltı", "Kemer", "Belek"]),
+    "Bodrum": (37.0344, 27.4305, 1.40, 4, ["Merkez", "Gümbet", "Yalıkavak", "Türkbükü"]),
+    "Bursa": (40.1885, 29.0610, 0.90, 5, ["Osmangazi", "Nilüfer", "Uludağ"]),
+    "Adana": (37.0000, 35.3213, 0.85, 4, ["Seyhan", "Çukurova"]),
+    "Gaziantep": (37.0662, 37.3833, 0.85, 4, ["Şehitkamil", "Şahinbey"]),
+    "Konya": (37.8746, 32.4932, 0.80, 3, ["Selçuklu", "Meram"]),
+    "Kayseri": (38.7312, 35.4787, 0.80, 3, ["Kocasinan", "Melikgazi"]),
+    "Trabzon": (41.0015, 39.7178, 0.90, 3, ["Ortahisar", "Akçaabat"]),
+    "Eskişehir": (39.7767, 30.5206, 0.80, 3, ["Odunpazarı", "Tepebaşı"]),
+    "Nevşehir": (38.6244, 34.7239, 1.15, 3, ["Göreme", "Ürgüp", "Uçhisar"]),
+    "Mersin": (36.8121, 34.6415, 0.85, 2, ["Yenişehir", "Mezitli"]),
+    "Erzurum": (39.9000, 41.2700, 0.80, 2, ["Palandöken", "Merkez"]),
+    "Muğla": (37.2153, 28.3636, 1.20, 1, ["Dalaman", "Fethiye", "Marmaris"]),
+}
+
+CHAINS = ["Hilton", "Radisson Blu", "Ramada", "Divan", "Dedeman", "Elite World", "Wyndham", "Novotel",
+          "Ibis", "Crowne Plaza", "Marriott", "Sheraton", "Rixos", "Titanic", "Point", "Park Inn",
+          "Holiday Inn", "Swissotel", "Mövenpick", "Anemon"]
+BOUTIQUE_WORDS = ["Konak", "Saray", "Bahçe", "Liman", "Köşk", "Han", "Kule", "Yalı", "Çınar", "Lale"]
+STAR_WEIGHTS = {1: 2, 2: 8, 3: 30, 4: 38, 5: 22}
+STAR_BASE_PRICE = {1: 600.0, 2: 900.0, 3: 1500.0, 4: 2500.0, 5: 4500.0}
+AMENITIES = [
+    {"name": "Ücretsiz WiFi", "icon": "wifi"}, {"name": "Spa & Wellness", "icon": "spa"},
+    {"name": "Açık Havuz", "icon": "pool"}, {"name": "Fitness Center", "icon": "fitness"},
+    {"name": "Restoran", "icon": "restaurant"}, {"name": "Otopark", "icon": "parking"},
+    {"name": "Toplantı Salonu", "icon": "meeting"}, {"name": "Oda Servisi", "icon": "room_service"},
+    {"name": "Havalimanı Transferi", "icon": "shuttle"}, {"name": "Concierge", "icon": "concierge"},
+]
+ROOM_TEMPLATES = [
+    # name, capacity, price multiplier, min stars
+    ("Single Room", 1, 0.75, 1),
+    ("Standard Room", 2, 1.0, 1),
+    ("Deluxe Room", 2, 1.35, 3),
+    ("Family Room", 4, 1.6, 2),
+    ("Executive Suite", 3, 2.4, 4),
+    ("King Suite", 2, 3.5, 5),
+]
+IMAGES = [
+    "https://images.unsplash.com/photo-1566073771259-6a8506099945?w=800",
+    "https://images.unsplash.com/photo-1582719478250-c89cae4dc85b?w=800",
+    "https://images.unsplash.com/photo-1542314831-068cd1dbfeeb?w=800",
+    "https://images.unsplash.com/photo-1520250497591-112f2f40a3f4?w=800",
+]
+
+DEPARTMENTS = ["Satış", "Pazarlama", "Yazılım Geliştirme", "İnsan Kaynakları", "Finans",
+               "Operasyon", "Hukuk", "Satın Alma", "Müşteri Hizmetleri", "Yönetim"]
+FIRST_NAMES = ["Ahmet", "Mehmet", "Mustafa", "Ali", "Hüseyin", "Hasan", "İbrahim", "Emre", "Burak", "Can",
+               "Ayşe", "Fatma", "Emine", "Hatice", "Zeynep", "Elif", "Merve", "Selin", "Deniz", "Ece"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Yıldırım", "Öztürk", "Aydın",
+              "Özdemir", "Arslan", "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan", "Şimşek"]
+COMPANY_SUFFIXES = ["Teknoloji A.Ş.", "Holding A.Ş.", "Lojistik Ltd. Şti.", "Enerji A.Ş.", "İnşaat A.Ş.",
+                    "Danışmanlık Ltd. Şti.", "Gıda San. A.Ş.", "Tekstil A.Ş.", "Sağlık Hizmetleri A.Ş."]
+
+# (status, weight) for trips already finished vs still ahead
+PAST_STATUSES = [("completed", 72), ("cancelled", 14), ("rejected", 8), ("confirmed", 6)]
+FUTURE_STATUSES = [("confirmed", 55), ("pending", 25), ("cancelled", 15), ("rejected", 5)]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _weighted(rng: random.Random, options: List[Tuple[str, int]]) -> str:
+    return rng.choices([o for o, _ in options], weights=[w for _, w in options])[0]
+
+
+def _limits(enabled=False, requires_approval=True, **fields) -> dict:
+    limits = {"enabled": enabled, "max_price": None, "requires_approval": requires_approval,
+              "max_stars": None, "max_price_per_night": None, "flight_class_restriction": None,
+              "min_days_before": None, "notes": None}
+    limits.update(fields)
+    return limits
+
+
+def _rule(rng: random.Random, name: str, applies_to: str, priority: int, max_stars: int,
+          max_price_per_night: float, requires_approval: bool, flight_class: str,
+          department_list=None, employee_list=None, approver_id=None) -> dict:
+    return {
+        "id": _uuid(rng),
+        "name": name,
+        "applies_to": applies_to,
+        "department_list": department_list or [],
+        "employee_list": employee_list or [],
+        "approver_id": approver_id,
+        "hotel_limits": _limits(True, requires_approval, max_stars=max_stars,
+                                max_price_per_night=max_price_per_night),
+        "flight_limits": _limits(True, requires_approval, flight_class_restriction=flight_class,
+                                 min_days_before=rng.choice([0, 3, 7, 14])),
+        "transfer_limits": _limits(rng.random() < 0.5, requires_approval, max_price=rng.choice([750.0, 1500.0])),
+        "visa_limits": _limits(),
+        "insurance_limits": _limits(),
+        "car_rental_limits": _limits(rng.random() < 0.3, requires_approval, max_price=rng.choice([1500.0, 3000.0])),
+        "priority": priority,
+    }
+
+
+def _anchor(today: Optional[date]) -> str:
+    return datetime.combine(today or date.today(), datetime.min.time()).isoformat()
+
+
+def generate_hotels(rng: random.Random, count: int, today: Optional[date] = None) -> List[dict]:
+    cities = list(CITIES)
+    city_weights = [CITIES[c][3] for c in cities]
+    stars_options = list(STAR_WEIGHTS)
+    star_weights = [STAR_WEIGHTS[s] for s in stars_options]
+    now = _anchor(today)
+    hotels = []
+    for i in range(count):
+        city = rng.choices(cities, weights=city_weights)[0]
+        lat, lng, factor, _, districts = CITIES[city]
+        district = rng.choice(districts)
+        stars = rng.choices(stars_options, weights=star_weights)[0]
+        if stars >= 4 or rng.random() < 0.5:
+            name = f"{rng.choice(CHAINS)} {city} {district}"
+        else:
+            name = f"{district} {rng.choice(BOUTIQUE_WORDS)} Otel"
+        base = STAR_BASE_PRICE[stars] * factor * rng.uniform(0.8, 1.3)
+        rooms = [t for t in ROOM_TEMPLATES if t[3] <= stars]
+        room_types = [{
+            "id": _uuid(rng),
+            "name": room_name,
+            "description": f"{rng.randint(18, 30) + capacity * 6} m² oda",
+            "capacity": capacity,
+            "price_per_night": round(base * multiplier, -1),
+            "available_rooms": rng.randint(2, 40),
+        } for room_name, capacity, multiplier, _ in rng.sample(rooms, k=min(len(rooms), rng.randint(2, 4)))]
+        hotels.append({
+            "id": _uuid(rng),
+            "name": f"{name} #{i}" if i >= len(CHAINS) * len(CITIES) else name,
+            "city": city,
+            "district": district,
+            "address": f"{district} Mah. {rng.choice(BOUTIQUE_WORDS)} Cad. No:{rng.randint(1, 250)}, {city}",
+            "stars": stars,
+            "description": f"{city} {district} bölgesinde {stars} yıldızlı otel.",
+            "amenities": rng.sample(AMENITIES, k=rng.randint(3, 8)),
+            "room_types": room_types,
+            "images": rng.sample(IMAGES, k=2),
+            "tripadvisor_rating": round(rng.uniform(3.0, 5.0), 1),
+            "tripadvisor_reviews": rng.randint(20, 8000),
+            "latitude": round(lat + rng.uniform(-0.08, 0.08), 5),
+            "longitude": round(lng + rng.uniform(-0.08, 0.08), 5),
+            "phone": f"+90 {rng.randint(212, 488)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+            "email": f"info{i}@otel.example.com",
+            "cancellation_policy": f"Ücretsiz iptal: Giriş tarihinden {rng.choice([24, 48, 72])} saat öncesine kadar",
+            "is_active": rng.random() > 0.02,
+            "version": 1,
+            "created_at": now,
+            "updated_at": now,
+        })
+    return hotels
+
+
+def generate_organizations(
+    rng: random.Random,
+    companies: int,
+    users: int,
+    password_hash: str,
+    today: Optional[date] = None,
+) -> Tuple[List[dict], List[dict]]:
+    """Companies with departments, one admin, one manager per department and employees"""
+    now = _anchor(today)
+    per_company = max(3, users // max(1, companies))
+    company_docs, user_docs = [], []
+    for c in range(companies):
+        company_id = _uuid(rng)
+        departments = rng.sample(DEPARTMENTS, k=rng.randint(3, len(DEPARTMENTS)))
+        company_users = []
+
+        def make_user(role, department, approver_id=None, requires_approval=False):
+            index = len(user_docs) + len(company_users)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            user = {
+                "id": _uuid(rng),
+                "email": f"user{index}@company{c}.example.com",
+                "password_hash": password_hash,
+                "full_name": f"{first} {last}",
+                "phone": f"+90 5{rng.randint(30, 59)} {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}",
+                "role": role,
+                "company_id": company_id,
+                "department": department,
+                "is_active": rng.random() > 0.03,
+                "requires_approval": requires_approval,
+                "approver_id": approver_id,
+                "is_first_login": False,
+                "gdpr_accepted": True,
+                "gdpr_accepted_date": now,
+                "created_at": now,
+                "updated_at": now,
+            }
+            company_users.append(user)
+            return user
+
+        make_user("admin", "Yönetim")
+        managers = {department: make_user("manager", department) for department in departments}
+        for _ in range(max(0, per_company - len(company_users))):
+            department = rng.choice(departments)
+            make_user("employee", department, managers[department]["id"], rng.random() < 0.8)
+
+        employees = [u for u in company_users if u["role"] == "employee"]
+        vips = rng.sample(employees, k=min(len(employees), rng.randint(0, 5)))
+        strict_departments = rng.sample(departments, k=min(2, len(departments)))
+        rules = [
+            _rule(rng, "Varsayılan Kural", "all", 100, rng.choice([3, 4]), rng.choice([2500.0, 4000.0]),
+                  True, "economy"),
+            _rule(rng, "Departman Kuralı", "departments", 50, 4, 3500.0, rng.random() < 0.7, "economy",
+                  department_list=strict_departments, approver_id=managers[strict_departments[0]]["id"]),
+        ]
+        if vips:
+            rules.append(_rule(rng, "Üst Yönetim", "employees", 10, 5, 10000.0, False, "business",
+                               employee_list=[u["id"] for u in vips]))
+        fee_type = rng.choice(["fixed", "percentage"])
+        company_docs.append({
+            "id": company_id,
+            "name": f"{rng.choice(LAST_NAMES)} {rng.choice(COMPANY_SUFFIXES)}",
+            "tax_number": str(rng.randint(10 ** 9, 10 ** 10 - 1)),
+            "address": f"{rng.choice(list(CITIES))}",
+            "phone": f"+90 212 {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}",
+            "email": f"info@company{c}.example.com",
+            "service_fees": {
+                service: {"type": fee_type, "value": rng.choice([50.0, 100.0]) if fee_type == "fixed" else 5.0,
+                          "additional_fee": 0.0, "currency": "TRY"}
+                for service in ("hotel", "flight", "transfer", "visa", "insurance", "car_rental")
+            },
+            "booking_rules": {"rules": rules},
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        })
+        user_docs.extend(company_users)
+    return company_docs, user_docs
+
+
+def reservation_context(companies: List[dict], users: List[dict], hotels: List[dict]) -> dict:
+    """Compact, picklable view of what reservation batches need"""
+    fees = {}
+    for company in companies:
+        fee = company["service_fees"]["hotel"]
+        fees[company["id"]] = (fee["type"], fee["value"])
+    return {
+        "travelers": [(u["id"], u["company_id"], u["approver_id"]) for u in users if u["role"] == "employee"],
+        "hotels": [(h["id"], h["name"], [(r["id"], r["name"], r["price_per_night"], r["capacity"])
+                                         for r in h["room_types"]]) for h in hotels if h["is_active"]],
+        "fees": fees,
+    }
+
+
+def generate_reservation_batch(seed: int, batch_index: int, size: int, context: dict,
+                               today: Optional[date] = None) -> List[dict]:
+    """One independent, reproducible batch of reservations"""
+    rng = random.Random(f"{seed}:reservations:{batch_index}")
+    today = today or date.today()
+    travelers, hotels, fees = context["travelers"], context["hotels"], context["fees"]
+    docs = []
+    for _ in range(size):
+        user_id, company_id, approver_id = rng.choice(travelers)
+        hotel_id, hotel_name, rooms = rng.choice(hotels)
+        room_id, room_name, price, capacity = rng.choice(rooms)
+        check_in = today + timedelta(days=rng.randint(-730, 180))
+        nights = rng.choices([1, 2, 3, 4, 5, 7, 10], weights=[30, 25, 18, 10, 8, 6, 3])[0]
+        created = datetime.combine(check_in, datetime.min.time()) - timedelta(
+            days=rng.randint(1, 60), seconds=rng.randint(0, 86399))
+        status = _weighted(rng, PAST_STATUSES if check_in + timedelta(days=nights) < today else FUTURE_STATUSES)
+        total = price * nights
+        fee_type, fee_value = fees.get(company_id, ("fixed", 0.0))
+        service_fee = total * fee_value / 100 if fee_type == "percentage" else fee_value
+        updated = created + timedelta(hours=rng.randint(1, 72))
+        approved = status in ("confirmed", "completed")
+        docs.append({
+            "id": _uuid(rng),
+            "service_type": "hotel",
+            "user_id": user_id,
+            "company_id": company_id,
+            "status": status,
+            "created_at": created.isoformat(),
+            "updated_at": updated.isoformat(),
+            "hotel_id": hotel_id,
+            "hotel_name": hotel_name,
+            "room_type_id": room_id,
+            "room_type_name": room_name,
+            "check_in_date": check_in.isoformat(),
+            "check_out_date": (check_in + timedelta(days=nights)).isoformat(),
+            "guests": rng.randint(1, capacity),
+            "nights": nights,
+            "price_per_night": price,
+            "total_price": total,
+            "service_fee": round(service_fee, 2),
+            "grand_total": round(total + service_fee, 2),
+            "special_requests": None,
+            "requires_approval": approver_id is not None,
+            "approver_id": approver_id,
+            "approved_by": approver_id if approved else None,
+            "approved_at": updated.isoformat() if approved else None,
+            "rejection_reason": "Bütçe aşımı" if status == "rejected" else None,
+            "cancelled_at": updated.isoformat() if status == "cancelled" else None,
+            "cancellation_reason": "Seyahat iptal edildi" if status == "cancelled" else None,
+        })
+    return docs
+
+
+def reservation_batches(total: int, batch_size: int = RESERVATION_BATCH_SIZE) -> Iterator[Tuple[int, int]]:
+    for index, start in enumerate(range(0, total, batch_size)):
+        yield index, min(batch_size, total - start)
+
+
+def build_catalog(seed: int, companies: int, users: int, hotels: int, password_hash: str,
+                  today: Optional[date] = None) -> dict:
+    """Companies, users and hotels for a seed (reservations are generated separately in batches).
+
+    Output depends only on the arguments; timestamps are anchored to ``today``.
+    """
+    rng = random.Random(f"{seed}:catalog")
+    hotel_docs = generate_hotels(rng, hotels, today)
+    company_docs, user_docs = generate_organizations(rng, companies, users, password_hash, today)
+    return {"companies": company_docs, "users": user_docs, "hotels": hotel_docs}
+
+
+async def load_async(db, seed: int, companies: int, users: int, hotels: int, reservations: int,
+                     password_hash: str, concurrency: int = 4, today: Optional[date] = None) -> dict:
+    """Load into a Motor database (or a Motor-compatible fake) from the running event loop"""
+    import asyncio
+
+    today = today or date.today()
+    catalog = build_catalog(seed, companies, users, hotels, password_hash, today)
+    await db.hotels.insert_many(catalog["hotels"], ordered=False)
+    await db.companies.insert_many(catalog["companies"], ordered=False)
+    for i in range(0, len(catalog["users"]), 5000):
+        await db.users.insert_many(catalog["users"][i:i + 5000], ordered=False)
+
+    context = reservation_context(catalog["companies"], catalog["users"], catalog["hotels"])
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def insert(batch_index, size):
+        async with semaphore:
+            await db.reservations.insert_many(
+                generate_reservation_batch(seed, batch_index, size, context, today), ordered=False)
+
+    await asyncio.gather(*(insert(i, size) for i, size in reservation_batches(reservations)))
+    return catalog
+
+
+# ---- process-pool loader for large volumes ----
+
+_worker_db = None
+_worker_context = None
+_worker_today = None
+
+
+def _init_worker(mongo_url: str, db_name: str, context: dict, today: date):
+    global _worker_db, _worker_context, _worker_today
+    from pymongo import MongoClient
+    _worker_db = MongoClient(mongo_url)[db_name]
+    _worker_context = context
+    _worker_today = today
+
+
+def _load_reservation_batch(seed: int, batch_index: int, size: int) -> int:
+    docs = generate_reservation_batch(seed, batch_index, size, _worker_context, _worker_today)
+    _worker_db.reservations.insert_many(docs, ordered=False)
+    return len(docs)
+
+
+def load(mongo_url: str, db_name: str, seed: int, companies: int, users: int, hotels: int,
+         reservations: int, workers: int, drop: bool = False,
+         today: Optional[date] = None) -> Dict[str, int]:
+    from pymongo import MongoClient
+    from auth import get_password_hash
+
+    database = MongoClient(mongo_url)[db_name]
+    if drop:
+        for name in ("hotels", "companies", "users", "reservations"):
+            database.drop_collection(name)
+
+    today = today or date.today()
+    started = time.perf_counter()
+    catalog = build_catalog(seed, companies, users, hotels, get_password_hash(SYNTHETIC_PASSWORD), today)
+    database.hotels.insert_many(catalog["hotels"], ordered=False)
+    database.companies.insert_many(catalog["companies"], ordered=False)
+    for i in range(0, len(catalog["users"]), 10000):
+        database.users.insert_many(catalog["users"][i:i + 10000], ordered=False)
+    print(f"✓ {len(catalog['companies'])} companies, {len(catalog['users'])} users, "
+          f"{len(catalog['hotels'])} hotels in {time.perf_counter() - started:.1f}s")
+
+    context = reservation_context(catalog["companies"], catalog["users"], catalog["hotels"])
+    inserted = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(mongo_url, db_name, context, today)) as pool:
+        futures = [pool.submit(_load_reservation_batch, seed, index, size)
+                   for index, size in reservation_batches(reservations)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            inserted += future.result()
+            if done % 50 == 0 or done == len(futures):
+                elapsed = time.perf_counter() - started
+                print(f"  ... {inserted:,} reservations ({inserted / elapsed:,.0f}/s)")
+    return {"companies": len(catalog["companies"]), "users": len(catalog["users"]),
+            "hotels": len(catalog["hotels"]), "reservations": inserted}
+
+
+def main():
+    load_dotenv(ROOT_DIR / '.env')
+    parser = argparse.ArgumentParser(description="Load deterministic synthetic data")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "reservation_system"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--companies", type=int, default=20)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--hotels", type=int, default=2000)
+    parser.add_argument("--reservations", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--anchor-date", type=date.fromisoformat, default=date.today(),
+                        help="Date the history is generated around (YYYY-MM-DD); fix it for identical reloads")
+    parser.add_argument("--drop", action="store_true", help="Drop hotels/companies/users/reservations first")
+    args = parser.parse_args()
+
+    print("=== Synthetic Data ===\n")
+    started = time.perf_counter()
+    counts = load(args.mongo_url, args.db_name, args.seed, args.companies, args.users, args.hotels,
+                  args.reservations, args.workers, args.drop, args.anchor_date)
+    print(f"\n✓ Loaded {counts} in {time.perf_counter() - started:.1f}s")
+    print(f"  All users share the password: {SYNTHETIC_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Transfer and car-rental quotes from in-memory price tables
+
+Zones are the airports below plus every (city, district) that has a hotel
+in mock_data.py, e.g. ``IST`` or ``İstanbul/Beşiktaş``. At import, one
+NumPy matrix per vehicle class is built with the price between every pair
+of zones: a base fare plus a per-km rate on the road distance, rounded up to
+PRICE_STEP. Cross-city pairs are NaN, because transfers stay within a city.
+Car rental uses a (car class × rental length) daily rate table, a monthly
+season factor applied to each rental day, and a one-way fee for returning
+in another city.
+
+A quote is array indexing only, with no database or network access. A whole
+trip's legs are priced with a single fancy-indexed lookup (``quote_transfers``).
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import CarClass, CarRentalRequest, TransferLeg, VehicleClass
+from mock_data import TURKISH_HOTELS
+
+# (code, city as in mock_data, name, latitude, longitude)
+AIRPORTS = [
+    ("IST", "İstanbul", "İstanbul Havalimanı", 41.2753, 28.7519),
+    ("SAW", "İstanbul", "Sabiha Gökçen Havalimanı", 40.8986, 29.3092),
+    ("ESB", "Ankara", "Esenboğa Havalimanı", 40.1281, 32.9951),
+    ("ADB", "İzmir", "Adnan Menderes Havalimanı", 38.2924, 27.1570),
+    ("AYT", "Antalya", "Antalya Havalimanı", 36.8987, 30.8005),
+    ("BJV", "Bodrum", "Milas-Bodrum Havalimanı", 37.2506, 27.6643),
+    ("ERZ", "Erzurum", "Erzurum Havalimanı", 39.9565, 41.1702),
+]
+
+# Ordered by capacity: (class, max passengers, base fare TRY, TRY per km)
+VEHICLES = [
+    (VehicleClass.SEDAN, 3, 350.0, 28.0),
+    (VehicleClass.MINIVAN, 7, 550.0, 38.0),
+    (VehicleClass.MINIBUS, 14, 900.0, 55.0),
+]
+ROAD_FACTOR = 1.35  # Road distance over great-circle distance
+PRICE_STEP = 10.0
+EARTH_RADIUS_KM = 6371.0
+
+CAR_CLASSES = [CarClass.ECONOMY, CarClass.COMPACT, CarClass.SUV, CarClass.PREMIUM]
+# Rental length bands (lower bound in days): 1-2, 3-6, 7-13, 14+
+RENTAL_BANDS = np.array([1, 3, 7, 14])
+# TRY per day, rows follow CAR_CLASSES, columns RENTAL_BANDS
+CAR_DAILY_RATES = np.array([
+    [1400.0, 1250.0, 1100.0, 950.0],
+    [1700.0, 1500.0, 1350.0, 1150.0],
+    [2600.0, 2350.0, 2100.0, 1850.0],
+    [4200.0, 3800.0, 3400.0, 3000.0],
+])
+# January..December
+SEASON_FACTORS = np.array([0.85, 0.85, 0.9, 1.0, 1.1, 1.25, 1.4, 1.4, 1.15, 1.0, 0.9, 0.95])
+ONE_WAY_FEE_PER_KM = 6.0
+
+
+def _round_up(values):
+    return np.ceil(np.asarray(values) / PRICE_STEP) * PRICE_STEP
+
+
+def build_zones(hotels: List[dict] = TURKISH_HOTELS) -> List[dict]:
+    zones = [
+        {"id": code, "kind": "airport", "city": city, "district": None, "name": name,
+         "latitude": latitude, "longitude": longitude}
+        for code, city, name, latitude, longitude in AIRPORTS
+    ]
+    # A district sits at the mean position of its hotels
+    districts: Dict[str, list] = {}
+    for hotel in hotels:
+        if hotel.get('district') and hotel.get('latitude') is not None:
+            districts.setdefault((hotel['city'], hotel['district']), []).append(
+                (hotel['latitude'], hotel['longitude'])
+            )
+    for (city, district), points in sorted(districts.items()):
+        latitude, longitude = np.mean(points, axis=0)
+        zones.append({"id": f"{city}/{district}", "kind": "district", "city": city, "district": district,
+                      "name": f"{district}, {city}", "latitude": float(latitude), "longitude": float(longitude)})
+    return zones
+
+
+def within_limits(price: Optional[float], limits: Optional[dict]) -> bool:
+    """max_price check of a rule's transfer_limits / car_rental_limits"""
+    if price is None or not limits or not limits.get('enabled') or limits.get('max_price') is None:
+        return True
+    return price <= limits['max_price']
+
+
+class QuoteEngine:
+    """Zone-to-zone price matrices and rental rate tables, all in memory"""
+
+    def __init__(self, zones: List[dict]):
+        self.zones = zones
+        self.index = {zone['id']: i for i, zone in enumerate(zones)}
+
+        latitude = np.radians([zone['latitude'] for zone in zones])
+        longitude = np.radians([zone['longitude'] for zone in zones])
+        a = (np.sin((latitude[:, None] - latitude[None, :]) / 2) ** 2
+             + np.cos(latitude[:, None]) * np.cos(latitude[None, :])
+             * np.sin((longitude[:, None] - longitude[None, :]) / 2) ** 2)
+        self.distance_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)) * ROAD_FACTOR
+
+        cities = np.array([zone['city'] for zone in zones])
+        same_city = cities[:, None] == cities[None, :]
+        base = np.array([vehicle[2] for vehicle in VEHICLES])[:, None, None]
+        per_km = np.array([vehicle[3] for vehicle in VEHICLES])[:, None, None]
+        # Shape (vehicle, from, to)
+        self.transfer_prices = np.where(same_city[None], _round_up(base + per_km * self.distance_km[None]), np.nan)
+        self.capacities = np.array([vehicle[1] for vehicle in VEHICLES])
+        self.one_way_fees = np.where(same_city, 0.0, _round_up(self.distance_km * ONE_WAY_FEE_PER_KM))
+
+    def zone(self, zone_id: str) -> int:
+        try:
+            return self.index[zone_id]
+        except KeyError:
+            raise ValueError(f"Unknown zone '{zone_id}'")
+
+    def quote_transfers(self, legs: List[TransferLeg]) -> List[dict]:
+        """All legs in one lookup; a leg across cities comes back unavailable"""
+        if not legs:
+            return []
+        origins = np.array([self.zone(leg.from_zone) for leg in legs])
+        destinations = np.array([self.zone(leg.to_zone) for leg in legs])
+        passengers = np.array([leg.passengers for leg in legs])
+        vehicle_index = {vehicle[0]: i for i, vehicle in enumerate(VEHICLES)}
+        requested = np.array([vehicle_index[leg.vehicle] if leg.vehicle else 0 for leg in legs])
+        # A requested vehicle too small for the group is upgraded to the smallest that fits
+        vehicles = np.maximum(requested, np.searchsorted(self.capacities, passengers))
+        prices = self.transfer_prices[vehicles, origins, destinations]
+        distances = self.distance_km[origins, destinations]
+
+        quotes = []
+        for leg, vehicle, price, distance in zip(legs, vehicles, prices, distances):
+            available = not np.isnan(price)
+            quotes.append({
+                "from_zone": leg.from_zone,
+                "to_zone": leg.to_zone,
+                "passengers": leg.passengers,
+                "available": available,
+                "vehicle": VEHICLES[vehicle][0] if available else None,
+                "distance_km": round(float(distance), 1) if available else None,
+                "price": float(price) if available else None,
+            })
+        return quotes
+
+    def quote_car_rental(self, request: CarRentalRequest) -> dict:
+        days = (request.return_date - request.pickup_date).days
+        if days <= 0:
+            raise ValueError("Return date must be after pickup date")
+        pickup = self.zone(request.pickup_zone)
+        dropoff_zone = request.dropoff_zone or request.pickup_zone
+        dropoff = self.zone(dropoff_zone)
+
+        band = np.searchsorted(RENTAL_BANDS, days, side="right") - 1
+        rate = CAR_DAILY_RATES[CAR_CLASSES.index(request.car_class), band]
+        # Every rental day priced with its own month's season factor
+        rental_days = np.arange(np.datetime64(request.pickup_date), np.datetime64(request.return_date))
+        months = rental_days.astype("datetime64[M]").astype(int) % 12
+        rental_price = float(_round_up(rate * SEASON_FACTORS[months].sum()))
+        one_way_fee = float(self.one_way_fees[pickup, dropoff])
+        return {
+            "pickup_zone": request.pickup_zone,
+            "dropoff_zone": dropoff_zone,
+            "car_class": request.car_class,
+            "days": days,
+            "daily_rate": round(rental_price / days, 2),
+            "rental_price": rental_price,
+            "one_way_fee": one_way_fee,
+            "price": rental_price + one_way_fee,
+        }
+
+
+quote_engine = QuoteEngine(build_zones())
@@ -0,0 +1,155 @@
+"""Multi-service trips written all-or-nothing
+
+``POST /api/trips`` prices every component in one pass (server.py), then
+``write_trip`` takes the inventory holds and inserts the trip and its
+component reservations in one Mongo transaction. If any hold fails, nothing
+is written and the request gets a 409.
+
+Holds are counters in ``inventory_holds``, one per sellable unit: a hotel room
+type on one night (capacity ``available_rooms``) or a flight fare (capacity
+``seats_left`` when it was quoted). Single hotel bookings take the same holds
+through ``write_reservation``, so trips and plain reservations draw on one
+inventory. Every reservation keeps the holds it took and gives them back when
+it is rejected or cancelled.
+
+Transactions need a replica set. On a standalone server (local development)
+the same writes run without a session, and a failure undoes the writes
+already made. That is good enough for development, but it is not atomic.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from models import ReservationStatus
+
+# IllegalOperation: "Transaction numbers are only allowed on a replica set member or mongos"
+_NO_TRANSACTIONS_CODE = 20
+RELEASING_STATUSES = (ReservationStatus.REJECTED, ReservationStatus.CANCELLED)
+# Flipped on the first IllegalOperation so a standalone server is probed once, not per trip
+_transactions_supported = True
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_trip_indexes(db):
+    await db.trips.create_index("id", unique=True, name="id_unique")
+    await db.trips.create_index([("user_id", 1), ("created_at", -1)], name="user_created")
+    await db.reservations.create_index("trip_id", sparse=True, name="trip_id")
+
+
+def hotel_holds(hotel_id: str, room_type: dict, check_in: date, check_out: date) -> List[dict]:
+    """One room for every night of the stay"""
+    return [
+        {"key": f"hotel:{hotel_id}:{room_type['id']}:{(check_in + timedelta(days=n)).isoformat()}",
+         "quantity": 1, "capacity": room_type.get('available_rooms', 10)}
+        for n in range((check_out - check_in).days)
+    ]
+
+
+def flight_holds(fare: dict, passengers: int) -> List[dict]:
+    return [{"key": f"flight:{fare['id']}", "quantity": passengers, "capacity": fare['seats_left']}]
+
+
+async def _take_hold(db, hold: dict, session):
+    sold_out = HTTPException(status_code=409, detail=f"Not enough availability for {hold['key']}")
+    for _ in range(2):
+        try:
+            # Matches only while there is room; if the counter exists but is full, the upsert's insert
+            # collides on _id, and that duplicate key is the "sold out" answer
+            await db.inventory_holds.update_one(
+                {"_id": hold['key'], "held": {"$lte": hold['capacity'] - hold['quantity']}},
+                {"$inc": {"held": hold['quantity']}, "$set": {"updated_at": datetime.utcnow().isoformat()}},
+                upsert=True, session=session
+            )
+            return
+        except DuplicateKeyError:
+            # A write error ends the transaction, and inside one a racing upsert is a retried write conflict
+            if session is not None:
+                raise sold_out
+            # Without one, two first-time upserts of the key race and the loser collides although there is room
+            counter = await db.inventory_holds.find_one({"_id": hold['key']}, {"held": 1})
+            if counter is not None and counter.get('held', 0) > hold['capacity'] - hold['quantity']:
+                raise sold_out
+    raise sold_out
+
+
+async def _take_holds(db, holds: List[dict], session, undo: list):
+    for hold in holds:
+        if hold['quantity'] > hold['capacity']:
+            raise HTTPException(status_code=409, detail=f"Not enough availability for {hold['key']}")
+        await _take_hold(db, hold, session)
+        undo.append(("hold", hold))
+
+
+async def _write(db, trip: dict, reservations: List[dict], session, undo: list):
+    for reservation in reservations:
+        await _take_holds(db, reservation['inventory_holds'], session, undo)
+    await db.trips.insert_one(dict(trip), session=session)
+    undo.append(("trip", trip['id']))
+    await db.reservations.insert_many([dict(reservation) for reservation in reservations], session=session)
+    undo.append(("reservations", trip['id']))
+
+
+async def _undo(db, undo: list):
+    for kind, target in reversed(undo):
+        if kind == "hold":
+            await db.inventory_holds.update_one({"_id": target['key']}, {"$inc": {"held": -target['quantity']}})
+        elif kind == "trip":
+            await db.trips.delete_one({"id": target})
+        else:
+            await db.reservations.delete_many({"trip_id": target})
+
+
+async def write_trip(db, trip: dict, reservations: List[dict]):
+    """Holds, trip and component reservations: all of them or none"""
+    global _transactions_supported
+    if _transactions_supported:
+        try:
+            async with await db.client.start_session() as session:
+                async def callback(session):
+                    await _write(db, trip, reservations, session, [])
+                await session.with_transaction(callback)
+            return
+        except OperationFailure as e:
+            if e.code != _NO_TRANSACTIONS_CODE:
+                raise
+            _transactions_supported = False
+            logger.warning("MongoDB does not support transactions (standalone server); trips are written without one")
+    undo = []
+    try:
+        await _write(db, trip, reservations, None, undo)
+    except BaseException:
+        await _undo(db, undo)
+        raise
+
+
+async def write_reservation(db, reservation: dict):
+    """Holds and a single reservation; the holds are given back if the insert fails"""
+    undo = []
+    try:
+        await _take_holds(db, reservation['inventory_holds'], None, undo)
+        await db.reservations.insert_one(reservation)
+    except BaseException:
+        await _undo(db, undo)
+        raise
+
+
+async def release_holds(db, reservation: dict):
+    """Give back a component's holds once it can no longer be used (rejected/cancelled)"""
+    for hold in reservation.get('inventory_holds') or ():
+        await db.inventory_holds.update_one({"_id": hold['key']}, {"$inc": {"held": -hold['quantity']}})
+
+
+def trip_status(reservations: List[dict]) -> Optional[ReservationStatus]:
+    """One status for the trip: pending while any part waits, otherwise the least advanced live status"""
+    statuses = {ReservationStatus(reservation['status']) for reservation in reservations}
+    if not statuses:
+        return None
+    for candidate in (ReservationStatus.PENDING, ReservationStatus.APPROVED, ReservationStatus.CONFIRMED,
+                      ReservationStatus.COMPLETED, ReservationStatus.REJECTED):
+        if candidate in statuses:
+            return candidate
+    return ReservationStatus.CANCELLED
@@ -53,11 +53,91 @@ export const reservationAPI = {
   }),
 };
 
+// Approvals
+export const approvalAPI = {
+  getPending: (params) => api.get('/approvals/pending', { params }),
+};
+
 // Dashboard
 export const dashboardAPI = {
   getStats: () => api.get('/dashboard/stats'),
 };
 
+// Session bootstrap: user, company, stats and latest reservations in one request.
+// Sections the server reports as unchanged are served from the previous payload.
+let bootstrapSections = {};
+
+export const bootstrapAPI = {
+  get: async () => {
+    const etags = Object.values(bootstrapSections).map((section) => section.etag);
+    const response = await api.get('/bootstrap', {
+      headers: etags.length ? { 'If-None-Match': etags.join(', ') } : {},
+    });
+    const data = {};
+    Object.entries(response.data).forEach(([name, section]) => {
+      if (!section.not_modified) {
+        bootstrapSections[name] = section;
+      }
+      data[name] = bootstrapSections[name]?.data ?? null;
+    });
+    return { ...response, data };
+  },
+  reset: () => {
+    bootstrapSections = {};
+  },
+};
+
+// Live reservation updates (Server-Sent Events over fetch, so the token travels in a header).
+// onEvent(type, data) receives 'ready' on every (re)connect: reload the list then, apply deltas after.
+export const liveAPI = {
+  subscribe: (onEvent) => {
+    const controller = new AbortController();
+    let retryDelay = 1000;
+
+    const dispatch = (chunk) => {
+      let type = 'message';
+      let data = '';
+      chunk.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) type = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (!chunk.startsWith(':')) {
+        onEvent(type, data ? JSON.parse(data) : {});
+      }
+    };
+
+    const connect = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const response = await fetch(`${API_BASE}/events/stream`, {
+            headers: { Authorization: `Bearer ${localStorage.getItem('token')}` },
+            signal: controller.signal,
+          });
+          if (response.status === 401 || response.status === 403) return;
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = '';
+          retryDelay = 1000;
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            const chunks = buffer.split('\n\n');
+            buffer = chunks.pop();
+            chunks.forEach(dispatch);
+          }
+        } catch (err) {
+          if (controller.signal.aborted) return;
+        }
+        await new Promise((resolve) => setTimeout(resolve, retryDelay));
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      }
+    };
+
+    connect();
+    return () => controller.abort();
+  },
+};
+
 // Users
 export const userAPI = {
   getAll: () => api.get('/users'),
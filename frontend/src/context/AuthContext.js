@@ -1,5 +1,6 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import axios from 'axios';
+import { bootstrapAPI } from '../api/api';
 
 const AuthContext = createContext(null);
 
@@ -44,6 +45,8 @@ export const AuthProvider = ({ children }) => {
       const { access_token, user: userData } = response.data;
       
       localStorage.setItem('token', access_token);
+      // Another account may have used this tab; its cached sections must not be revalidated
+      bootstrapAPI.reset();
       setToken(access_token);
       setUser(userData);
       
@@ -71,6 +74,7 @@ export const AuthProvider = ({ children }) => {
 
   const logout = () => {
     localStorage.removeItem('token');
+    bootstrapAPI.reset();
     setToken(null);
     setUser(null);
   };
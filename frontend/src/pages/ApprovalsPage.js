@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import Layout from '../components/Layout';
-import { reservationAPI } from '../api/api';
+import { approvalAPI, liveAPI, reservationAPI } from '../api/api';
 import { useAuth } from '../context/AuthContext';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from '../components/ui/card';
@@ -37,10 +37,29 @@ export default function ApprovalsPage() {
     fetchPendingReservations();
   }, [user]);
 
+  // Server push instead of polling: reload on (re)connect, then apply deltas
+  useEffect(() => {
+    if (user?.role !== 'manager' && user?.role !== 'admin') {
+      return undefined;
+    }
+    return liveAPI.subscribe((type, event) => {
+      if (type === 'ready' || type === 'resync') {
+        fetchPendingReservations();
+      } else if (type === 'reservation.created' && event.status === 'pending' && event.reservation
+        && (user.role === 'admin' || !event.approver_id || event.approver_id === user.id)) {
+        setReservations((current) => (
+          current.some((r) => r.id === event.reservation_id) ? current : [event.reservation, ...current]
+        ));
+      } else if (type === 'reservation.status_changed' && event.status !== 'pending') {
+        setReservations((current) => current.filter((r) => r.id !== event.reservation_id));
+      }
+    });
+  }, [user]);
+
   const fetchPendingReservations = async () => {
     try {
-      const response = await reservationAPI.getAll('pending');
-      setReservations(response.data);
+      const response = await approvalAPI.getPending();
+      setReservations(response.data.reservations);
     } catch (err) {
       setError('Rezervasyonlar yüklenirken bir hata oluştu');
       console.error(err);
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useAuth } from '../context/AuthContext';
-import { dashboardAPI } from '../api/api';
+import { bootstrapAPI } from '../api/api';
 import Layout from '../components/Layout';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Hotel, Calendar, CheckCircle, XCircle, TrendingUp } from 'lucide-react';
@@ -18,8 +18,8 @@ export default function DashboardPage() {
 
   const fetchStats = async () => {
     try {
-      const response = await dashboardAPI.getStats();
-      setStats(response.data);
+      const response = await bootstrapAPI.get();
+      setStats(response.data.stats);
     } catch (err) {
       setError('İstatistikler yüklenirken bir hata oluştu');
       console.error(err);
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Read Routing Test for Corporate Reservation Engine
+Verifies against a local replica set that analytics routes read from a
+secondary and consistent routes read from the primary.
+
+Start a throwaway replica set first, e.g.:
+    mkdir -p /tmp/rs/{0,1,2}
+    for i in 0 1 2; do mongod --replSet rs0 --port 2701$i --dbpath /tmp/rs/$i --fork --logpath /tmp/rs/$i.log; done
+    mongosh --port 27010 --eval 'rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27010"}, {_id: 1, host: "localhost:27011"}, {_id: 2, host: "localhost:27012"}]})'
+
+Then:
+    RS_MONGO_URL="mongodb://localhost:27010,localhost:27011,localhost:27012/?replicaSet=rs0" python read_routing_test.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+RS_MONGO_URL = os.environ.get(
+    "RS_MONGO_URL", "mongodb://localhost:27010,localhost:27011,localhost:27012/?replicaSet=rs0")
+TEST_DB = f"read_routing_test_{uuid.uuid4().hex[:8]}"
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+def print_success(message):
+    print(f"{Colors.GREEN}✅ {message}{Colors.ENDC}")
+
+def print_error(message):
+    print(f"{Colors.RED}❌ {message}{Colors.ENDC}")
+
+def print_info(message):
+    print(f"{Colors.BLUE}ℹ️  {message}{Colors.ENDC}")
+
+def print_header(message):
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.ENDC}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{message}{Colors.ENDC}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.ENDC}")
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Remembers which server each command was sent to"""
+
+    def __init__(self):
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        host, port = event.connection_id
+        with self._lock:
+            self.commands.append((event.command_name, collection, f"{host}:{port}"))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.commands = []
+
+    def servers(self, command_name, collection):
+        with self._lock:
+            return {address for name, coll, address in self.commands
+                    if name == command_name and coll == collection}
+
+
+recorder = CommandRecorder()
+# Registered globally so it also sees the client server.py creates at import time
+monitoring.register(recorder)
+
+
+async def test_router(client, primary, secondaries):
+    from read_routing import ReadRouter
+
+    print_header("ReadRouter handles")
+    database = client[TEST_DB]
+    router = ReadRouter(max_staleness_seconds=90)
+    passed = True
+
+    recorder.reset()
+    for _ in range(5):
+        await router.database(database, "dashboard_stats").reservations.find_one({})
+    servers = recorder.servers("find", "reservations")
+    if servers and servers <= secondaries:
+        print_success(f"analytics reads went to secondaries {sorted(servers)}")
+    else:
+        print_error(f"analytics reads went to {sorted(servers)}, expected a subset of {sorted(secondaries)}")
+        passed = False
+
+    recorder.reset()
+    for _ in range(5):
+        await router.database(database, "reservation_list").reservations.find_one({})
+    servers = recorder.servers("find", "reservations")
+    if servers == {primary}:
+        print_success(f"consistent reads went to the primary {primary}")
+    else:
+        print_error(f"consistent reads went to {sorted(servers)}, expected {primary}")
+        passed = False
+
+    recorder.reset()
+    await router.database(database, "dashboard_stats").reservations.insert_one({"id": "write-check"})
+    servers = recorder.servers("insert", "reservations")
+    if servers == {primary}:
+        print_success("writes through an analytics handle still go to the primary")
+    else:
+        print_error(f"write went to {sorted(servers)}")
+        passed = False
+    return passed
+
+
+def test_endpoints(primary, secondaries):
+    print_header("API routes")
+    os.environ["MONGO_URL"] = RS_MONGO_URL
+    os.environ["DB_NAME"] = TEST_DB
+    import server
+    from auth import create_access_token, get_password_hash
+    from fastapi.testclient import TestClient
+
+    passed = True
+    with TestClient(server.app) as c:
+        user_id = str(uuid.uuid4())
+        now = datetime.utcnow().isoformat()
+        c.portal.call(server.db.users.insert_one, {
+            "id": user_id, "email": f"{user_id[:8]}@routing.test", "password_hash": get_password_hash("pw"),
+            "full_name": "Routing Test", "role": "admin", "company_id": None, "is_active": True,
+            "is_first_login": False, "gdpr_accepted": True, "created_at": now, "updated_at": now,
+        })
+        headers = {"Authorization": "Bearer " + create_access_token({"sub": user_id})}
+
+        checks = [
+            # count_documents is sent as an aggregate command
+            ("GET", "/api/dashboard/stats", "aggregate", "reservations", "analytics"),
+            ("GET", "/api/companies", "find", "companies", "consistent"),
+            ("GET", "/api/reservations", "find", "reservations", "consistent"),
+        ]
+        for method, path, command, collection, read_class in checks:
+            recorder.reset()
+            response = c.request(method, path, headers=headers)
+            servers = recorder.servers(command, collection)
+            expected_ok = (servers and servers <= secondaries) if read_class == "analytics" else servers == {primary}
+            if response.status_code == 200 and expected_ok:
+                print_success(f"{path} ({read_class}) read {collection} from {sorted(servers)}")
+            else:
+                print_error(f"{path} ({read_class}) -> HTTP {response.status_code}, {collection} read from {sorted(servers)}")
+                passed = False
+        c.portal.call(server.client.drop_database, TEST_DB)
+    return passed
+
+
+async def discover():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(RS_MONGO_URL, serverSelectionTimeoutMS=5000)
+    try:
+        hello = await client.admin.command("hello")
+    finally:
+        client.close()
+    if not hello.get("setName"):
+        raise RuntimeError("RS_MONGO_URL does not point at a replica set")
+    primary = hello["primary"]
+    return primary, set(hello.get("hosts", [])) - {primary}
+
+
+def main():
+    print_header(f"Read routing against {RS_MONGO_URL}")
+    try:
+        primary, secondaries = asyncio.run(discover())
+    except Exception as e:
+        print_error(f"Cannot reach a replica set: {e}")
+        return 1
+    print_info(f"primary {primary}, secondaries {sorted(secondaries)}")
+
+    async def run_router():
+        from motor.motor_asyncio import AsyncIOMotorClient
+        routing_client = AsyncIOMotorClient(RS_MONGO_URL)
+        try:
+            # Let the driver discover the secondaries before routing to them
+            await routing_client[TEST_DB].reservations.insert_one({"id": "seed"})
+            await asyncio.sleep(1)
+            return await test_router(routing_client, primary, secondaries)
+        finally:
+            await routing_client.drop_database(TEST_DB)
+            routing_client.close()
+
+    results = [asyncio.run(run_router()), test_endpoints(primary, secondaries)]
+
+    if all(results):
+        print_success("Read routing verified")
+        return 0
+    print_error("Read routing checks failed")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())